@@ -32,40 +32,6 @@ function sendMessageToTab(tabId, data) {
 }
 
 
-/**
- * Resamples the audio data to a target sample rate of 16kHz.
- * @param {Array|ArrayBuffer|TypedArray} audioData - The input audio data.
- * @param {number} [origSampleRate=44100] - The original sample rate of the audio data.
- * @returns {Float32Array} The resampled audio data at 16kHz.
- */
-function resampleTo16kHZ(audioData, origSampleRate = 44100) {
-  // Convert the audio data to a Float32Array
-  const data = new Float32Array(audioData);
-
-  // Calculate the desired length of the resampled data
-  const targetLength = Math.round(data.length * (16000 / origSampleRate));
-
-  // Create a new Float32Array for the resampled data
-  const resampledData = new Float32Array(targetLength);
-
-  // Calculate the spring factor and initialize the first and last values
-  const springFactor = (data.length - 1) / (targetLength - 1);
-  resampledData[0] = data[0];
-  resampledData[targetLength - 1] = data[data.length - 1];
-
-  // Resample the audio data
-  for (let i = 1; i < targetLength - 1; i++) {
-    const index = i * springFactor;
-    const leftIndex = Math.floor(index).toFixed();
-    const rightIndex = Math.ceil(index).toFixed();
-    const fraction = index - leftIndex;
-    resampledData[i] = data[leftIndex] + (data[rightIndex] - data[leftIndex]) * fraction;
-  }
-
-  // Return the resampled data
-  return resampledData;
-}
-
 function generateUUID() {
   let dt = new Date().getTime();
   const uuid = 'xxxxxxxx-xxxx-4xxx-yxxx-xxxxxxxxxxxx'.replace(/[xy]/g, function(c) {
@@ -100,7 +66,8 @@ async function startRecord(option) {
           language: option.language,
           task: option.task,
           model: option.modelSize,
-          use_vad: option.useVad
+          use_vad: option.useVad,
+          encoding: "webm"
         })
       );
     };
@@ -119,9 +86,15 @@ async function startRecord(option) {
         chrome.runtime.sendMessage({ action: "stopCapture" })
         return;
       }
+
+      // queued for a session slot, SERVER_READY follows once admitted
+      if (data["status"] === "QUEUED")
+        return;
         
       if (isServerReady === false){
         isServerReady = true;
+        // the first chunk holds the WebM header, so only start recording once the server listens
+        recorder.start(250);
         return;
       }
       
@@ -150,25 +123,17 @@ async function startRecord(option) {
     };
 
     
-    const audioDataCache = [];
-    const context = new AudioContext();
-    const mediaStream = context.createMediaStreamSource(stream);
-    const recorder = context.createScriptProcessor(4096, 1, 1);
-
-    recorder.onaudioprocess = async (event) => {
-      if (!context || !isServerReady) return;
-
-      const inputData = event.inputBuffer.getChannelData(0);
-      const audioData16kHz = resampleTo16kHZ(inputData, context.sampleRate);
-
-      audioDataCache.push(inputData);
-
-      socket.send(audioData16kHz);
+    // Opus in WebM, decoded and resampled to 16kHz by the server
+    const recorder = new MediaRecorder(stream, { mimeType: "audio/webm;codecs=opus" });
+    recorder.ondataavailable = (event) => {
+      if (event.data.size > 0 && socket.readyState === WebSocket.OPEN) {
+        socket.send(event.data);
+      }
     };
 
     // Prevent page mute
-    mediaStream.connect(recorder);
-    recorder.connect(context.destination);
+    const context = new AudioContext();
+    const mediaStream = context.createMediaStreamSource(stream);
     mediaStream.connect(context.destination);
     // }
   } else {
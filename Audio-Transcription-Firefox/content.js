@@ -18,6 +18,20 @@ function handlePlaybackStateChange(event) {
   isPaused = event.target.paused;
 }
 
+/**
+ * Converts float audio samples between -1 and 1 to 16-bit PCM, which takes half the bandwidth.
+ * @param {Float32Array} audioData - The audio samples.
+ * @returns {Int16Array} The 16-bit PCM samples.
+ */
+function floatTo16BitPCM(audioData) {
+  const pcmData = new Int16Array(audioData.length);
+  for (let i = 0; i < audioData.length; i++) {
+    const sample = Math.max(-1, Math.min(1, audioData[i]));
+    pcmData[i] = sample * 32767;
+  }
+  return pcmData;
+}
+
 function generateUUID() {
   let dt = new Date().getTime();
   const uuid = 'xxxxxxxx-xxxx-4xxx-yxxx-xxxxxxxxxxxx'.replace(/[xy]/g, function(c) {
@@ -75,7 +89,8 @@ function startRecording(data) {
             language: data.language,
             task: data.task,
             model: data.modelSize,
-            use_vad: data.useVad
+            use_vad: data.useVad,
+            audio_format: "int16"
         })
       );
     };
@@ -90,6 +105,10 @@ function startRecording(data) {
         await browser.runtime.sendMessage({ action: "showPopup", data: data["message"] })
         return;
       }
+
+      // queued for a session slot, SERVER_READY follows once admitted
+      if (data["status"] === "QUEUED")
+        return;
       
       if (!isServerReady && data["message"] === "SERVER_READY"){
         isServerReady = true;
@@ -130,7 +149,7 @@ function startRecording(data) {
 
         audioDataCache.push(inputData);
         
-        socket.send(audioData16kHz);
+        socket.send(floatTo16BitPCM(audioData16kHz));
       };
 
       // Prevent page mute
@@ -0,0 +1,26 @@
+import argparse
+import asyncio
+import logging
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--port', '-p',
+                        type=int,
+                        default=9090,
+                        help='Websocket port clients connect to.')
+    parser.add_argument('--servers', '-s',
+                        type=str,
+                        nargs='+',
+                        required=True,
+                        help='host:port of the websocket port of every transcription server, '
+                             'e.g. -s localhost:9091 localhost:9092.')
+    parser.add_argument('--poll_interval',
+                        type=float,
+                        default=1.0,
+                        help='Seconds between two load reports of a server.')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    from whisper_live.gateway import SessionGateway
+    gateway = SessionGateway(args.servers, poll_interval=args.poll_interval)
+    asyncio.run(gateway.serve("0.0.0.0", args.port))
@@ -0,0 +1,88 @@
+import argparse
+import json
+import logging
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host',
+                        type=str,
+                        default='localhost',
+                        help='Hostname of the server.')
+    parser.add_argument('--port', '-p',
+                        type=int,
+                        default=9090,
+                        help='Websocket port of the server.')
+    parser.add_argument('--audio', '-a',
+                        type=str,
+                        default='assets/jfk.flac',
+                        help='Audio file every client streams.')
+    parser.add_argument('--num_clients', '-n',
+                        type=int,
+                        nargs='+',
+                        default=[1],
+                        help='Number of concurrent clients. Several values run one test per value, in order, '
+                             'e.g. -n 1 2 4 8 16 to find where latency starts to climb.')
+    parser.add_argument('--speed',
+                        type=float,
+                        default=1.0,
+                        help='Pace of the streams relative to real time, e.g. 2 for twice as fast. '
+                             '0 streams as fast as possible.')
+    parser.add_argument('--ramp_up',
+                        type=float,
+                        default=0.0,
+                        help='Seconds over which the clients are started.')
+    parser.add_argument('--model', '-m',
+                        type=str,
+                        default='small',
+                        help='Whisper model the clients ask for.')
+    parser.add_argument('--lang', '-l',
+                        type=str,
+                        default=None,
+                        help='Language of the audio. Detected by the server if not set.')
+    parser.add_argument('--no_vad',
+                        action='store_true',
+                        help='Ask the server not to use voice activity detection.')
+    parser.add_argument('--drain_timeout',
+                        type=float,
+                        default=5.0,
+                        help='Seconds without a new result after the audio ends before a client disconnects.')
+    parser.add_argument('--server_pid',
+                        type=int,
+                        default=None,
+                        help='PID of the server, to report its CPU use and RSS. Needs psutil.')
+    parser.add_argument('--output', '-o',
+                        type=str,
+                        default=None,
+                        help='Write the JSON report to this file instead of stdout.')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    from whisper_live.load_test import decode_audio, run_load_test
+
+    audio = decode_audio(args.audio)
+    options = {
+        "language": args.lang,
+        "model": args.model,
+        "use_vad": not args.no_vad,
+    }
+    reports = []
+    for num_clients in args.num_clients:
+        logging.info(f"Streaming {args.audio} from {num_clients} clients.")
+        reports.append(run_load_test(
+            audio,
+            num_clients,
+            host=args.host,
+            port=args.port,
+            ramp_up=args.ramp_up,
+            server_pid=args.server_pid,
+            options=options,
+            speed=args.speed,
+            drain_timeout=args.drain_timeout,
+        ))
+
+    report = json.dumps({"audio": args.audio, "speed": args.speed, "runs": reports}, indent=2)
+    if args.output is None:
+        print(report)
+    else:
+        with open(args.output, "w") as f:
+            f.write(report)
@@ -30,11 +30,103 @@ if __name__ == "__main__":
                         help="Number of threads to use for OpenMP")
     parser.add_argument('--no_single_model', '-nsm',
                         action='store_true',
-                        help='Set this if every connection should instantiate its own model. Only relevant for custom model, passed using -trt or -fw.')
+                        help='Set this if every connection should instantiate its own model. With faster_whisper this disables the '
+                             'shared model pool, with the other backends it is only relevant for custom models, '
+                             'passed using -trt.')
     parser.add_argument('--cache_path', '-c',
                         type=str,
                         default="~/.cache/whisper-live/",
                         help='Path to cache the converted ctranslate2 models.')
+    parser.add_argument('--batch_inference',
+                        action='store_true',
+                        help='Decode the pending windows of all sessions sharing the single faster_whisper model '
+                             'together in one batched call.')
+    parser.add_argument('--max_batch_size',
+                        type=int,
+                        default=8,
+                        help='Maximum number of windows decoded in one batch when using --batch_inference.')
+    parser.add_argument('--batch_timeout_ms',
+                        type=float,
+                        default=10,
+                        help='How long to wait for more windows before running a batch when using --batch_inference.')
+    parser.add_argument('--num_workers',
+                        type=int,
+                        default=None,
+                        help='Number of transcription worker threads shared by all clients. '
+                             'Defaults to the number of CPUs plus 4, capped at 32.')
+    parser.add_argument('--async_mode',
+                        action='store_true',
+                        help='Receive from all clients on an asyncio event loop instead of one thread per connection.')
+    parser.add_argument('--preload',
+                        type=str,
+                        nargs='+',
+                        default=None,
+                        help='faster_whisper models to load at startup and keep loaded, e.g. --preload small large-v3.')
+    parser.add_argument('--model_memory_budget_mb',
+                        type=int,
+                        default=None,
+                        help='Megabytes of faster_whisper model weights to keep loaded. Models no client uses are '
+                             'unloaded, least recently used first, once the budget is exceeded.')
+    parser.add_argument('--model_replicas',
+                        type=int,
+                        default=1,
+                        help='Copies of every shared faster_whisper model to load. Passes on the same model run in '
+                             'parallel up to this number, at the cost of the memory of one model per copy.')
+    parser.add_argument('--metrics_port',
+                        type=int,
+                        default=None,
+                        help='Serve Prometheus metrics over HTTP on this port, at /metrics. Disabled by default.')
+    parser.add_argument('--max_send_queue_kb',
+                        type=int,
+                        default=1024,
+                        help='Kilobytes of results allowed to wait for a client that does not keep up with receiving '
+                             'them. A client exceeding this is disconnected.')
+    parser.add_argument('--http_port',
+                        type=int,
+                        default=None,
+                        help='Serve batch transcription of uploaded files over HTTP on this port, at '
+                             '/v1/audio/transcriptions. faster_whisper backend only. Disabled by default.')
+    parser.add_argument('--http_batch_size',
+                        type=int,
+                        default=8,
+                        help='Speech chunks of an uploaded file decoded in one batch.')
+    parser.add_argument('--http_max_jobs',
+                        type=int,
+                        default=1,
+                        help='Uploaded files transcribed at the same time.')
+    parser.add_argument('--http_max_queued_jobs',
+                        type=int,
+                        default=8,
+                        help='Uploaded files allowed to wait for a running job. Further uploads get a 503.')
+    parser.add_argument('--workers',
+                        type=int,
+                        default=1,
+                        help='Server processes accepting connections, each with its own transcription worker threads, '
+                             'sessions and copy of the models. The max_clients limit holds across all of them.')
+    parser.add_argument('--max_queue_size',
+                        type=int,
+                        default=16,
+                        help='Clients allowed to wait, in arrival order, for a session slot while the server is '
+                             'full. Further clients get a WAIT status. 0 turns away every client while full.')
+    parser.add_argument('--max_clients',
+                        type=int,
+                        default=None,
+                        help='Sessions allowed at most, whatever their measured load. Defaults to no limit but '
+                             'the target utilization.')
+    parser.add_argument('--max_connection_time',
+                        type=int,
+                        default=600,
+                        help='Seconds a session may stay connected.')
+    parser.add_argument('--target_utilization',
+                        type=float,
+                        default=0.8,
+                        help='Share of the transcription workers, and of the replicas of a shared model, the '
+                             'measured load of the sessions may reach. New sessions are admitted while the '
+                             'projected load stays within it. 0 admits sessions up to --max_clients only.')
+    parser.add_argument('--queue_timeout',
+                        type=float,
+                        default=300,
+                        help='Seconds a client waits for a session slot before it gets a WAIT status.')
     args = parser.parse_args()
 
     if args.backend == "tensorrt":
@@ -55,5 +147,25 @@ if __name__ == "__main__":
         trt_multilingual=args.trt_multilingual,
         trt_py_session=args.trt_py_session,
         single_model=not args.no_single_model,
-        cache_path=args.cache_path
+        cache_path=args.cache_path,
+        batch_inference=args.batch_inference,
+        max_batch_size=args.max_batch_size,
+        batch_timeout_ms=args.batch_timeout_ms,
+        num_workers=args.num_workers,
+        async_mode=args.async_mode,
+        preload=args.preload,
+        model_memory_budget_mb=args.model_memory_budget_mb,
+        model_replicas=args.model_replicas,
+        metrics_port=args.metrics_port,
+        max_send_queue_kb=args.max_send_queue_kb,
+        http_port=args.http_port,
+        http_batch_size=args.http_batch_size,
+        http_max_jobs=args.http_max_jobs,
+        http_max_queued_jobs=args.http_max_queued_jobs,
+        workers=args.workers,
+        max_queue_size=args.max_queue_size,
+        queue_timeout=args.queue_timeout,
+        max_clients=args.max_clients,
+        max_connection_time=args.max_connection_time,
+        target_utilization=args.target_utilization,
     )
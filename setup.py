@@ -47,6 +47,7 @@ setup(
         "torch",
         "torchaudio",
         "websockets",
+        "prometheus_client",
         "onnxruntime==1.17.0",
         "scipy",
         "websocket-client",
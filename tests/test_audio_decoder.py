@@ -0,0 +1,83 @@
+import io
+import unittest
+from unittest import mock
+
+import av
+import numpy as np
+
+from whisper_live.audio_decoder import create_decoder
+from whisper_live.load_test import decode_audio
+from whisper_live.server import BackendType, ClientManager, TranscriptionServer
+
+
+def encode_opus(audio, container_format=None, sample_rate=16000):
+    """
+    Returns:
+        The Opus packets of the audio if `container_format` is None, otherwise the bytes of the container.
+    """
+    buffer = io.BytesIO()
+    container = av.open(buffer, "w", format=container_format or "ogg")
+    stream = container.add_stream("libopus", rate=48000)
+    stream.layout = "mono"
+    stream.bit_rate = 24000
+    resampler = av.AudioResampler(format="s16", layout="mono", rate=48000)
+    frame = av.AudioFrame.from_ndarray((audio * 32767).astype(np.int16)[None, :], format="s16", layout="mono")
+    frame.sample_rate = sample_rate
+    packets = []
+    for resampled in resampler.resample(frame) + resampler.resample(None):
+        resampled.pts = None
+        packets.extend(stream.encode(resampled))
+    packets.extend(stream.encode(None))
+    for packet in packets:
+        container.mux(packet)
+    data = [bytes(packet) for packet in packets]
+    container.close()
+    return data if container_format is None else buffer.getvalue()
+
+
+class TestAudioDecoder(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.audio = decode_audio("assets/jfk.flac")
+
+    def assertDecodes(self, audio):
+        self.assertEqual(audio.dtype, np.float32)
+        self.assertAlmostEqual(audio.shape[0] / 16000, self.audio.shape[0] / 16000, delta=0.1)
+
+    def test_opus_packets(self):
+        decoder = create_decoder("opus")
+        audio = np.concatenate([decoder.decode(packet) for packet in encode_opus(self.audio)] + [decoder.flush()])
+        decoder.close()
+        self.assertDecodes(audio)
+
+    def test_container_streams(self):
+        for container_format in ("webm", "ogg"):
+            data = encode_opus(self.audio, container_format)
+            self.assertLess(len(data), self.audio.nbytes / 10)
+            decoder = create_decoder(container_format)
+            chunks = [decoder.decode(data[i:i + 4096]) for i in range(0, len(data), 4096)]
+            chunks.append(decoder.flush())
+            decoder.close()
+            self.assertDecodes(np.concatenate(chunks))
+
+    def test_stream_tail_reaches_the_session(self):
+        for encoding in ("webm", "ogg", "opus"):
+            server = TranscriptionServer()
+            server.backend = BackendType.FASTER_WHISPER
+            server.client_manager = ClientManager()
+            websocket, client = mock.MagicMock(), mock.MagicMock(mode="file")
+            server.client_manager.add_client(websocket, client)
+            server.audio_decoders[websocket] = create_decoder(encoding)
+            if encoding == "opus":
+                frames = encode_opus(self.audio)
+            else:
+                data = encode_opus(self.audio, encoding)
+                frames = [data[i:i + 4096] for i in range(0, len(data), 4096)]
+
+            for frame in frames + [b"END_OF_AUDIO"]:
+                server.handle_audio_frame(websocket, server.decode_frame(websocket, frame))
+            received = np.concatenate([call.args[0] for call in client.add_frames.call_args_list])
+            self.assertDecodes(received)
+            client.end_audio.assert_called_once()
+            server.audio_decoders.pop(websocket).close()
+
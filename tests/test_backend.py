@@ -0,0 +1,618 @@
+import json
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+from faster_whisper.feature_extractor import FeatureExtractor
+
+from whisper_live.backend.base import ServeClientBase
+from whisper_live.backend.batch_scheduler import BatchInferenceScheduler
+from whisper_live.backend.faster_whisper_backend import ServeClientFasterWhisper
+from whisper_live.backend.feature_cache import FeatureCache, normalize_log_mel
+from whisper_live.backend.model_pool import ModelPool
+from whisper_live.backend.pass_pacer import PassPacer
+from whisper_live.backend.ring_buffer import RingBuffer
+from whisper_live.backend.worker_pool import TranscriptionWorkerPool
+from whisper_live.outbound_queue import OutboundQueue
+
+
+class TestBatchInferenceScheduler(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = BatchInferenceScheduler(mock.MagicMock(), max_batch_size=4, batch_timeout_ms=200)
+        self.batches = []
+
+        def transcribe_features(features, language, task, initial_prompt, word_timestamps):
+            self.batches.append((language, len(features)))
+            return [[f"{language}-{int(feature[0, 0])}"] for feature in features]
+
+        self.scheduler.pipeline.transcribe_features = transcribe_features
+
+    def tearDown(self):
+        self.scheduler.stop()
+
+    def submit_concurrently(self, requests):
+        results = [None] * len(requests)
+
+        def submit(i, value, language):
+            features = np.full((80, 10), value, dtype=np.float32)
+            results[i] = self.scheduler.transcribe(features, language)
+
+        threads = [
+            threading.Thread(target=submit, args=(i, value, language))
+            for i, (value, language) in enumerate(requests)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_windows_are_batched_and_split_per_session(self):
+        results = self.submit_concurrently([(1, "en"), (2, "en"), (3, "en")])
+        self.assertEqual(results, [["en-1"], ["en-2"], ["en-3"]])
+        self.assertEqual(self.batches, [("en", 3)])
+
+    def test_batches_do_not_mix_languages(self):
+        results = self.submit_concurrently([(1, "en"), (2, "de"), (3, "en")])
+        self.assertEqual(results, [["en-1"], ["de-2"], ["en-3"]])
+        self.assertCountEqual(self.batches, [("en", 2), ("de", 1)])
+
+    def test_failure_is_reported_to_every_session(self):
+        self.scheduler.pipeline.transcribe_features = mock.MagicMock(side_effect=RuntimeError("boom"))
+        with self.assertRaises(RuntimeError):
+            self.scheduler.transcribe(np.zeros((80, 10), dtype=np.float32), "en")
+
+
+class TestRingBuffer(unittest.TestCase):
+    def test_append_and_view(self):
+        buffer = RingBuffer(10)
+        buffer.append(np.arange(4, dtype=np.float32))
+        buffer.append(np.arange(4, 7, dtype=np.float32))
+        self.assertEqual((buffer.start, buffer.end), (0, 7))
+        np.testing.assert_array_equal(buffer.view(2, 5), [2, 3, 4])
+        self.assertFalse(buffer.view().flags.writeable)
+
+    def test_overflow_drops_oldest_items(self):
+        buffer = RingBuffer(8)
+        for i in range(5):
+            buffer.append(np.arange(3 * i, 3 * i + 3, dtype=np.float32))
+        self.assertEqual((buffer.start, buffer.end), (7, 15))
+        # wrapped ranges are still returned as one contiguous view
+        view = buffer.view()
+        np.testing.assert_array_equal(view, np.arange(7, 15))
+        self.assertTrue(np.shares_memory(view, buffer.data))
+        # ranges before the start of the buffer are clipped
+        np.testing.assert_array_equal(buffer.view(0, 9), [7, 8])
+
+    def test_append_longer_than_capacity(self):
+        buffer = RingBuffer(4)
+        dropped = buffer.append(np.arange(10, dtype=np.float32))
+        self.assertEqual(dropped, 6)
+        np.testing.assert_array_equal(buffer.view(), [6, 7, 8, 9])
+
+    def test_item_shape(self):
+        buffer = RingBuffer(3, item_shape=(2,))
+        buffer.append(np.ones((2, 2), dtype=np.float32))
+        buffer.append(np.zeros((2, 2), dtype=np.float32))
+        self.assertEqual(buffer.view().shape, (3, 2))
+
+
+class TestServeClientAudioBuffer(unittest.TestCase):
+    def setUp(self):
+        self.client = ServeClientBase("uid", mock.MagicMock())
+
+    def test_unprocessed_audio_outlives_the_buffer(self):
+        self.client.add_frames(np.ones(self.client.RATE, dtype=np.float32))
+        self.client.timestamp_offset = 0.5
+        chunk, duration = self.client.get_audio_chunk_for_processing()
+        self.assertEqual(duration, 0.5)
+        # a slow pass keeps its audio while the buffer wraps around
+        for _ in range(self.client.BUFFER_DURATION + self.client.BUFFER_HEADROOM + 1):
+            self.client.audio_buffer.append(np.zeros(self.client.RATE, dtype=np.float32))
+        np.testing.assert_array_equal(chunk, 1.0)
+
+    def test_overflow_moves_timestamp_offset(self):
+        frame = np.zeros(self.client.RATE, dtype=np.float32)
+        for _ in range(self.client.BUFFER_DURATION + 5):
+            self.client.add_frames(frame)
+        self.assertEqual(self.client.timestamp_offset, 5.0)
+        _, duration = self.client.get_audio_chunk_for_processing()
+        self.assertEqual(duration, self.client.BUFFER_DURATION)
+
+
+class TestFeatureCache(unittest.TestCase):
+    def setUp(self):
+        self.feature_extractor = FeatureExtractor()
+        self.buffer = RingBuffer(30 * 16000)
+        self.cache = FeatureCache(self.feature_extractor, 30 * 16000)
+        audio = np.random.default_rng(0).standard_normal(10 * 16000).astype(np.float32) * 0.1
+        for i in range(0, audio.shape[0], 4096):
+            self.buffer.append(audio[i:i + 4096])
+            self.cache.update(self.buffer)
+
+    def test_matches_feature_extractor_from_stream_start(self):
+        audio = self.buffer.view(0)
+        features = normalize_log_mel(self.cache.features(audio, 0))
+        np.testing.assert_allclose(features, self.feature_extractor(audio), atol=1e-5)
+
+    def test_window_is_sliced_from_cache(self):
+        start = 160 * 250
+        audio = self.buffer.view(start)
+        features = self.cache.features(audio, start)
+        expected = self.cache.extract(audio)
+        self.assertEqual(features.shape, expected.shape)
+        # only the first frames differ, they see the audio before the window instead of padding
+        np.testing.assert_allclose(features[:, 2:], expected[:, 2:], atol=1e-5)
+        np.testing.assert_allclose(
+            features[:, :2], self.cache.frames.view(250, 252).T, atol=1e-5
+        )
+
+    def test_only_new_frames_are_computed(self):
+        end = self.cache.frames.end
+        with mock.patch.object(self.cache, "log_mel", wraps=self.cache.log_mel) as log_mel:
+            self.buffer.append(np.zeros(1600, dtype=np.float32))
+            self.cache.update(self.buffer)
+        self.assertEqual(log_mel.call_count, 1)
+        self.assertEqual(self.cache.frames.end - end, 10)
+
+    def test_unaligned_window_falls_back_to_extractor(self):
+        audio = self.buffer.view(100)
+        np.testing.assert_allclose(self.cache.features(audio, 100), self.cache.extract(audio))
+
+
+class TestModelPool(unittest.TestCase):
+    def setUp(self):
+        self.pool = ModelPool()
+        self.pool.estimate_size = lambda model: model.size
+
+    def load(self, size=100):
+        model = mock.MagicMock()
+        model.size = size
+        return model
+
+    def test_concurrent_acquires_load_once(self):
+        load = mock.MagicMock(side_effect=lambda: (threading.Event().wait(0.05), self.load())[1])
+        entries = []
+        threads = [
+            threading.Thread(target=lambda: entries.append(self.pool.acquire(("small", "cpu", "int8"), load)))
+            for _ in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        load.assert_called_once()
+        self.assertEqual(len({id(entry.model) for entry in entries}), 1)
+        self.assertEqual(entries[0].refcount, 10)
+
+    def test_idle_models_are_evicted_least_recently_used_first(self):
+        self.pool.memory_budget = 250
+        first = self.pool.acquire("first", self.load)
+        second = self.pool.acquire("second", self.load)
+        self.pool.release(first)
+        self.pool.release(second)
+        self.pool.acquire("second", self.load)
+        self.pool.acquire("third", self.load)
+        self.assertNotIn("first", self.pool.entries)
+        self.assertIn("second", self.pool.entries)
+        self.assertIsNone(first.model)
+
+    def test_models_in_use_and_preloaded_are_kept(self):
+        self.pool.memory_budget = 150
+        self.pool.preload("preloaded", self.load)
+        in_use = self.pool.acquire("in_use", self.load)
+        with self.assertLogs(level="WARNING"):
+            self.pool.acquire("another", self.load)
+        self.assertIn("preloaded", self.pool.entries)
+        self.assertIsNotNone(in_use.model)
+
+    def test_passes_are_dispatched_to_least_loaded_replica(self):
+        self.pool.replicas = 3
+        load = mock.MagicMock(side_effect=self.load)
+        entry = self.pool.acquire("replicated", load)
+        self.assertEqual(load.call_count, 3)
+        self.assertEqual(self.pool.loaded_size(), 300)
+        with entry.dispatch() as first, entry.dispatch() as second:
+            self.assertIsNot(first, second)
+            with entry.dispatch() as third:
+                self.assertNotIn(third, (first, second))
+                with entry.dispatch() as fourth:
+                    self.assertEqual(fourth.active, 2)
+            with entry.dispatch() as fifth:
+                self.assertIs(fifth, third)
+        self.assertEqual([replica.active for replica in entry.replicas], [0, 0, 0])
+
+    def test_failed_load_is_not_cached(self):
+        with self.assertRaises(RuntimeError):
+            self.pool.acquire("broken", mock.MagicMock(side_effect=RuntimeError("no model")))
+        self.assertNotIn("broken", self.pool.entries)
+
+
+class FakeSession(object):
+    def __init__(self, delays=()):
+        self.client_uid = "uid"
+        self.exit = False
+        self.delays = list(delays)
+        self.passes = 0
+        self.done = threading.Event()
+
+    def process_audio_chunk(self):
+        self.passes += 1
+        if not self.delays:
+            self.done.set()
+            return None
+        return self.delays.pop(0)
+
+
+class TestTranscriptionWorkerPool(unittest.TestCase):
+    def setUp(self):
+        self.pool = TranscriptionWorkerPool(num_workers=2)
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def test_session_is_run_when_scheduled(self):
+        session = FakeSession()
+        self.pool.schedule(session)
+        self.assertTrue(session.done.wait(2))
+        self.assertEqual(session.passes, 1)
+
+    def test_requested_delay_reschedules_session(self):
+        session = FakeSession(delays=[0.01, 0.01])
+        self.pool.schedule(session)
+        self.assertTrue(session.done.wait(2))
+        self.assertEqual(session.passes, 3)
+
+    def test_session_is_not_run_concurrently(self):
+        running = threading.Lock()
+        overlaps = []
+        session = FakeSession()
+
+        def process_audio_chunk():
+            if not running.acquire(blocking=False):
+                overlaps.append(True)
+                return None
+            session.passes += 1
+            if session.passes < 3:
+                self.pool.schedule(session)
+            threading.Event().wait(0.01)
+            running.release()
+            if session.passes >= 3:
+                session.done.set()
+            return None
+
+        session.process_audio_chunk = process_audio_chunk
+        self.pool.schedule(session)
+        self.assertTrue(session.done.wait(2))
+        self.assertEqual(overlaps, [])
+
+    def test_exited_session_is_dropped(self):
+        session = FakeSession(delays=[0.0])
+        session.exit = True
+        self.pool.schedule(session)
+        self.assertFalse(session.done.wait(0.1))
+        self.assertEqual(session.passes, 0)
+
+
+class TestServeClientScheduling(unittest.TestCase):
+    def setUp(self):
+        self.pool = mock.MagicMock()
+        self.pool.load.return_value = 0.0
+        self.client = ServeClientBase("uid", mock.MagicMock(), worker_pool=self.pool)
+
+    def test_ready_once_enough_audio_arrived(self):
+        half = np.zeros(self.client.RATE // 2, dtype=np.float32)
+        self.client.add_frames(half)
+        self.pool.schedule.assert_not_called()
+        self.client.add_frames(half)
+        self.pool.schedule.assert_called_once_with(self.client, 0.0)
+
+    def test_no_speech_waits_for_new_audio(self):
+        self.client.add_frames(np.zeros(self.client.RATE, dtype=np.float32))
+        self.client.language = "en"
+        self.client.transcribe_audio = mock.MagicMock(return_value=None)
+        self.assertIsNone(self.client.process_audio_chunk())
+        self.assertEqual(self.client.timestamp_offset, 1.0)
+
+    def test_audio_is_kept_while_language_is_detected(self):
+        self.client.add_frames(np.zeros(self.client.RATE, dtype=np.float32))
+        self.client.language = None
+        self.client.transcribe_audio = mock.MagicMock(return_value=["segment"])
+        self.client.handle_transcription_output = mock.MagicMock()
+        self.assertIsNone(self.client.process_audio_chunk())
+        self.assertEqual(self.client.timestamp_offset, 0.0)
+        self.client.handle_transcription_output.assert_not_called()
+
+    def test_same_window_is_not_transcribed_again(self):
+        self.client.add_frames(np.zeros(self.client.RATE, dtype=np.float32))
+        self.client.language = "en"
+        self.client.transcribe_audio = mock.MagicMock(return_value=["segment"])
+        self.client.handle_transcription_output = mock.MagicMock()
+        self.client.process_audio_chunk()
+        self.client.process_audio_chunk()
+        self.client.transcribe_audio.assert_called_once()
+        self.assertEqual(self.client.handle_transcription_output.call_count, 2)
+
+    def test_new_audio_needed_follows_inference_time(self):
+        self.client.add_frames(np.zeros(self.client.RATE, dtype=np.float32))
+        self.client.language = "en"
+        self.client.transcribe_audio = mock.MagicMock(return_value=["segment"])
+        self.client.handle_transcription_output = mock.MagicMock()
+        self.client.process_audio_chunk()
+        self.pool.schedule.reset_mock()
+        self.client.pacer.inference_time = 0.6
+        self.client.new_audio_needed = self.client.pacer.new_audio_needed()
+        self.client.add_frames(np.zeros(self.client.RATE // 4, dtype=np.float32))
+        self.pool.schedule.assert_not_called()
+        self.client.add_frames(np.zeros(self.client.RATE // 4, dtype=np.float32))
+        self.pool.schedule.assert_called_once_with(self.client, 0.0)
+
+    def test_dedicated_thread_without_pool(self):
+        client = ServeClientBase("uid", mock.MagicMock())
+        client.transcribe_audio = mock.MagicMock(return_value=None)
+        client.language = "en"
+        client.start_transcription()
+        client.add_frames(np.zeros(client.RATE, dtype=np.float32))
+        client.cleanup()
+        client.trans_thread.join(2)
+        self.assertFalse(client.trans_thread.is_alive())
+
+
+class TestPassPacer(unittest.TestCase):
+    def setUp(self):
+        self.pool = mock.MagicMock()
+        self.pool.load.return_value = 0.0
+        self.pacer = PassPacer(target_latency=1.0, worker_pool=self.pool)
+
+    def test_new_audio_needed_leaves_room_for_inference(self):
+        self.assertEqual(self.pacer.new_audio_needed(), 1.0)
+        self.pacer.record_pass(0.4)
+        self.assertAlmostEqual(self.pacer.new_audio_needed(), 0.6)
+        self.pacer.record_pass(2.0)
+        self.assertEqual(self.pacer.new_audio_needed(), PassPacer.MIN_NEW_AUDIO)
+
+    def test_passes_are_spaced_by_load(self):
+        self.pacer.record_pass(0.5)
+        self.pool.load.return_value = 4.0
+        self.assertAlmostEqual(self.pacer.new_audio_needed(), 2.0)
+        self.assertAlmostEqual(self.pacer.repeat_delay(0.1), 2.0)
+        self.pool.load.return_value = 100.0
+        self.assertEqual(self.pacer.new_audio_needed(), PassPacer.MAX_NEW_AUDIO)
+
+    def test_worker_pool_load(self):
+        pool = TranscriptionWorkerPool(num_workers=2)
+        try:
+            self.assertEqual(pool.load(), 0.0)
+            with pool.cond:
+                pool.running.add(FakeSession())
+                pool.queued[FakeSession()] = 0.0
+            self.assertEqual(pool.load(), 1.0)
+        finally:
+            pool.shutdown()
+
+
+class TestLanguageDetection(unittest.TestCase):
+    def setUp(self):
+        def create_model(client, device):
+            client.transcriber = mock.MagicMock(feature_extractor=FeatureExtractor())
+
+        self.websocket = mock.MagicMock()
+        with mock.patch.object(ServeClientFasterWhisper, "create_model", create_model):
+            self.client = ServeClientFasterWhisper(
+                self.websocket, model="small", use_vad=False, worker_pool=mock.MagicMock(**{"load.return_value": 0.0})
+            )
+
+    def detect(self, language, probability):
+        self.client.set_language(SimpleNamespace(language=language, language_probability=probability))
+        return self.client.language
+
+    def test_confident_language_is_used(self):
+        self.assertIsNone(self.detect("de", 0.3))
+        self.assertEqual(self.detect("fr", 0.9), "fr")
+        self.assertEqual(json.loads(self.websocket.send.call_args[0][0])["language"], "fr")
+
+    def test_most_likely_language_is_used_after_bounded_passes(self):
+        for language, probability in [("de", 0.3), ("fr", 0.45), ("de", 0.4), ("de", 0.35)]:
+            self.assertIsNone(self.detect(language, probability))
+        self.assertEqual(self.detect("de", 0.2), "fr")
+
+    def test_window_is_decoded_once_the_language_is_known(self):
+        transcriber = self.client.transcriber
+        transcriber.transcribe.return_value = (["segment"], None)
+        features = np.zeros((80, 101), dtype=np.float32)
+        audio = np.zeros(16000, dtype=np.float32)
+        with mock.patch.object(self.client, "prepare_features", return_value=(features, None, 0)):
+            transcriber.detect_language_from_encoder_output.return_value = ("de", 0.3, [])
+            self.assertEqual(self.client.transcribe_audio(audio), [])
+            transcriber.transcribe.assert_not_called()
+
+            transcriber.detect_language_from_encoder_output.return_value = ("fr", 0.9, [])
+            self.assertEqual(self.client.transcribe_audio(audio), ["segment"])
+        self.assertEqual(transcriber.encode_first_window.call_count, 2)
+        transcriber.transcribe.assert_called_once()
+        kwargs = transcriber.transcribe.call_args.kwargs
+        self.assertEqual(kwargs["language"], "fr")
+        self.assertIs(kwargs["encoder_output"], transcriber.encode_first_window.return_value)
+
+
+def make_segment(*words):
+    words = [SimpleNamespace(start=start, end=end, word=word) for start, end, word in words]
+    return SimpleNamespace(
+        start=words[0].start, end=words[-1].end, text="".join(word.word for word in words), no_speech_prob=0.0, words=words
+    )
+
+
+class TestLocalAgreement(unittest.TestCase):
+    def setUp(self):
+        self.client = ServeClientBase("uid", mock.MagicMock())
+
+    def update(self, duration, *words):
+        start = int(self.client.timestamp_offset * self.client.RATE)
+        self.client.last_window = (start, start + int(duration * self.client.RATE))
+        return self.client.update_segments([make_segment(*words)], duration)
+
+    def test_agreed_prefix_is_committed(self):
+        last_segment = self.update(1.5, (0.0, 0.4, " Hello"), (0.5, 0.9, " world"), (1.0, 1.4, " who"))
+        self.assertEqual(last_segment["text"], " Hello world who")
+        self.assertIsNone(self.client.open_segment)
+
+        last_segment = self.update(2.0, (0.0, 0.4, " Hello"), (0.5, 0.9, " world,"), (1.0, 1.2, " how"), (1.3, 1.6, " are"))
+        self.assertEqual(self.client.open_segment, (0.0, 0.4, " Hello"))
+        self.assertEqual(self.client.timestamp_offset, 0.4)
+        self.assertEqual(last_segment["text"], " Hello world, how are")
+        self.assertEqual(last_segment["start"], "0.000")
+
+        self.update(1.8, (0.1, 0.5, " world,"), (0.6, 0.8, " how"), (0.9, 1.4, " are"), (1.5, 1.7, " you"))
+        self.assertEqual(self.client.open_segment[2], " Hello world, how are")
+        self.assertAlmostEqual(self.client.timestamp_offset, 1.8)
+        self.assertEqual(self.client.hypothesis[2], ["you"])
+        self.assertEqual(self.client.transcript, [])
+
+    def test_streamed_sentence_is_one_segment(self):
+        sentence = [(0.0, 0.4, " Hello"), (0.5, 0.9, " world,"), (1.0, 1.2, " how"), (1.3, 1.6, " are"), (1.7, 2.0, " you?")]
+
+        def window(end, words):
+            offset = self.client.timestamp_offset
+            return end - offset, [(start - offset, stop - offset, word) for start, stop, word in words
+                                  if start >= offset and stop <= end]
+
+        for end in (1.0, 1.5, 2.0):
+            duration, words = window(end, sentence)
+            self.update(duration, *words)
+        self.assertEqual(self.client.transcript, [])
+        self.assertEqual(self.client.open_segment[2], " Hello world, how")
+
+        duration, words = window(3.0, sentence)
+        _, next_words = window(3.0, [(2.5, 2.9, " Fine")])
+        start = int(self.client.timestamp_offset * self.client.RATE)
+        self.client.last_window = (start, start + int(duration * self.client.RATE))
+        self.client.update_segments([make_segment(*words), make_segment(*next_words)], duration)
+        self.assertEqual([segment["text"] for segment in self.client.transcript], [" Hello world, how are you?"])
+        self.assertEqual(self.client.transcript[0]["start"], "0.000")
+        self.assertIsNone(self.client.open_segment)
+
+    def test_same_window_is_not_a_second_opinion(self):
+        words = [(0.0, 0.4, " Hello"), (0.5, 0.9, " world")]
+        self.update(1.0, *words)
+        self.update(1.0, *words)
+        self.assertIsNone(self.client.open_segment)
+        self.update(1.5, *words)
+        self.assertEqual(self.client.open_segment[2], " Hello world")
+
+    def test_pause_ends_the_open_segment(self):
+        self.client.open_segment = (0.0, 0.9, " Hello world")
+        self.client.transcribe_audio = mock.MagicMock(return_value=None)
+        self.client.add_frames(np.zeros(self.client.RATE, dtype=np.float32))
+        self.client.process_audio_chunk()
+        self.assertEqual([segment["text"] for segment in self.client.transcript], [" Hello world"])
+        self.assertIsNone(self.client.open_segment)
+
+    def test_falls_back_to_repeated_output_without_words(self):
+        segment = SimpleNamespace(start=0.0, end=1.0, text=" Hello", no_speech_prob=0.0)
+        self.client.same_output_threshold = 2
+        for end in range(1, 5):
+            self.client.last_window = (0, end * self.client.RATE)
+            self.client.update_segments([segment], 1.0)
+        self.assertEqual([segment["text"] for segment in self.client.transcript], [" Hello"])
+
+
+class TestFileMode(unittest.TestCase):
+    def setUp(self):
+        self.websocket = mock.MagicMock()
+        self.pool = mock.MagicMock(**{"load.return_value": 0.0})
+        self.client = ServeClientBase("uid", self.websocket, worker_pool=self.pool, mode="file")
+        self.client.language = "en"
+        self.client.transcribe_audio = mock.MagicMock()
+        self.client.handle_transcription_output = self.client.update_segments
+
+    def add_seconds(self, seconds):
+        self.client.add_frames(np.zeros(int(seconds * self.client.RATE), dtype=np.float32))
+
+    def segment(self, start, end, text):
+        return SimpleNamespace(start=start, end=end, text=text, no_speech_prob=0.0)
+
+    def test_passes_cover_full_windows(self):
+        self.add_seconds(20)
+        self.pool.schedule.assert_not_called()
+        self.add_seconds(15)
+        self.pool.schedule.assert_called_once_with(self.client, 0.0)
+
+        self.client.transcribe_audio.return_value = [
+            self.segment(0, 12, " one"), self.segment(12, 25, " two"), self.segment(25, 30, " thr")
+        ]
+        self.assertIsNone(self.client.process_audio_chunk())
+        self.assertEqual(self.client.transcribe_audio.call_args[0][0].shape[0], 30 * self.client.RATE)
+        self.assertEqual([segment["text"] for segment in self.client.transcript], [" one", " two"])
+        self.assertEqual(self.client.timestamp_offset, 25)
+        credit = json.loads(self.websocket.send.call_args[0][0])["credit"]
+        self.assertEqual(credit, (25 + self.client.BUFFER_DURATION) * self.client.RATE)
+
+    def test_rest_of_audio_is_transcribed_at_the_end(self):
+        self.add_seconds(10)
+        self.client.end_audio()
+        self.client.transcribe_audio.return_value = [self.segment(0, 4, " one"), self.segment(4, 9.5, " two")]
+        self.assertIsNone(self.client.process_audio_chunk())
+        self.assertEqual([segment["text"] for segment in self.client.transcript], [" one", " two"])
+        self.assertTrue(self.client.finished.is_set())
+
+    def test_window_without_speech_is_skipped(self):
+        self.add_seconds(35)
+        self.client.transcribe_audio.return_value = None
+        self.assertEqual(self.client.process_audio_chunk(), None)
+        self.assertEqual(self.client.timestamp_offset, 30)
+
+
+class TestTranscriptEvents(unittest.TestCase):
+    def setUp(self):
+        self.websocket = mock.MagicMock()
+        self.client = ServeClientBase("uid", self.websocket, protocol_version=2)
+
+    def partial(self, text):
+        return self.client.format_segment(0, 1, text)
+
+    def sent_events(self):
+        events = json.loads(self.websocket.send.call_args[0][0])["events"]
+        self.websocket.send.reset_mock()
+        return [(event["event"], event["id"], event.get("revision")) for event in events]
+
+    def test_only_changes_are_sent(self):
+        self.client.send_transcript_update(self.partial("Hello"))
+        self.assertEqual(self.sent_events(), [("partial", 0, 0)])
+        self.client.send_transcript_update(self.partial("Hello"))
+        self.websocket.send.assert_not_called()
+        self.client.send_transcript_update(self.partial("Hello world"))
+        self.assertEqual(self.sent_events(), [("partial", 0, 1)])
+
+        self.client.transcript.append(self.client.format_segment(0, 1, "Hello world.", completed=True))
+        self.client.send_transcript_update(self.partial("How"))
+        self.assertEqual(self.sent_events(), [("final", 0, 2), ("partial", 1, 0)])
+        self.client.send_transcript_update(None)
+        self.assertEqual(self.sent_events(), [("retract", 1, None)])
+        self.client.send_transcript_update(None)
+        self.websocket.send.assert_not_called()
+
+    def test_version_1_resends_last_segments(self):
+        client = ServeClientBase("uid", self.websocket, send_last_n_segments=2)
+        client.transcript = [client.format_segment(i, i + 1, str(i), completed=True) for i in range(3)]
+        client.send_transcript_update(self.partial("3"))
+        client.send_transcript_update(self.partial("3"))
+        self.assertEqual(self.websocket.send.call_count, 2)
+        segments = json.loads(self.websocket.send.call_args[0][0])["segments"]
+        self.assertEqual([segment["text"] for segment in segments], ["1", "2", "3"])
+
+    def test_superseded_partials_are_coalesced(self):
+        queue = OutboundQueue(mock.MagicMock())
+        client = ServeClientBase("uid", queue, protocol_version=2)
+        client.send_transcript_update(self.partial("Hello"))
+        client.send_transcript_update(self.partial("Hello world"))
+        self.assertEqual(len(queue.messages), 1)
+        client.transcript.append(client.format_segment(0, 1, "Hello world.", completed=True))
+        client.send_transcript_update(self.partial("How"))
+        client.send_transcript_update(self.partial("How are"))
+        events = [json.loads(message)["events"] for message in queue.messages]
+        self.assertEqual(
+            [[(event["event"], event["text"]) for event in message] for message in events],
+            [[("partial", "Hello world")], [("final", "Hello world."), ("partial", "How")], [("partial", "How are")]],
+        )
@@ -0,0 +1,199 @@
+import http.client
+import json
+import threading
+import unittest
+import urllib.error
+import urllib.request
+from unittest import mock
+
+import numpy as np
+
+from whisper_live.audio_decoder import decode_audio_file
+from whisper_live.batch_server import BatchJobQueue, BatchTranscriptionServer, JobQueueFull, format_srt, format_vtt
+
+
+SEGMENTS = [
+    {"start": 0.0, "end": 1.5, "text": " Hello there."},
+    {"start": 61.25, "end": 62.0, "text": " Bye."},
+]
+
+
+class TestBatchJobQueue(unittest.TestCase):
+    def test_jobs_beyond_the_queue_are_rejected(self):
+        queue = BatchJobQueue(max_jobs=1, max_queued_jobs=1)
+        started = threading.Event()
+        release = threading.Event()
+
+        def job():
+            with queue.reserve(), queue.admit():
+                started.set()
+                release.wait(5)
+
+        running = threading.Thread(target=job)
+        running.start()
+        started.wait(5)
+        started.clear()
+        queued = threading.Thread(target=job)
+        queued.start()
+        while queue.waiting == 0:
+            release.wait(0.01)
+        with self.assertRaises(JobQueueFull):
+            with queue.reserve():
+                pass
+        self.assertFalse(started.is_set())
+
+        release.set()
+        running.join(5)
+        queued.join(5)
+        self.assertTrue(started.is_set())
+        self.assertEqual((queue.running, queue.waiting), (0, 0))
+
+
+class TestFormats(unittest.TestCase):
+    def test_srt(self):
+        self.assertEqual(
+            format_srt(SEGMENTS),
+            "1\n00:00:00,000 --> 00:00:01,500\nHello there.\n\n2\n00:01:01,250 --> 00:01:02,000\nBye.\n\n",
+        )
+
+    def test_vtt(self):
+        self.assertEqual(
+            format_vtt(SEGMENTS),
+            "WEBVTT\n\n00:00:00.000 --> 00:00:01.500\nHello there.\n\n00:01:01.250 --> 00:01:02.000\nBye.\n\n",
+        )
+
+
+class FakePipeline(object):
+    def __init__(self, model):
+        self.model = model
+
+    def prepare(self, audio):
+        """Stands for the feature extraction the pipeline runs over the whole file before returning."""
+
+    def forward(self, batch):
+        return [mock.MagicMock(start=float(i), end=i + 1.0, text=f" {i}") for i in batch]
+
+    def transcribe(self, audio, language=None, task="transcribe", batch_size=8, clip_timestamps=None):
+        self.prepare(audio)
+
+        def segments():
+            for i in range(0, len(audio), batch_size):
+                yield from self.forward(audio[i:i + batch_size])
+        return segments(), mock.MagicMock(language=language, duration=len(audio))
+
+
+@mock.patch("whisper_live.transcriber.transcriber_faster_whisper.BatchedInferencePipeline", FakePipeline)
+@mock.patch.object(BatchTranscriptionServer, "speech_chunks", return_value=[{"start": 0, "end": 5}])
+class TestRunPipeline(unittest.TestCase):
+    def setUp(self):
+        self.worker_pool = mock.MagicMock(**{"load.return_value": 0.0})
+        self.server = BatchTranscriptionServer(model_pool=mock.MagicMock(), worker_pool=self.worker_pool, batch_size=2)
+        self.replica = mock.MagicMock(lock=threading.Lock())
+        self.held = []
+
+    def record_lock(self, *args, **kwargs):
+        self.held.append(self.replica.lock.locked())
+
+    def test_replica_is_held_for_one_batch_at_a_time(self, speech_chunks):
+        self.replica.model.model.is_multilingual = False
+        forward = FakePipeline.forward
+
+        def forward_checking_lock(pipeline, batch):
+            self.record_lock()
+            return forward(pipeline, batch)
+
+        with mock.patch.object(FakePipeline, "forward", forward_checking_lock), \
+                mock.patch.object(FakePipeline, "prepare", self.record_lock):
+            result = self.server.run_pipeline(self.replica, list(range(5)), None, "transcribe")
+        self.assertEqual(self.held, [False, True, True, True])
+        self.assertFalse(self.replica.lock.locked())
+        self.assertEqual(result["language"], "en")
+        self.assertEqual([segment["text"] for segment in result["segments"]], [" 0", " 1", " 2", " 3", " 4"])
+        self.assertEqual(self.worker_pool.load.call_count, 3)
+
+    def test_replica_is_held_for_language_detection_only(self, speech_chunks):
+        model = self.replica.model
+        model.model.is_multilingual = True
+        model.model.n_mels = 80
+        model.feature_extractor.nb_max_frames = 3000
+        model.feature_extractor.side_effect = lambda audio: (self.record_lock(), np.zeros((80, 11)))[1]
+
+        def detect_language(features):
+            self.record_lock()
+            self.assertEqual(features.shape, (80, 11))
+            return "de", 0.9, []
+
+        model.detect_language.side_effect = detect_language
+        result = self.server.run_pipeline(self.replica, np.zeros(5, dtype=np.float32), None, "transcribe")
+        self.assertEqual(self.held, [False, True])
+        self.assertEqual(result["language"], "de")
+
+
+class TestBatchEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.server = BatchTranscriptionServer(model_pool=mock.MagicMock())
+        self.server.transcribe = mock.MagicMock(return_value={"language": "en", "duration": 62.0, "segments": SEGMENTS})
+        self.server.serve("127.0.0.1", 0)
+        self.url = f"http://127.0.0.1:{self.server.httpd.server_address[1]}/v1/audio/transcriptions"
+
+    def tearDown(self):
+        self.server.shutdown()
+
+    def post(self, url, body, content_type="application/octet-stream"):
+        request = urllib.request.Request(url, data=body, headers={"Content-Type": content_type})
+        try:
+            with urllib.request.urlopen(request, timeout=5) as response:
+                return response.status, response.read().decode()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read().decode()
+
+    def test_raw_upload_returns_json(self):
+        status, body = self.post(self.url + "?language=en", b"audio")
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)["text"], "Hello there. Bye.")
+        self.server.transcribe.assert_called_with(b"audio", model=None, language="en", task="transcribe")
+
+    def test_multipart_upload_returns_vtt(self):
+        boundary = "XyZ"
+        body = (
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"response_format\"\r\n\r\nvtt\r\n"
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a.wav\"\r\n"
+            f"Content-Type: audio/wav\r\n\r\n"
+        ).encode() + b"\x00\xffRIFF\r\n" + f"\r\n--{boundary}--\r\n".encode()
+        status, text = self.post(self.url, body, f"multipart/form-data; boundary={boundary}")
+        self.assertEqual(status, 200)
+        self.assertTrue(text.startswith("WEBVTT"))
+        self.assertEqual(self.server.transcribe.call_args[0][0], b"\x00\xffRIFF\r\n")
+
+    def test_errors(self):
+        self.assertEqual(self.post(self.url + "?response_format=docx", b"audio")[0], 400)
+        self.assertEqual(self.post(self.url, b"")[0], 400)
+        self.server.transcribe.side_effect = ValueError("Invalid audio file")
+        self.assertEqual(self.post(self.url, b"audio")[0], 400)
+
+        # the size is checked before the body is read
+        connection = http.client.HTTPConnection(*self.server.httpd.server_address, timeout=5)
+        connection.putrequest("POST", "/v1/audio/transcriptions")
+        connection.putheader("Content-Length", str(BatchTranscriptionServer.MAX_UPLOAD_BYTES + 1))
+        connection.endheaders()
+        self.assertEqual(connection.getresponse().status, 413)
+        connection.close()
+
+    def test_full_queue_rejects_before_the_upload(self):
+        self.server.job_queue = BatchJobQueue(max_jobs=1, max_queued_jobs=0)
+        with self.server.job_queue.reserve():
+            self.assertEqual(self.post(self.url, b"audio")[0], 503)
+        self.server.transcribe.assert_not_called()
+        self.assertEqual(self.post(self.url, b"audio")[0], 200)
+
+
+class TestDecodeAudioFile(unittest.TestCase):
+    def test_decode_flac(self):
+        with open("assets/jfk.flac", "rb") as f:
+            audio = decode_audio_file(f.read())
+        self.assertEqual(audio.dtype.name, "float32")
+        self.assertAlmostEqual(len(audio) / 16000, 11.0, delta=0.1)
+
+    def test_invalid_file(self):
+        with self.assertRaises(ValueError):
+            decode_audio_file(b"not audio")
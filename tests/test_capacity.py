@@ -0,0 +1,102 @@
+import unittest
+from unittest import mock
+
+from whisper_live.capacity import CapacityModel
+from whisper_live.server import ClientManager, TranscriptionServer
+
+
+def measured_session(load, elapsed=60.0):
+    session = mock.MagicMock()
+    session.compute_load.return_value = (load, elapsed)
+    return session
+
+
+class TestCapacityModel(unittest.TestCase):
+    def fill(self, capacity, model, load):
+        """Admit sessions of a model costing `load` until the capacity model turns one away."""
+        admitted = 0
+        websocket = object()
+        while admitted < 100 and capacity.reserve(websocket, model):
+            capacity.start(websocket, measured_session(load))
+            admitted += 1
+            websocket = object()
+        return admitted
+
+    def test_capacity_follows_the_measured_cost_of_the_model(self):
+        large = CapacityModel(num_workers=4, target_utilization=0.8)
+        large.session_loads["large-v3"] = 0.5
+        self.assertEqual(self.fill(large, "large-v3", 0.5), 6)
+        tiny = CapacityModel(num_workers=4, target_utilization=0.8)
+        tiny.session_loads["tiny.en"] = 0.05
+        self.assertEqual(self.fill(tiny, "tiny.en", 0.05), 64)
+
+    def test_sessions_of_a_shared_model_fit_its_replicas(self):
+        capacity = CapacityModel(num_workers=8, target_utilization=0.8, replicas=1)
+        first, second = object(), object()
+        self.assertTrue(capacity.reserve(first, "small"))
+        capacity.start(first, measured_session(0.5))
+        self.assertFalse(capacity.reserve(second, "small"))
+        self.assertTrue(capacity.reserve(second, "medium"))
+
+    def test_unmeasured_model_is_admitted_a_few_sessions_at_a_time(self):
+        capacity = CapacityModel(num_workers=32, target_utilization=0.8)
+        websockets = [object() for _ in range(CapacityModel.MAX_UNMEASURED_SESSIONS)]
+        for websocket in websockets:
+            self.assertTrue(capacity.reserve(websocket, "large-v3"))
+            capacity.start(websocket, measured_session(0.0, elapsed=1.0))
+        self.assertFalse(capacity.reserve(object(), "large-v3"))
+        self.assertTrue(capacity.reserve(object(), "small"))
+
+        # once a session of the model is measured, its cost decides
+        capacity.start(websockets[0], measured_session(0.5))
+        self.assertTrue(capacity.reserve(object(), "large-v3"))
+
+    def test_idle_server_admits_a_costly_session(self):
+        capacity = CapacityModel(num_workers=1, target_utilization=0.8)
+        capacity.session_loads["large-v3"] = 2.0
+        self.assertTrue(capacity.reserve(object(), "large-v3"))
+
+    def test_ended_sessions_set_the_expected_cost(self):
+        capacity = CapacityModel(num_workers=1)
+        self.assertEqual(capacity.expected_load("small"), CapacityModel.DEFAULT_SESSION_LOAD)
+        websocket = object()
+        capacity.reserve(websocket, "small")
+        capacity.start(websocket, measured_session(0.4))
+        self.assertAlmostEqual(capacity.expected_load("small"), 0.4)
+        capacity.release(websocket)
+        self.assertAlmostEqual(capacity.expected_load("small"), 0.4)
+        self.assertEqual(capacity.sessions, {})
+
+        # a session too short to be measured is charged the expected cost and not recorded
+        websocket = object()
+        capacity.reserve(websocket, "small")
+        capacity.start(websocket, measured_session(0.0, elapsed=1.0))
+        self.assertAlmostEqual(capacity.utilization(), 0.4)
+        capacity.release(websocket)
+        self.assertAlmostEqual(capacity.expected_load("small"), 0.4)
+
+    def test_client_manager_admits_within_capacity(self):
+        capacity = CapacityModel(num_workers=1, target_utilization=0.8)
+        capacity.session_loads["small"] = 0.5
+        client_manager = ClientManager(max_clients=None, capacity_model=capacity)
+        websocket = mock.MagicMock()
+        self.assertTrue(client_manager.admit(websocket, model="small"))
+        client_manager.add_client(websocket, measured_session(0.5))
+        self.assertFalse(client_manager.admit(mock.MagicMock(), model="small"))
+        client_manager.remove_client(websocket)
+        self.assertTrue(client_manager.admit(mock.MagicMock(), model="small"))
+
+
+class TestServerLimits(unittest.TestCase):
+    def test_client_cannot_set_the_limits(self):
+        server = TranscriptionServer()
+        server.backend = mock.MagicMock()
+        server.backend.is_tensorrt.return_value = False
+        server.max_clients = 2
+        server.parse_options(mock.MagicMock(), '{"uid": "a", "max_clients": 100, "max_connection_time": 3600}')
+        self.assertEqual(server.client_manager.max_clients, 2)
+        self.assertEqual(server.client_manager.max_connection_time, 600)
+
+
+if __name__ == "__main__":
+    unittest.main()
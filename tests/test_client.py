@@ -1,5 +1,7 @@
 import json
 import os
+import threading
+import numpy as np
 import scipy
 import websocket
 import copy
@@ -55,6 +57,10 @@ class TestClientCallbacks(BaseTestCase):
             "no_speech_thresh": 0.45,
             "clip_audio": False,
             "same_output_threshold": 10,
+            "audio_format": "int16",
+            "protocol_version": 2,
+            "target_latency_ms": None,
+            "mode": "live",
         })
         self.client.on_open(self.mock_ws_app)
         self.mock_ws_app.send.assert_called_with(expected_message)
@@ -83,6 +89,40 @@ class TestClientCallbacks(BaseTestCase):
         self.assertEqual(len(self.client.transcript), 3)
         self.assertEqual(self.client.transcript[1]['text'], "Test transcript 2")
 
+    def test_on_message_with_events(self):
+        self.client.on_message(self.mock_ws_app, json.dumps(
+            {"uid": self.client.uid, "message": "SERVER_READY", "backend": "faster_whisper"}
+        ))
+        self.client.transcription_callback = MagicMock()
+
+        def send_events(*events):
+            self.client.on_message(self.mock_ws_app, json.dumps({"uid": self.client.uid, "events": list(events)}))
+            return self.client.transcription_callback.call_args[0][0]
+
+        segment = {"start": "0.000", "end": "1.000"}
+        self.assertEqual(send_events(dict(segment, event="partial", id=0, revision=0, text="Test")), "Test")
+        text = send_events(
+            dict(segment, event="final", id=0, revision=1, text="Test transcript", completed=True),
+            dict(segment, event="partial", id=1, revision=0, text="Test 2"),
+        )
+        self.assertEqual(text, "Test transcript Test 2")
+        self.assertEqual(send_events({"event": "retract", "id": 1}), "Test transcript")
+        self.assertEqual([segment["text"] for segment in self.client.transcript], ["Test transcript"])
+        self.assertIsNone(self.client.last_segment)
+
+    def test_audio_is_sent_within_credit(self):
+        self.client.recording = True
+        self.client.on_message(self.mock_ws_app, json.dumps({"uid": self.client.uid, "credit": 6000}))
+        self.assertTrue(self.client.wait_for_credit(4096))
+        waiter = threading.Thread(target=self.client.wait_for_credit, args=(4096,))
+        waiter.start()
+        waiter.join(0.05)
+        self.assertTrue(waiter.is_alive())
+        self.client.on_message(self.mock_ws_app, json.dumps({"uid": self.client.uid, "credit": 8192}))
+        waiter.join(1)
+        self.assertFalse(waiter.is_alive())
+        self.assertEqual(self.client.sent_samples, 8192)
+
     def test_on_close(self):
         close_status_code = 1000
         close_msg = "Normal closure"
@@ -149,6 +189,17 @@ class TestTee(BaseTestCase):
         self.client2.client_socket.send.assert_not_called()
         self.client3.client_socket.send.assert_called_with(self.mock_audio_packet, websocket.ABNF.OPCODE_BINARY)
 
+    def test_multicast_audio_in_each_clients_format(self):
+        self.client2.recording = True
+        self.client3.recording = True
+        self.client3.audio_format = "float32"
+        audio = np.array([0, 16384, -32768], dtype=np.int16)
+        self.tee.multicast_audio(audio)
+        self.client2.client_socket.send.assert_called_with(audio.tobytes(), websocket.ABNF.OPCODE_BINARY)
+        self.client3.client_socket.send.assert_called_with(
+            np.array([0.0, 0.5, -1.0], dtype=np.float32).tobytes(), websocket.ABNF.OPCODE_BINARY
+        )
+
     def test_close_all(self):
         self.tee.close_all_clients()
         for client in self.tee.clients:
@@ -0,0 +1,183 @@
+import asyncio
+import functools
+import json
+import threading
+import types
+import unittest
+
+import numpy as np
+from websockets.sync.client import connect
+from websockets.sync.server import serve
+
+from whisper_live.admission import AdmissionQueue
+from whisper_live.backend.base import ServeClientBase
+from whisper_live.backend.model_pool import ModelEntry, ModelPool, ModelReplica
+from whisper_live.backend.worker_pool import TranscriptionWorkerPool
+from whisper_live.gateway import ServerInstance, SessionGateway
+from whisper_live.server import BackendType, TranscriptionServer
+
+
+class EchoSession(ServeClientBase):
+    def transcribe_audio(self, input_sample):
+        return [types.SimpleNamespace(start=0, end=1, text=f" {self.server_name}", no_speech_prob=0.0)]
+
+    def handle_transcription_output(self, result, duration):
+        self.send_transcript_update(self.update_segments(result, duration))
+
+
+def start_server(name, models=()):
+    """Start a transcription server whose sessions transcribe everything as `name`."""
+    server = TranscriptionServer()
+    server.max_clients = 1
+    server.worker_pool = TranscriptionWorkerPool(1)
+    server.model_pool = ModelPool()
+    for model in models:
+        entry = ModelEntry((model, "cpu", "int8"))
+        entry.replicas = [ModelReplica(object())]
+        server.model_pool.entries[entry.key] = entry
+
+    def initialize_client(websocket, options, *args, **kwargs):
+        session = EchoSession(options["uid"], server.create_outbound_queue(websocket), worker_pool=server.worker_pool)
+        session.server_name = name
+        session.language = "en"
+        session.websocket.send(json.dumps({"uid": options["uid"], "message": "SERVER_READY"}))
+        server.client_manager.add_client(websocket, session)
+
+    server.initialize_client = initialize_client
+    listener = serve(
+        functools.partial(server.recv_audio, backend=BackendType.FASTER_WHISPER), "localhost", 0,
+        process_request=server.process_request,
+    )
+    threading.Thread(target=listener.serve_forever, daemon=True).start()
+    return server, listener, f"localhost:{listener.socket.getsockname()[1]}"
+
+
+class TestRank(unittest.TestCase):
+    def test_model_affinity_then_fewest_sessions(self):
+        gateway = SessionGateway(["a:1", "b:1", "c:1", "d:1"])
+        reports = [
+            {"active_sessions": 0, "max_clients": 4, "load": 0.0, "loaded_models": []},
+            {"active_sessions": 2, "max_clients": 4, "load": 0.5, "loaded_models": ["small"]},
+            {"active_sessions": 4, "max_clients": 4, "load": 0.0, "loaded_models": ["small"]},
+            None,
+        ]
+        for instance, report in zip(gateway.instances, reports):
+            instance.report = report
+        # the full server only comes last, as it can still queue the session
+        self.assertEqual([i.address for i in gateway.rank("small")], ["b:1", "a:1", "c:1"])
+        self.assertEqual([i.address for i in gateway.rank("large-v3")], ["a:1", "b:1", "c:1"])
+        gateway.instances[0].placed = 3
+        self.assertEqual([i.address for i in gateway.rank("large-v3")], ["b:1", "a:1", "c:1"])
+
+    def test_utilization_ranks_and_fills_servers(self):
+        gateway = SessionGateway(["a:1", "b:1", "c:1"])
+        reports = [
+            {"active_sessions": 2, "max_clients": None, "utilization": 0.6, "target_utilization": 0.8},
+            {"active_sessions": 8, "max_clients": None, "utilization": 0.2, "target_utilization": 0.8},
+            {"active_sessions": 1, "max_clients": None, "utilization": 0.9, "target_utilization": 0.8},
+        ]
+        for instance, report in zip(gateway.instances, reports):
+            instance.report = report
+        self.assertTrue(gateway.instances[2].is_full())
+        self.assertEqual([i.address for i in gateway.rank()], ["b:1", "a:1", "c:1"])
+        # a session placed since the report is assumed to cost as much as the reported ones
+        gateway.instances[0].placed = 1
+        self.assertAlmostEqual(gateway.instances[0].utilization(), 0.9)
+        self.assertTrue(gateway.instances[0].is_full())
+
+    def test_unknown_limit_is_not_full(self):
+        instance = ServerInstance("a:1")
+        instance.report = {"active_sessions": 10, "max_clients": None}
+        self.assertFalse(instance.is_full())
+
+
+class TestGateway(unittest.TestCase):
+    def setUp(self):
+        self.servers = [start_server("a"), start_server("b", models=["small"])]
+        self.gateway = SessionGateway([address for _, _, address in self.servers], poll_interval=0.05)
+        self.loop = asyncio.new_event_loop()
+        self.port = None
+        started = threading.Event()
+
+        async def run():
+            from websockets.asyncio.server import serve as serve_asyncio
+            self.stop = asyncio.Event()
+            poller = asyncio.create_task(self.gateway.poll_forever())
+            async with serve_asyncio(self.gateway.handle, "localhost", 0) as server:
+                self.port = server.sockets[0].getsockname()[1]
+                started.set()
+                await self.stop.wait()
+            poller.cancel()
+
+        self.thread = threading.Thread(target=self.loop.run_until_complete, args=(run(),), daemon=True)
+        self.thread.start()
+        started.wait(5)
+        while not all(instance.available for instance in self.gateway.instances):
+            started.wait(0.01)
+
+    def tearDown(self):
+        self.loop.call_soon_threadsafe(self.stop.set)
+        self.thread.join(5)
+        for server, listener, _ in self.servers:
+            listener.shutdown()
+            server.worker_pool.shutdown()
+
+    def open_session(self, uid):
+        websocket = connect(f"ws://localhost:{self.port}")
+        websocket.send(json.dumps({"uid": uid, "model": "small", "use_vad": False}))
+        return websocket, json.loads(websocket.recv(timeout=5))
+
+    def transcribe(self, websocket):
+        websocket.send(np.zeros(16000, dtype=np.float32).tobytes())
+        while True:
+            message = json.loads(websocket.recv(timeout=5))
+            if "segments" in message:
+                return message["segments"][0]["text"]
+
+    def test_sessions_are_placed_by_model_then_load_and_proxied(self):
+        first, reply = self.open_session("1")
+        self.assertEqual(reply["message"], "SERVER_READY")
+        self.assertEqual(self.transcribe(first), " b")
+
+        # "b" is full, which the gateway may not know yet, and turns the session away
+        second, reply = self.open_session("2")
+        self.assertEqual(reply["message"], "SERVER_READY")
+        self.assertEqual(self.transcribe(second), " a")
+
+        third, reply = self.open_session("3")
+        self.assertEqual((reply["uid"], reply["status"]), ("3", "WAIT"))
+        for websocket in (first, second, third):
+            websocket.close()
+
+    def test_queued_session_is_placed_on_a_server_with_a_free_slot(self):
+        for server, _, _ in self.servers:
+            server.admission_queue = AdmissionQueue(max_size=4, timeout=60)
+        # "b" keeps reporting no session, so the gateway only learns it is full from its QUEUED reply
+        server_b, _, _ = self.servers[1]
+        report = server_b.load_report()
+        server_b.load_report = lambda: report
+
+        first, reply = self.open_session("1")
+        self.assertEqual(self.transcribe(first), " b")
+        second, reply = self.open_session("2")
+        self.assertEqual(reply["message"], "SERVER_READY")
+        self.assertEqual(self.transcribe(second), " a")
+
+        # every server is full, the session waits in a queue and is admitted once a slot frees
+        third, reply = self.open_session("3")
+        self.assertEqual((reply["uid"], reply["status"]), ("3", "QUEUED"))
+        first.close()
+        second.close()
+        while reply.get("message") != "SERVER_READY":
+            reply = json.loads(third.recv(timeout=5))
+        self.assertIn(self.transcribe(third), (" a", " b"))
+        third.close()
+
+    def test_load_report(self):
+        server, _, _ = self.servers[1]
+        first, _ = self.open_session("1")
+        report = server.load_report()
+        self.assertEqual(report["active_sessions"], 1)
+        self.assertEqual(report["max_clients"], 1)
+        self.assertEqual(report["loaded_models"], ["small"])
+        first.close()
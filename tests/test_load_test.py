@@ -0,0 +1,79 @@
+import json
+import threading
+import unittest
+
+import numpy as np
+from websockets.sync.server import serve
+
+from whisper_live.load_test import LoadTestSession, decode_audio, run_load_test
+
+
+class FakeServer(object):
+    """Answers every second of received audio with a completed segment ending at that second."""
+
+    def __init__(self, full=False):
+        self.full = full
+        self.server = serve(self.handle, "localhost", 0)
+        self.port = self.server.socket.getsockname()[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def handle(self, websocket):
+        options = json.loads(websocket.recv())
+        if self.full:
+            websocket.send(json.dumps({"uid": options["uid"], "status": "WAIT", "message": 1.0}))
+            return
+        websocket.send(json.dumps({"uid": options["uid"], "message": "SERVER_READY", "backend": "faster_whisper"}))
+        received = 0
+        segments = []
+        for frame in websocket:
+            if frame == b"END_OF_AUDIO":
+                return
+            received += len(frame) // np.dtype(options["audio_format"]).itemsize
+            if received // 16000 > len(segments):
+                end = len(segments) + 1
+                segments.append({"start": f"{end - 1:.3f}", "end": f"{end:.3f}", "text": str(end), "completed": True})
+                websocket.send(json.dumps({"uid": options["uid"], "segments": segments}))
+
+    def close(self):
+        self.server.shutdown()
+        self.thread.join()
+
+
+class TestLoadTest(unittest.TestCase):
+    def setUp(self):
+        self.audio = np.zeros(3 * 16000, dtype=np.float32)
+
+    def test_session_times_results(self):
+        server = FakeServer()
+        session = LoadTestSession(self.audio, port=server.port, speed=0, drain_timeout=0.2)
+        session.run()
+        server.close()
+        self.assertEqual(session.status, "completed", session.error)
+        self.assertIsNotNone(session.first_partial)
+        self.assertEqual(len(session.final_latencies), 3)
+        self.assertEqual(len(session.lags), 3)
+
+    def test_report_counts_waits(self):
+        server = FakeServer(full=True)
+        report = run_load_test(self.audio, 2, port=server.port, speed=0, drain_timeout=0.2)
+        server.close()
+        self.assertEqual(report["waits"], 2)
+        self.assertEqual(report["wait_rate"], 1.0)
+        self.assertEqual(report["time_to_first_partial"]["count"], 0)
+        json.dumps(report)
+
+    def test_decode_audio(self):
+        audio = decode_audio("assets/jfk.flac")
+        self.assertEqual(audio.dtype, np.float32)
+        self.assertAlmostEqual(audio.shape[0] / 16000, 11, delta=0.1)
+
+    def test_transcript_events(self):
+        session = LoadTestSession(self.audio, speed=0)
+        session.stream_start = 0.0
+        session.sent_ends, session.sent_times = [1.0, 2.0], [1.0, 2.0]
+        segment = {"start": "0.000", "end": "1.000", "text": "one"}
+        session.handle_message({"events": [dict(segment, event="partial", id=0, revision=0)]}, 1.5)
+        session.handle_message({"events": [dict(segment, event="final", id=0, revision=1)]}, 2.5)
+        self.assertEqual(session.first_partial, 1.5)
+        self.assertEqual(session.final_latencies, [1.5])
@@ -0,0 +1,68 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from whisper_live.outbound_queue import OutboundQueue
+
+
+class FakeAsyncWebSocket(object):
+    def __init__(self):
+        self.sent = []
+        self.closed = False
+
+    async def send(self, message):
+        await asyncio.sleep(0)
+        self.sent.append(message)
+
+    async def close(self):
+        self.closed = True
+
+
+class TestOutboundQueue(unittest.TestCase):
+    def test_only_latest_partial_is_kept(self):
+        queue = OutboundQueue(mock.MagicMock())
+        for message, partial in [("a", True), ("b", True), ("final", False), ("c", True), ("d", True)]:
+            queue.send(message, partial=partial)
+        self.assertEqual(list(queue.messages), ["b", "final", "d"])
+        self.assertEqual(queue.queued_bytes, len("b") + len("final") + len("d"))
+
+    def test_messages_are_sent_in_order_and_connection_closed(self):
+        websocket = mock.MagicMock()
+        queue = OutboundQueue(websocket)
+        queue.start()
+        queue.send("one")
+        queue.send("two", partial=True)
+        queue.close()
+        self.assertTrue(queue.wait_drained())
+        self.assertEqual([call.args[0] for call in websocket.send.call_args_list], ["one", "two"])
+        websocket.close.assert_called_once()
+        queue.send("three")
+        self.assertEqual(websocket.send.call_count, 2)
+
+    def test_slow_client_is_disconnected(self):
+        websocket = mock.MagicMock()
+        queue = OutboundQueue(websocket, max_bytes=10)
+        queue.send("final 1")
+        queue.send("final 2")
+        self.assertTrue(queue.overflowed)
+        self.assertEqual(len(queue.messages), 0)
+        queue.start()
+        self.assertTrue(queue.wait_drained())
+        websocket.send.assert_not_called()
+        websocket.close.assert_called_once()
+
+    def test_drained_on_event_loop(self):
+        websocket = FakeAsyncWebSocket()
+
+        async def run():
+            queue = OutboundQueue(websocket, loop=asyncio.get_running_loop())
+            queue.start()
+            await asyncio.sleep(0)
+            queue.send("one")
+            queue.send("two")
+            queue.close()
+            await asyncio.get_running_loop().run_in_executor(None, queue.wait_drained)
+
+        asyncio.run(run())
+        self.assertEqual(websocket.sent, ["one", "two"])
+        self.assertTrue(websocket.closed)
@@ -1,4 +1,7 @@
+import asyncio
+import multiprocessing
 import subprocess
+import threading
 import time
 import json
 import unittest
@@ -8,7 +11,11 @@ import numpy as np
 import jiwer
 
 from websockets.exceptions import ConnectionClosed
-from whisper_live.server import TranscriptionServer, BackendType, ClientManager
+from whisper_live.server import TranscriptionServer, BackendType, ClientManager, AsyncWebSocketAdapter
+from whisper_live.admission import AdmissionQueue
+from whisper_live.capacity import CapacityModel
+from whisper_live.metrics import ServerMetrics
+from whisper_live.process_pool import ServerProcessPool, SharedSessionTable
 from whisper_live.client import Client, TranscriptionClient, TranscriptionTeeClient
 from whisper.normalizers import EnglishTextNormalizer
 
@@ -39,6 +46,131 @@ class TestGetWaitTime(unittest.TestCase):
         self.assertAlmostEqual(self.server.client_manager.get_wait_time(), expected_wait_time, places=2)
 
 
+class TestSharedSessions(unittest.TestCase):
+    def test_limit_holds_across_processes(self):
+        sessions = SharedSessionTable(capacity=8)
+        process = ServerProcessPool(lambda index: sessions.reserve(2), 1)
+        process.start(0)
+        process.processes[0].join(5)
+        self.assertEqual(len(sessions.session_start_times()), 1)
+
+        managers = [ClientManager(max_clients=2, shared_sessions=sessions) for _ in range(2)]
+        websocket = mock.MagicMock()
+        self.assertFalse(managers[0].is_server_full(websocket, {"uid": "a"}))
+        self.assertTrue(managers[1].is_server_full(mock.MagicMock(), {"uid": "b"}))
+        managers[0].remove_client(websocket)
+        self.assertFalse(managers[1].is_server_full(mock.MagicMock(), {"uid": "b"}))
+        self.assertEqual(len(sessions.session_start_times()), 2)
+
+    def test_queued_client_a_process_cannot_place_is_skipped(self):
+        sessions = SharedSessionTable(capacity=8, num_processes=2)
+        queue = AdmissionQueue(max_size=4, timeout=60)
+        saturated = CapacityModel(num_workers=1)
+        saturated.reserve(mock.MagicMock(), "large-v3")
+        saturated.session_loads["large-v3"] = 1.0
+        managers = [
+            ClientManager(max_clients=None, shared_sessions=sessions, admission_queue=queue, capacity_model=capacity)
+            for capacity in (saturated, CapacityModel(num_workers=1))
+        ]
+        first, second = queue.join(), queue.join()
+        self.assertFalse(managers[1].admit(mock.MagicMock(), second, "large-v3"))
+        self.assertFalse(managers[0].admit(mock.MagicMock(), first, "large-v3"))
+        self.assertTrue(managers[1].admit(mock.MagicMock(), second, "large-v3"))
+        queue.leave(second)
+        self.assertEqual(len(queue), 1)
+        self.assertEqual(len(sessions.session_start_times()), 1)
+
+        sessions.publish_utilization(0, 0.8)
+        self.assertAlmostEqual(sessions.utilization(), 0.4)
+
+    def test_dead_process_is_replaced(self):
+        sessions = SharedSessionTable(capacity=8)
+
+        def serve(index):
+            sessions.reserve(4)
+            time.sleep(30)
+
+        pool = ServerProcessPool(serve, 1, sessions)
+        pool.RESTART_DELAY = 0
+        pool.start(0)
+        first = pool.processes[0]
+        while not sessions.session_start_times():
+            time.sleep(0.01)
+        first.kill()
+        with self.assertLogs(level="ERROR"):
+            pool.replace_dead(timeout=5)
+        self.assertIsNot(pool.processes[0], first)
+        self.assertTrue(pool.processes[0].is_alive())
+        # the slot of the dead process is free, the replacement may have taken one of its own since
+        self.assertNotIn(first.pid, list(sessions.owners))
+        pool.stop()
+        pool.join()
+        self.assertFalse(pool.processes[0].is_alive())
+
+
+class TestAdmissionQueue(unittest.TestCase):
+    def setUp(self):
+        self.server = TranscriptionServer()
+        self.queue = AdmissionQueue(max_size=1, timeout=60)
+        self.server.client_manager = ClientManager(max_clients=1, admission_queue=self.queue)
+        self.occupant = mock.MagicMock()
+        self.assertTrue(self.server.client_manager.admit(self.occupant))
+
+    def sent_statuses(self, websocket):
+        return [json.loads(call.args[0]) for call in websocket.send.call_args_list]
+
+    def test_queued_client_is_admitted_when_a_slot_frees(self):
+        websocket = mock.MagicMock()
+        waiting = self.server.wait_for_slot(websocket, {"uid": "a"})
+        self.assertEqual(next(waiting), self.server.QUEUE_POLL_INTERVAL)
+        status = self.sent_statuses(websocket)[-1]
+        self.assertEqual((status["status"], status["position"]), ("QUEUED", 1))
+
+        # a client arriving later cannot overtake the queued one
+        self.assertFalse(self.server.client_manager.admit(mock.MagicMock()))
+        self.server.client_manager.remove_client(self.occupant)
+        with self.assertRaises(StopIteration) as admitted:
+            next(waiting)
+        self.assertTrue(admitted.exception.value)
+        self.assertEqual(len(self.queue), 0)
+
+    def test_client_is_turned_away_when_the_queue_is_full(self):
+        queued = self.server.wait_for_slot(mock.MagicMock(), {"uid": "a"})
+        next(queued)
+        websocket = mock.MagicMock()
+        with self.assertRaises(StopIteration) as admitted:
+            next(self.server.wait_for_slot(websocket, {"uid": "b"}))
+        self.assertFalse(admitted.exception.value)
+        self.assertEqual(self.sent_statuses(websocket)[-1]["status"], "WAIT")
+
+    def test_client_is_turned_away_after_the_timeout(self):
+        self.queue.timeout = 0
+        websocket = mock.MagicMock()
+        with self.assertRaises(StopIteration) as admitted:
+            next(self.server.wait_for_slot(websocket, {"uid": "a"}))
+        self.assertFalse(admitted.exception.value)
+        self.assertEqual(self.sent_statuses(websocket)[-1]["status"], "WAIT")
+        self.assertEqual(len(self.queue), 0)
+
+    def test_wait_time_follows_the_session_durations(self):
+        self.queue.record_session(60)
+        client_manager = self.server.client_manager
+        client_manager.start_times[self.occupant] = time.time()
+        self.assertAlmostEqual(client_manager.get_wait_time(), 1, places=2)
+        self.assertAlmostEqual(client_manager.get_wait_time(position=1), 2, places=2)
+
+    def test_single_process_queue_does_not_need_fork(self):
+        def get_context(method=None):
+            if method == "fork":
+                raise ValueError("cannot find context for 'fork'")
+            return get_default_context(method)
+
+        get_default_context = multiprocessing.get_context
+        with mock.patch("multiprocessing.get_context", side_effect=get_context):
+            queue = AdmissionQueue(max_size=1, timeout=60)
+        self.assertEqual(queue.join(), 1)
+
+
 class TestServerConnection(unittest.TestCase):
     def setUp(self):
         self.server = TranscriptionServer()
@@ -68,6 +200,183 @@ class TestServerConnection(unittest.TestCase):
         self.assertNotIn(mock_websocket, self.server.client_manager.clients)
 
 
+class FakeAsyncWebSocket:
+    def __init__(self, messages):
+        self.messages = list(messages)
+        self.sent = []
+        self.closed = asyncio.Event()
+
+    async def recv(self):
+        if not self.messages:
+            await self.closed.wait()
+            raise ConnectionClosed(None, None)
+        return self.messages.pop(0)
+
+    async def send(self, message):
+        self.sent.append(message)
+
+    async def close(self):
+        self.closed.set()
+
+
+class TestAsyncServerConnection(unittest.TestCase):
+    def setUp(self):
+        self.server = TranscriptionServer()
+
+    def test_adapter_sends_in_order_from_threads(self):
+        async def run():
+            websocket = FakeAsyncWebSocket([])
+            adapter = AsyncWebSocketAdapter(websocket, asyncio.get_running_loop())
+            thread = threading.Thread(target=lambda: [adapter.send(str(i)) for i in range(100)])
+            thread.start()
+            await asyncio.get_running_loop().run_in_executor(None, thread.join)
+            adapter.close()
+            await asyncio.wait_for(websocket.closed.wait(), 1)
+            return websocket.sent
+
+        self.assertEqual(asyncio.run(run()), [str(i) for i in range(100)])
+
+    def test_frames_are_passed_to_the_session(self):
+        options = json.dumps({'uid': 'test_client', 'language': 'en', 'task': 'transcribe', 'model': 'tiny.en'})
+        frame = np.ones(160, dtype=np.float32)
+        websocket = FakeAsyncWebSocket([options, frame.tobytes(), b"END_OF_AUDIO"])
+        session = mock.MagicMock()
+
+        def initialize_client(client_websocket, *args, **kwargs):
+            self.server.client_manager.add_client(client_websocket, session)
+
+        with mock.patch.object(self.server, "initialize_client", side_effect=initialize_client):
+            asyncio.run(self.server.recv_audio_async(websocket, BackendType("faster_whisper")))
+
+        session.add_frames.assert_called_once()
+        np.testing.assert_array_equal(session.add_frames.call_args[0][0], frame)
+        session.cleanup.assert_called_once()
+        self.assertDictEqual(self.server.client_manager.clients, {})
+
+    def test_file_is_transcribed_before_closing(self):
+        options = json.dumps({'uid': 'test_client', 'language': 'en', 'task': 'transcribe', 'mode': 'file'})
+        websocket = FakeAsyncWebSocket([options, np.ones(160, dtype=np.float32).tobytes(), b"END_OF_AUDIO"])
+        session = mock.MagicMock(mode="file", end_of_audio=False, finished=threading.Event())
+        finished_before_cleanup = []
+
+        def end_audio():
+            session.end_of_audio = True
+            threading.Timer(0.05, session.finished.set).start()
+
+        session.end_audio.side_effect = end_audio
+        session.cleanup.side_effect = lambda: finished_before_cleanup.append(session.finished.is_set())
+
+        def initialize_client(client_websocket, *args, **kwargs):
+            self.server.client_manager.add_client(client_websocket, session)
+
+        with mock.patch.object(self.server, "initialize_client", side_effect=initialize_client):
+            asyncio.run(self.server.recv_audio_async(websocket, BackendType("faster_whisper")))
+
+        session.send_credit.assert_called_once()
+        self.assertEqual(finished_before_cleanup, [True])
+
+    def test_connection_closed_before_options(self):
+        websocket = FakeAsyncWebSocket([])
+        websocket.closed.set()
+        with self.assertLogs(level="INFO") as log:
+            asyncio.run(self.server.recv_audio_async(websocket, BackendType("faster_whisper")))
+        self.assertTrue(any("Connection closed by client" in message for message in log.output))
+
+
+class TestAudioFormats(unittest.TestCase):
+    def setUp(self):
+        self.server = TranscriptionServer()
+        self.audio = np.array([0.0, 0.5, -1.0, 0.25], dtype=np.float32)
+
+    def test_frames_are_converted_to_float32(self):
+        frames = {
+            "float32": self.audio.tobytes(),
+            "float16": self.audio.astype(np.float16).tobytes(),
+            "int16": (self.audio * 32768).clip(-32768, 32767).astype(np.int16).tobytes(),
+        }
+        for audio_format, frame in frames.items():
+            audio = self.server.get_audio_from_frame(frame, audio_format)
+            self.assertEqual(audio.dtype, np.float32)
+            np.testing.assert_allclose(audio, self.audio, atol=1e-4)
+        self.assertFalse(self.server.get_audio_from_frame(b"END_OF_AUDIO", "int16"))
+
+    @mock.patch('websockets.WebSocketCommonProtocol')
+    def test_unsupported_format_is_rejected(self, mock_websocket):
+        options = json.dumps({'uid': 'test_client', 'language': 'en', 'task': 'transcribe', 'audio_format': 'mp3'})
+        self.server.backend = BackendType.FASTER_WHISPER
+        self.assertFalse(self.server.setup_connection(mock_websocket, options, None, None, False))
+        response = json.loads(mock_websocket.send.call_args[0][0])
+        self.assertEqual(response["status"], "ERROR")
+        mock_websocket.close.assert_called_once()
+
+    @mock.patch('websockets.WebSocketCommonProtocol')
+    def test_unsupported_encoding_is_rejected(self, mock_websocket):
+        options = json.dumps({'uid': 'test_client', 'language': 'en', 'task': 'transcribe', 'encoding': 'aac'})
+        self.server.backend = BackendType.FASTER_WHISPER
+        self.assertFalse(self.server.setup_connection(mock_websocket, options, None, None, False))
+        response = json.loads(mock_websocket.send.call_args[0][0])
+        self.assertEqual(response["status"], "ERROR")
+
+    @mock.patch('websockets.WebSocketCommonProtocol')
+    def test_file_mode_is_rejected_by_tensorrt(self, mock_websocket):
+        options = json.dumps({'uid': 'test_client', 'language': 'en', 'task': 'transcribe', 'mode': 'file'})
+        self.server.backend = BackendType.TENSORRT
+        self.assertFalse(self.server.setup_connection(mock_websocket, options, None, None, False))
+        response = json.loads(mock_websocket.send.call_args[0][0])
+        self.assertEqual(response["status"], "ERROR")
+
+    def test_compressed_frames_are_decoded(self):
+        websocket = mock.MagicMock()
+        decoder = mock.MagicMock()
+        decoder.decode.return_value = self.audio
+        self.server.audio_decoders[websocket] = decoder
+        self.assertIs(self.server.decode_frame(websocket, b"packet"), self.audio)
+        decoder.decode.assert_called_once_with(b"packet")
+        self.assertFalse(self.server.decode_frame(websocket, b"END_OF_AUDIO"))
+
+
+class TestServerMetrics(unittest.TestCase):
+    def setUp(self):
+        self.server = TranscriptionServer()
+        self.server.backend = BackendType.FASTER_WHISPER
+        self.server.client_manager = ClientManager()
+        self.server.metrics = ServerMetrics(self.server)
+        self.registry = self.server.metrics.registry
+
+    def test_sessions_are_read_on_scrape(self):
+        session = mock.MagicMock(client_uid="test_client")
+        session.pending_audio_duration.return_value = 2.5
+        self.server.client_manager.add_client(mock.MagicMock(), session)
+        self.assertEqual(self.registry.get_sample_value("whisper_live_active_sessions"), 1)
+        self.assertEqual(
+            self.registry.get_sample_value("whisper_live_session_buffered_audio_seconds", {"uid": "test_client"}), 2.5
+        )
+
+    def test_traffic_is_counted(self):
+        websocket = mock.MagicMock()
+        self.server.client_manager.add_client(websocket, mock.MagicMock())
+        self.server.audio_formats[websocket] = "int16"
+        frame = np.zeros(160, dtype=np.int16).tobytes()
+        self.server.handle_audio_frame(websocket, self.server.decode_frame(websocket, frame))
+        # compressed audio is counted as received even before it decodes to any samples
+        decoder = mock.MagicMock()
+        decoder.decode.return_value = np.zeros(0, dtype=np.float32)
+        self.server.audio_decoders[websocket] = decoder
+        self.server.handle_audio_frame(websocket, self.server.decode_frame(websocket, b"packet"))
+        message = json.dumps({"uid": "test_client"})
+        self.server.metrics.wrap(websocket).send(message)
+        self.assertEqual(self.registry.get_sample_value("whisper_live_received_bytes_total"), 320 + len(b"packet"))
+        self.assertEqual(self.registry.get_sample_value("whisper_live_sent_bytes_total"), len(message))
+        websocket.send.assert_called_once()
+
+    def test_passes_are_recorded(self):
+        self.server.metrics.observe_pass("faster_whisper", 0.5, 2.0)
+        labels = {"backend": "faster_whisper"}
+        self.assertEqual(self.registry.get_sample_value("whisper_live_transcription_passes_total", labels), 1)
+        self.assertEqual(self.registry.get_sample_value("whisper_live_inference_seconds_sum", labels), 0.5)
+        self.assertEqual(self.registry.get_sample_value("whisper_live_real_time_factor_sum", labels), 0.25)
+
+
 class TestServerInferenceAccuracy(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
@@ -1,7 +1,13 @@
+import os
+import tempfile
+import threading
 import unittest
+from unittest import mock
 import numpy as np
+from faster_whisper.vad import VadOptions, get_speech_timestamps
+from whisper_live.backend.ring_buffer import RingBuffer
 from whisper_live.transcriber.tensorrt_utils import load_audio
-from whisper_live.vad import VoiceActivityDetector
+from whisper_live.vad import VoiceActivityDetector, VoiceActivityDetection, VADEngine, StreamingVAD
 
 
 class TestVoiceActivityDetection(unittest.TestCase):
@@ -24,3 +30,90 @@ class TestVoiceActivityDetection(unittest.TestCase):
         audio_tensor = load_audio("assets/jfk.flac")
         is_speech_present = self.vad(audio_tensor)
         self.assertTrue(is_speech_present, "VAD failed to identify speech segment.")
+
+    def test_failed_download_raises(self):
+        with tempfile.TemporaryDirectory() as target_dir, \
+                mock.patch("os.path.expanduser", return_value=target_dir), \
+                mock.patch("urllib.request.urlretrieve", side_effect=OSError("unreachable")):
+            with self.assertRaises(RuntimeError):
+                VoiceActivityDetection.download()
+            self.assertEqual(os.listdir(target_dir), [])
+
+
+class TestVADEngine(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.engine = VADEngine(max_batch_size=3)
+        cls.speech = load_audio("assets/jfk.flac")
+
+    def expected_probs(self, audio):
+        length = audio.shape[0] // 512 * 512
+        return VoiceActivityDetection().audio_forward(audio[:length], 16000)[0]
+
+    def stream(self, audio, chunk_size):
+        stream = self.engine.create_stream()
+        probs = [self.engine.score(stream, audio[i:i + chunk_size]) for i in range(0, audio.shape[0], chunk_size)]
+        return np.concatenate(probs)
+
+    def test_streams_are_scored_like_one_signal(self):
+        np.testing.assert_allclose(self.stream(self.speech, 4000), self.expected_probs(self.speech), atol=1e-4)
+
+    def test_concurrent_streams_are_batched(self):
+        audios = [np.roll(self.speech, 16000 * i) for i in range(8)]
+        results = [None] * len(audios)
+
+        def run(i):
+            results[i] = self.stream(audios[i], 4096)
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(len(audios))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for audio, probs in zip(audios, results):
+            np.testing.assert_allclose(probs, self.expected_probs(audio), atol=1e-4)
+
+    def test_detects_speech(self):
+        silence = self.engine.create_stream()
+        self.assertFalse(silence(np.zeros(16000, dtype=np.float32)))
+        speech = self.engine.create_stream()
+        self.assertTrue(speech(self.speech))
+
+
+class TestStreamingVAD(unittest.TestCase):
+    def setUp(self):
+        self.vad = StreamingVAD({"onset": 0.5})
+        self.buffer = RingBuffer(60 * 16000)
+        speech = load_audio("assets/jfk.flac")
+        silence = np.zeros(3 * 16000, dtype=np.float32)
+        self.audio = np.concatenate([silence, speech, silence, silence, speech, silence])
+
+    def stream(self, audio, chunk_size=4096):
+        for i in range(0, audio.shape[0], chunk_size):
+            self.buffer.append(audio[i:i + chunk_size])
+            self.vad.update(self.buffer)
+
+    def test_matches_get_speech_timestamps(self):
+        self.stream(self.audio)
+        self.assertEqual(
+            self.vad.get_speech_timestamps(0, self.buffer.end),
+            get_speech_timestamps(self.audio, VadOptions(onset=0.5)),
+        )
+
+    def test_only_new_windows_are_scored(self):
+        self.stream(self.audio[:16000])
+        self.assertEqual(self.vad.position, 16000 // 512 * 512)
+        self.stream(self.audio[16000:16000 + 1000])
+        self.assertEqual(self.vad.position, 17000 // 512 * 512)
+
+    def test_window_relative_chunks(self):
+        self.stream(self.audio)
+        start = 10 * 16000
+        chunks = self.vad.get_speech_timestamps(start, self.buffer.end)
+        self.assertEqual(chunks[0]["start"], 0)
+        for chunk in chunks:
+            self.assertLessEqual(chunk["end"], self.buffer.end - start)
+
+    def test_silence_has_no_speech(self):
+        self.stream(np.zeros(5 * 16000, dtype=np.float32))
+        self.assertEqual(self.vad.get_speech_timestamps(0, self.buffer.end), [])
@@ -0,0 +1,127 @@
+import multiprocessing
+import time
+
+
+class AdmissionQueue(object):
+    """
+    FIFO of the clients waiting for a session slot of a full server.
+
+    Every queued client holds a ticket, numbered in arrival order, and is admitted once it is the first
+    of the queue and a slot is free. The queue is kept in shared memory, so the server processes started
+    with `--workers` serve one queue. A ticket not given back by its process, e.g. because the process
+    died, expires after the queue timeout.
+
+    With several processes, a slot may be free while the process holding the first ticket has no room for
+    its client, e.g. because its own transcription workers are busy. That process marks the ticket as
+    skipped, so that the clients queued after it in other processes are admitted meanwhile. A skipped ticket
+    keeps its place, and its client is still admitted as soon as its process has room.
+
+    The queue also keeps the moving average of the duration of the sessions that ended, from which the
+    time a queued client still has to wait is estimated.
+    """
+
+    SMOOTHING = 0.2
+    """Weight of the latest session in the moving average of the session duration."""
+
+    def __init__(self, max_size=16, timeout=300, ctx=None):
+        """
+        Args:
+            max_size (int, optional): Clients allowed to wait. Defaults to 16.
+            timeout (float, optional): Seconds a client waits before it is turned away. Defaults to 300.
+            ctx (multiprocessing.context.BaseContext, optional): Context of the server processes sharing the
+                                                                 queue. Defaults to the default context of
+                                                                 the platform, for a single process.
+        """
+        self.max_size = max_size
+        self.timeout = timeout
+        ctx = ctx or multiprocessing.get_context()
+        self.tickets = ctx.Array("q", max(max_size, 1))
+        """Tickets of the waiting clients, 0 for a free entry."""
+        self.expiry = ctx.Array("d", max(max_size, 1), lock=False)
+        self.skipped = ctx.Array("b", max(max_size, 1), lock=False)
+        """Whether the process of every ticket has no room for its client."""
+        self.last_ticket = ctx.Value("q", 0, lock=False)
+        self.session_duration = ctx.Value("d", 0.0, lock=False)
+
+    def join(self):
+        """
+        Returns:
+            int: The ticket of the client, or None if the queue is full.
+        """
+        with self.tickets.get_lock():
+            self.expire()
+            for index, ticket in enumerate(self.tickets):
+                if ticket == 0:
+                    self.last_ticket.value += 1
+                    self.tickets[index] = self.last_ticket.value
+                    self.expiry[index] = time.time() + self.timeout + 1
+                    self.skipped[index] = False
+                    return self.last_ticket.value
+            return None
+
+    def leave(self, ticket):
+        """
+        Args:
+            ticket (int): A ticket returned by `join`.
+        """
+        with self.tickets.get_lock():
+            for index, queued in enumerate(self.tickets):
+                if queued == ticket:
+                    self.tickets[index] = 0
+
+    def skip(self, ticket, skipped=True):
+        """
+        Args:
+            ticket (int): A ticket returned by `join`.
+            skipped (bool, optional): Whether the process of the ticket has no room for its client, so that the
+                                      tickets after it do not wait for it. Defaults to True.
+        """
+        with self.tickets.get_lock():
+            for index, queued in enumerate(self.tickets):
+                if queued == ticket:
+                    self.skipped[index] = skipped
+
+    def expire(self):
+        """Drop the tickets that were never given back. Must be called with the lock held."""
+        now = time.time()
+        for index, ticket in enumerate(self.tickets):
+            if ticket and self.expiry[index] < now:
+                self.tickets[index] = 0
+
+    def position(self, ticket=None):
+        """
+        Args:
+            ticket (int, optional): A ticket returned by `join`, or None for a client that is not queued.
+
+        Returns:
+            int: Number of clients queued before the client and not skipped, 0 for the first one.
+        """
+        with self.tickets.get_lock():
+            self.expire()
+            return sum(
+                1 for index, queued in enumerate(self.tickets)
+                if queued and not self.skipped[index] and (ticket is None or queued < ticket)
+            )
+
+    def __len__(self):
+        with self.tickets.get_lock():
+            self.expire()
+            return sum(1 for queued in self.tickets if queued)
+
+    def record_session(self, duration):
+        """
+        Args:
+            duration (float): Seconds a session that ended was connected.
+        """
+        with self.tickets.get_lock():
+            if self.session_duration.value == 0.0:
+                self.session_duration.value = duration
+            else:
+                self.session_duration.value += self.SMOOTHING * (duration - self.session_duration.value)
+
+    def expected_session_duration(self):
+        """
+        Returns:
+            float: Average seconds a session is connected, or None before any session ended.
+        """
+        return self.session_duration.value or None
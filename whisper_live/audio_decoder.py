@@ -0,0 +1,219 @@
+import io
+import logging
+import threading
+
+import av
+import numpy as np
+
+
+class OpusPacketDecoder(object):
+    """
+    Decodes a stream of raw Opus packets, one packet per message, e.g. the chunks produced by the
+    WebCodecs `AudioEncoder` of a browser.
+    """
+
+    def __init__(self, sample_rate=16000):
+        """
+        Args:
+            sample_rate (int, optional): The sample rate to resample the audio to. Defaults to 16000.
+        """
+        self.codec = av.CodecContext.create("opus", "r")
+        self.codec.sample_rate = 48000
+        self.resampler = av.AudioResampler(format="flt", layout="mono", rate=sample_rate)
+
+    def decode(self, data):
+        """
+        Args:
+            data (bytes): One Opus packet.
+
+        Returns:
+            np.ndarray: The float32 audio decoded from the packet, possibly empty.
+        """
+        return self.resample(self.codec.decode(av.Packet(data)))
+
+    def flush(self):
+        """
+        Returns:
+            np.ndarray: The float32 audio still buffered by the codec and the resampler, at the end of the stream.
+        """
+        audio = self.resample(self.codec.decode(None))
+        tail = [resampled.to_ndarray().reshape(-1) for resampled in self.resampler.resample(None)]
+        return np.concatenate([audio] + tail)
+
+    def resample(self, frames):
+        chunks = []
+        for frame in frames:
+            frame.pts = None
+            for resampled in self.resampler.resample(frame):
+                chunks.append(resampled.to_ndarray().reshape(-1))
+        return np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.float32)
+
+    def close(self):
+        pass
+
+
+class StreamPipe(object):
+    """A file-like object whose `read` blocks until more bytes are written or the pipe is closed."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.closed = False
+        self.condition = threading.Condition()
+
+    def write(self, data):
+        with self.condition:
+            self.buffer += data
+            self.condition.notify()
+
+    def read(self, size=-1):
+        with self.condition:
+            while not self.buffer and not self.closed:
+                self.condition.wait()
+            if size < 0:
+                size = len(self.buffer)
+            data = bytes(self.buffer[:size])
+            del self.buffer[:size]
+            return data
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+
+
+class ContainerStreamDecoder(object):
+    """
+    Demuxes and decodes a WebM or Ogg stream sent in arbitrary chunks, e.g. the blobs of a browser
+    `MediaRecorder`.
+
+    The container cannot be demuxed chunk by chunk, so the bytes are fed through a pipe to a decoding
+    thread and every call to `decode` returns the audio decoded so far. The audio of the last chunks is
+    only returned by `flush`, once the end of the stream lets the decoder finish.
+    """
+
+    FLUSH_TIMEOUT = 5.0
+    """Seconds `flush` waits for the decoding thread to finish the stream."""
+
+    def __init__(self, container_format, sample_rate=16000):
+        """
+        Args:
+            container_format (str): The container of the stream, "webm" or "ogg".
+            sample_rate (int, optional): The sample rate to resample the audio to. Defaults to 16000.
+        """
+        self.container_format = container_format
+        self.sample_rate = sample_rate
+        self.pipe = StreamPipe()
+        self.chunks = []
+        self.error = None
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        resampler = av.AudioResampler(format="flt", layout="mono", rate=self.sample_rate)
+        try:
+            # probe as little as possible so that decoding starts with the first chunks of the stream
+            options = {"probesize": "32", "analyzeduration": "0"}
+            with av.open(self.pipe, format=self.container_format, options=options) as container:
+                for frame in container.decode(audio=0):
+                    frame.pts = None
+                    for resampled in resampler.resample(frame):
+                        self.append(resampled.to_ndarray().reshape(-1))
+            for resampled in resampler.resample(None):
+                self.append(resampled.to_ndarray().reshape(-1))
+        except Exception as e:
+            if not self.pipe.closed:
+                logging.error(f"[ERROR]: Failed to decode {self.container_format} stream: {e}")
+                self.error = e
+
+    def append(self, audio):
+        with self.lock:
+            self.chunks.append(audio)
+
+    def decode(self, data):
+        """
+        Args:
+            data (bytes): The next chunk of the stream.
+
+        Returns:
+            np.ndarray: The float32 audio decoded since the last call, possibly empty.
+
+        Raises:
+            ValueError: If the stream could not be decoded.
+        """
+        if self.error is not None:
+            raise ValueError(f"Invalid {self.container_format} stream: {self.error}")
+        self.pipe.write(data)
+        return self.take()
+
+    def flush(self):
+        """
+        End the stream and wait for the decoding thread to decode the rest of it.
+
+        Returns:
+            np.ndarray: The float32 audio decoded since the last call, up to the end of the stream.
+        """
+        self.pipe.close()
+        self.thread.join(timeout=self.FLUSH_TIMEOUT)
+        if self.thread.is_alive():
+            logging.warning(f"Decoding the end of a {self.container_format} stream timed out.")
+        return self.take()
+
+    def take(self):
+        with self.lock:
+            chunks, self.chunks = self.chunks, []
+        return np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.float32)
+
+    def close(self):
+        self.pipe.close()
+        self.thread.join(timeout=1)
+
+
+DECODERS = {
+    "opus": OpusPacketDecoder,
+    "webm": lambda sample_rate=16000: ContainerStreamDecoder("webm", sample_rate),
+    "ogg": lambda sample_rate=16000: ContainerStreamDecoder("ogg", sample_rate),
+}
+"""Decoders of the compressed encodings a client can send, by the name of the `encoding` option."""
+
+
+def create_decoder(encoding, sample_rate=16000):
+    """
+    Args:
+        encoding (str): One of the keys of `DECODERS`.
+        sample_rate (int, optional): The sample rate to resample the audio to. Defaults to 16000.
+
+    Returns:
+        A decoder with `decode(data)` returning float32 audio, `flush()` returning the audio left at the end of
+        the stream, and `close()`.
+    """
+    return DECODERS[encoding](sample_rate=sample_rate)
+
+
+def decode_audio_file(data, sample_rate=16000):
+    """
+    Decode a complete audio file in any container and codec PyAV can read.
+
+    Args:
+        data (bytes): The content of the file.
+        sample_rate (int, optional): The sample rate to resample the audio to. Defaults to 16000.
+
+    Returns:
+        np.ndarray: The float32 mono audio of the first audio stream.
+
+    Raises:
+        ValueError: If the file could not be decoded.
+    """
+    resampler = av.AudioResampler(format="flt", layout="mono", rate=sample_rate)
+    chunks = []
+    try:
+        with av.open(io.BytesIO(data)) as container:
+            for frame in container.decode(audio=0):
+                frame.pts = None
+                for resampled in resampler.resample(frame):
+                    chunks.append(resampled.to_ndarray().reshape(-1))
+        for resampled in resampler.resample(None):
+            chunks.append(resampled.to_ndarray().reshape(-1))
+    except Exception as e:
+        raise ValueError(f"Invalid audio file: {e}")
+    return np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.float32)
@@ -2,13 +2,34 @@ import json
 import logging
 import threading
 import time
-import numpy as np
+
+from whisper_live.backend.pass_pacer import PassPacer
+from whisper_live.backend.ring_buffer import RingBuffer
+from whisper_live.outbound_queue import OutboundQueue
 
 
 class ServeClientBase(object):
+    BACKEND = None
+    """Name of the backend, used to label the metrics of the session."""
     RATE = 16000
     SERVER_READY = "SERVER_READY"
     DISCONNECT = "DISCONNECT"
+    BUFFER_DURATION = 45
+    """Seconds of audio kept in the session buffer before the oldest audio is dropped."""
+    BUFFER_HEADROOM = 5
+    """Seconds of already dropped audio kept in storage so that views read while new audio arrives, e.g. by the
+    feature cache and the streaming VAD, stay valid."""
+    MIN_CHUNK_DURATION = 0.5
+    """Seconds of untranscribed audio a transcription pass needs at least."""
+    REPEAT_PASS_DELAY = 0.1
+    """Seconds to wait before transcribing the same audio again while its output is being confirmed."""
+    PROTOCOL_VERSIONS = (1, 2)
+    """Versions of the transcript protocol a client can ask for with the `protocol_version` option."""
+    MODES = ("live", "file")
+    """Ways a client can send its audio with the `mode` option: "live" in real time, or "file" as fast as it is
+    transcribed."""
+    FILE_WINDOW = 30
+    """Seconds of audio transcribed by a pass in file mode, the window of Whisper."""
 
     client_uid: str
     """A unique identifier for the client."""
@@ -22,6 +43,16 @@ class ServeClientBase(object):
     """Whether to clip audio with no valid segments."""
     same_output_threshold: int
     """Number of repeated outputs before considering it as a valid segment."""
+    worker_pool: object
+    """The shared pool running the transcription passes, or None to use a dedicated thread."""
+    metrics: object
+    """The metrics of the server to record the transcription passes in, or None."""
+    protocol_version: int
+    """Version of the transcript protocol: 1 sends the last segments on every pass, 2 sends transcript events."""
+    pacer: PassPacer
+    """Decides how much new audio the next pass waits for."""
+    mode: str
+    """How the client sends its audio, one of `MODES`."""
 
     def __init__(
         self,
@@ -31,6 +62,11 @@ class ServeClientBase(object):
         no_speech_thresh=0.45,
         clip_audio=False,
         same_output_threshold=10,
+        worker_pool=None,
+        metrics=None,
+        protocol_version=1,
+        target_latency_ms=None,
+        mode="live",
     ):
         self.client_uid = client_uid
         self.websocket = websocket
@@ -38,11 +74,26 @@ class ServeClientBase(object):
         self.no_speech_thresh = no_speech_thresh
         self.clip_audio = clip_audio
         self.same_output_threshold = same_output_threshold
+        self.worker_pool = worker_pool
+        self.metrics = metrics
+        self.protocol_version = protocol_version
+        self.pacer = PassPacer(target_latency_ms / 1000 if target_latency_ms else None, worker_pool)
+        self.new_audio_needed = self.pacer.new_audio_needed()
+        self.mode = mode
+        self.started = time.monotonic()
+        self.compute_time = 0.0
+        """Seconds the passes of the session ran inference, not counting the waits for a shared model."""
+        self.end_of_audio = False
+        """Whether the client sent all of its audio, in file mode."""
+        self.finished = threading.Event()
+        """Set once all the audio of a client in file mode is transcribed, or the session stops."""
 
-        self.frames = b""
         self.timestamp_offset = 0.0
-        self.frames_np = None
-        self.frames_offset = 0.0
+        self.chunk_start = 0
+        self.audio_buffer = RingBuffer(
+            self.BUFFER_DURATION * self.RATE,
+            headroom=self.BUFFER_HEADROOM * self.RATE,
+        )
         self.text = []
         self.current_out = ""
         self.prev_out = ""
@@ -50,57 +101,230 @@ class ServeClientBase(object):
         self.same_output_count = 0
         self.transcript = []
         self.end_time_for_same_output = None
+        self.sent_segments = 0
+        """Number of completed segments of the transcript already sent to the client."""
+        self.partial = None
+        """Id, revision and content of the incomplete segment last sent, with protocol version 2."""
+        self.last_window = None
+        """Absolute sample indices of the start and end of the audio transcribed by the last pass."""
+        self.last_result = None
+        """Output of the last pass, reused while no new audio arrives."""
+        self.hypothesis = (None, None, [])
+        """Start and end of the window of the last pass and the words of its incomplete segment, to commit the words
+        two passes agree on."""
+        self.open_segment = None
+        """Absolute start, end and text of the words committed so far of a segment that did not end yet."""
 
         # threading
         self.lock = threading.Lock()
+        self.ready = threading.Event()
+        self.trans_thread = None
 
-    def speech_to_text(self):
+    def start_transcription(self):
         """
-        Process an audio stream in an infinite loop, continuously transcribing the speech.
+        Start transcribing the session.
 
-        This method continuously receives audio frames, performs real-time transcription, and sends
-        transcribed segments to the client via a WebSocket connection.
+        With a worker pool, passes are run by the pool whenever the session becomes ready, so
+        nothing needs to be started. Without one, a dedicated thread runs `speech_to_text`.
+        """
+        if self.worker_pool is None:
+            self.trans_thread = threading.Thread(target=self.speech_to_text)
+            self.trans_thread.start()
 
-        If the client's language is not detected, it waits for 30 seconds of audio input to make a language prediction.
-        It utilizes the Whisper ASR model to transcribe the audio, continuously processing and streaming results. Segments
-        are sent to the client in real-time, and a history of segments is maintained to provide context.
+    def notify_ready(self, delay=0.0):
+        """
+        Signal that a transcription pass should run, e.g. because enough new audio has arrived.
+
+        Args:
+            delay (float, optional): Seconds to wait before running the pass. Only used with a worker
+                                     pool. Defaults to 0.
+        """
+        if self.worker_pool is not None:
+            self.worker_pool.schedule(self, delay)
+        else:
+            self.ready.set()
+
+    def speech_to_text(self):
+        """
+        Process an audio stream on a dedicated thread, continuously transcribing the speech.
+
+        Used when the session is not served by a worker pool. The thread sleeps until the session is
+        signalled as ready by `notify_ready`, or until the delay requested by the previous pass has
+        passed, and then runs a single transcription pass.
 
         Raises:
             Exception: If there is an issue with audio processing or WebSocket communication.
 
         """
+        delay = None
         while True:
+            self.ready.wait(delay)
+            self.ready.clear()
             if self.exit:
                 logging.info("Exiting speech to text thread")
                 break
+            delay = self.process_audio_chunk()
 
-            if self.frames_np is None:
-                continue
-
-            if self.clip_audio:
-                self.clip_audio_if_no_valid_segment()
+    def process_audio_chunk(self):
+        """
+        Run a single transcription pass over the untranscribed audio.
 
-            input_bytes, duration = self.get_audio_chunk_for_processing()
-            if duration < 1.0:
-                time.sleep(0.1)     # wait for audio chunks to arrive
-                continue
-            try:
-                input_sample = input_bytes.copy()
-                result = self.transcribe_audio(input_sample)
+        Transcribes the audio from the current timestamp offset, sends the transcribed segments to the
+        client via the WebSocket connection and updates the transcript. If no audio arrived since the
+        last pass, the audio is not transcribed again; the output of the last pass is handled again, so
+        that repeated output is still confirmed.
 
-                if result is None or self.language is None:
+        Returns:
+            float or None: Seconds after which the same audio should be transcribed again, or None if the
+                           next pass should wait until more audio arrives.
+        """
+        if self.clip_audio and self.mode != "file":
+            self.clip_audio_if_no_valid_segment()
+
+        input_bytes, duration = self.get_audio_chunk_for_processing()
+        if duration < self.MIN_CHUNK_DURATION:
+            # wait for audio chunks to arrive
+            return self.next_file_pass() if self.mode == "file" else None
+        window = (self.chunk_start, self.chunk_start + input_bytes.shape[0])
+        if self.mode == "file":
+            return self.process_file_window(input_bytes, duration, window)
+        try:
+            if window == self.last_window and self.last_result is not None:
+                result = self.last_result
+            else:
+                pass_start = time.perf_counter()
+                result = self.transcribe_audio(input_bytes)
+                self.record_pass(time.perf_counter() - pass_start, duration)
+                self.last_window, self.last_result = window, result
+
+            if result is None:
+                # result is None when no voice activity, wait for new audio
+                with self.lock:
                     self.timestamp_offset += duration
-                    time.sleep(0.25)    # wait for voice activity, result is None when no voice activity
-                    continue
+                if self.end_open_segment():
+                    self.send_transcript_update()
+                return None
+            if self.language is None:
+                # the language is still being detected, keep the audio to transcribe it once it is known
+                return None
+            if not len(result) and self.end_open_segment():
+                # no words in the audio after the open segment, the speaker paused
+                self.send_transcript_update()
+            self.handle_transcription_output(result, duration)
+        except Exception as e:
+            logging.error(f"[ERROR]: Failed to transcribe audio chunk: {e}")
+            return None
+        finally:
+            self.new_audio_needed = self.pacer.new_audio_needed()
+
+        if self.same_output_count > 0:
+            # wait briefly for any new voice activity before confirming the repeated output
+            return self.pacer.repeat_delay(self.REPEAT_PASS_DELAY)
+        return None
+
+    def process_file_window(self, input_bytes, duration, window):
+        """
+        Run a transcription pass over a window of audio in file mode.
+
+        The window only moves forward: every pass commits its segments and the next one starts where they
+        end, so the same audio is not decoded again to confirm its output. Afterwards the client is told how
+        much more audio it may send.
+
+        Args:
+            input_bytes (np.ndarray): The audio of the window, at most `FILE_WINDOW` seconds.
+            duration (float): Duration of the window in seconds.
+            window (tuple): Absolute sample indices of the start and end of the window.
+
+        Returns:
+            float or None: 0 if the next pass can run right away, or None if it should wait for more audio.
+        """
+        offset = self.timestamp_offset
+        try:
+            pass_start = time.perf_counter()
+            result = self.transcribe_audio(input_bytes)
+            self.record_pass(time.perf_counter() - pass_start, duration)
+            self.last_window, self.last_result = window, result
+            if result is not None:
                 self.handle_transcription_output(result, duration)
+        except Exception as e:
+            logging.error(f"[ERROR]: Failed to transcribe audio chunk: {e}")
+        with self.lock:
+            if self.timestamp_offset == offset:
+                # no speech, or nothing usable in the window, move on to the next one
+                self.timestamp_offset += duration
+        self.send_credit()
+        return self.next_file_pass()
 
-            except Exception as e:
-                logging.error(f"[ERROR]: Failed to transcribe audio chunk: {e}")
-                time.sleep(0.01)
+    def next_file_pass(self):
+        """
+        Returns:
+            float or None: 0 if a full window, or the rest of the audio after the client sent all of it, is
+                           waiting to be transcribed in file mode, None otherwise.
+        """
+        with self.lock:
+            pending = self.audio_buffer.end - int(self.timestamp_offset * self.RATE)
+        if pending >= self.FILE_WINDOW * self.RATE or (self.end_of_audio and pending >= self.MIN_CHUNK_DURATION * self.RATE):
+            return 0.0
+        if self.end_of_audio:
+            self.finished.set()
+        return None
+
+    def send_credit(self):
+        """
+        Tell a client in file mode up to which sample of its audio it may send.
+
+        The client may send audio until `BUFFER_DURATION` seconds are waiting to be transcribed, so that
+        the buffer never drops audio before it is transcribed.
+        """
+        with self.lock:
+            credit = int(self.timestamp_offset * self.RATE) + self.BUFFER_DURATION * self.RATE
+        self.send_to_client({"uid": self.client_uid, "credit": credit})
+
+    def end_audio(self):
+        """
+        Signal that a client in file mode sent all of its audio. The rest of the audio is transcribed,
+        after which `finished` is set.
+        """
+        self.end_of_audio = True
+        self.notify_ready()
 
     def transcribe_audio(self):
         raise NotImplementedError
 
+    def record_pass(self, inference_time, duration):
+        """
+        Record a transcription pass in the server metrics, if enabled.
+
+        Args:
+            inference_time (float): Seconds taken by the pass.
+            duration (float): Seconds of audio transcribed by the pass.
+        """
+        self.pacer.record_pass(inference_time)
+        self.compute_time += inference_time
+        if self.metrics is not None:
+            self.metrics.observe_pass(self.BACKEND, inference_time, duration)
+
+    def record_lock_wait(self, wait_time):
+        """
+        Record the time a pass waited for a shared model in the server metrics, if enabled.
+
+        Args:
+            wait_time (float): Seconds waited.
+        """
+        # the wait is part of the inference time of the pass, but keeps no worker busy computing
+        self.compute_time -= wait_time
+        if self.metrics is not None:
+            self.metrics.observe_lock_wait(self.BACKEND, wait_time)
+
+    def compute_load(self):
+        """
+        Returns:
+            tuple: The share of a transcription worker the session kept busy on average, and the seconds it
+                   was measured over.
+        """
+        elapsed = time.monotonic() - self.started
+        return (self.compute_time / elapsed if elapsed > 0 else 0.0), elapsed
+
     def handle_transcription_output(self, result, duration):
         raise NotImplementedError
     
@@ -129,32 +353,42 @@ class ServeClientBase(object):
         """
         Add audio frames to the ongoing audio stream buffer.
 
-        This method is responsible for maintaining the audio stream buffer, allowing the continuous addition
-        of audio frames as they are received. It also ensures that the buffer does not exceed a specified size
-        to prevent excessive memory usage.
+        The frames are appended to a fixed-capacity ring buffer addressed by absolute sample index, so
+        adding frames never copies the audio that is already buffered. Once the buffer holds more than
+        `BUFFER_DURATION` seconds of audio, the oldest samples are dropped; if they were not transcribed
+        yet, the timestamp offset is moved past them.
 
-        If the buffer size exceeds a threshold (45 seconds of audio data), it discards the oldest 30 seconds
-        of audio data to maintain a reasonable buffer size. If the buffer is empty, it initializes it with the provided
-        audio frame. The audio stream buffer is used for real-time processing of audio data for transcription.
+        Once enough audio arrived since the last pass, as decided by the pacer, the session is signalled
+        as ready for the next transcription pass. In file mode, it waits for a full `FILE_WINDOW` instead.
 
         Args:
             frame_np (numpy.ndarray): The audio frame data as a NumPy array.
 
         """
-        self.lock.acquire()
-        if self.frames_np is not None and self.frames_np.shape[0] > 45*self.RATE:
-            self.frames_offset += 30.0
-            self.frames_np = self.frames_np[int(30*self.RATE):]
-            # check timestamp offset(should be >= self.frame_offset)
+        with self.lock:
+            self.audio_buffer.append(frame_np)
+            # check timestamp offset(should be >= the start of the buffer)
             # this basically means that there is no speech as timestamp offset hasnt updated
-            # and is less than frame_offset
-            if self.timestamp_offset < self.frames_offset:
-                self.timestamp_offset = self.frames_offset
-        if self.frames_np is None:
-            self.frames_np = frame_np.copy()
+            # and is less than the start of the buffer
+            buffer_offset = self.audio_buffer.start / self.RATE
+            if self.timestamp_offset < buffer_offset:
+                self.timestamp_offset = buffer_offset
+            pending = self.audio_buffer.end - int(self.timestamp_offset * self.RATE)
+            new_audio = self.audio_buffer.end - (self.last_window[1] if self.last_window else 0)
+        if self.mode == "file":
+            ready = pending >= self.FILE_WINDOW * self.RATE
         else:
-            self.frames_np = np.concatenate((self.frames_np, frame_np), axis=0)
-        self.lock.release()
+            ready = pending >= self.MIN_CHUNK_DURATION * self.RATE and new_audio >= self.new_audio_needed * self.RATE
+        if ready:
+            self.notify_ready()
+
+    def pending_audio_duration(self):
+        """
+        Returns:
+            float: Seconds of audio received but not transcribed yet.
+        """
+        with self.lock:
+            return max(self.audio_buffer.end / self.RATE - self.timestamp_offset, 0.0)
 
     def clip_audio_if_no_valid_segment(self):
         """
@@ -163,18 +397,18 @@ class ServeClientBase(object):
         no valid segment for the last 30 seconds from whisper
         """
         with self.lock:
-            if self.frames_np[int((self.timestamp_offset - self.frames_offset)*self.RATE):].shape[0] > 25 * self.RATE:
-                duration = self.frames_np.shape[0] / self.RATE
-                self.timestamp_offset = self.frames_offset + duration - 5
+            if self.audio_buffer.end - int(self.timestamp_offset * self.RATE) > 25 * self.RATE:
+                self.timestamp_offset = self.audio_buffer.end / self.RATE - 5
 
     def get_audio_chunk_for_processing(self):
         """
         Retrieves the next chunk of audio data for processing based on the current offsets.
 
-        Calculates which part of the audio data should be processed next, based on
-        the difference between the current timestamp offset and the frame's offset, scaled by
-        the audio sample rate (RATE). It then returns this chunk of audio data along with its
-        duration in seconds.
+        Returns the audio from the current timestamp offset up to the newest sample, together with its
+        duration in seconds. The audio is copied out of the ring buffer once: a pass may take longer than
+        the headroom of the buffer lasts, and the buffer would then overwrite the audio while it is being
+        transcribed. The absolute sample index of its first sample is stored in `chunk_start`. In file
+        mode, the chunk is at most `FILE_WINDOW` seconds long.
 
         Returns:
             tuple: A tuple containing:
@@ -182,8 +416,9 @@ class ServeClientBase(object):
                 - duration (float): The duration of the audio chunk in seconds.
         """
         with self.lock:
-            samples_take = max(0, (self.timestamp_offset - self.frames_offset) * self.RATE)
-            input_bytes = self.frames_np[int(samples_take):].copy()
+            self.chunk_start = max(int(self.timestamp_offset * self.RATE), self.audio_buffer.start)
+            end = self.chunk_start + self.FILE_WINDOW * self.RATE if self.mode == "file" else None
+            input_bytes = self.audio_buffer.view(self.chunk_start, end).copy()
         duration = input_bytes.shape[0] / self.RATE
         return input_bytes, duration
 
@@ -212,6 +447,70 @@ class ServeClientBase(object):
             segments = segments + [last_segment]
         return segments
 
+    def send_transcript_update(self, last_segment=None):
+        """
+        Sends the transcript to the client after a transcription pass.
+
+        With protocol version 1, the most recent segments and the incomplete last segment are sent on
+        every pass. With version 2, only what changed since the previous pass is sent, as the events of
+        `get_transcript_events`.
+
+        Args:
+            last_segment (dict, optional): The incomplete last segment of the pass. Defaults to None.
+        """
+        if self.protocol_version == 1:
+            segments = self.prepare_segments(last_segment)
+            partial = len(self.transcript) == self.sent_segments
+            self.sent_segments = len(self.transcript)
+            if len(segments):
+                self.send_transcription_to_client(segments, partial=partial)
+            return
+        events = self.get_transcript_events(last_segment)
+        if len(events):
+            partial = all(event["event"] == "partial" for event in events)
+            self.send_transcript_events_to_client(events, partial=partial)
+
+    def get_transcript_events(self, last_segment=None):
+        """
+        Computes what changed in the transcript since the events returned by the previous call.
+
+        Every segment has a stable id: the index of the segment in the transcript once it is completed.
+        The incomplete last segment has the id the next completed segment will get, and a revision that
+        increases every time it changes. The events are the segment with:
+            - "event": "final" for every segment completed since the previous call,
+            - "event": "partial" for the incomplete last segment, only if it is new or changed,
+            - "event": "retract", and only the id, if the incomplete segment last sent was dropped.
+
+        Args:
+            last_segment (dict, optional): The incomplete last segment of the pass. Defaults to None.
+
+        Returns:
+            list: The events, in order.
+        """
+        events = []
+        completed = self.transcript[self.sent_segments:]
+        for segment_id, segment in enumerate(completed, start=self.sent_segments):
+            revision = 0
+            if self.partial is not None and self.partial[0] == segment_id:
+                revision = self.partial[1] + 1
+            events.append(dict(segment, event="final", id=segment_id, revision=revision))
+        self.sent_segments += len(completed)
+        if self.partial is not None and self.partial[0] < self.sent_segments:
+            self.partial = None
+
+        if last_segment is not None:
+            if self.partial is None:
+                self.partial = (self.sent_segments, 0, last_segment)
+            elif self.partial[2] != last_segment:
+                self.partial = (self.partial[0], self.partial[1] + 1, last_segment)
+            else:
+                return events
+            events.append(dict(last_segment, event="partial", id=self.partial[0], revision=self.partial[1]))
+        elif self.partial is not None:
+            events.append({"event": "retract", "id": self.partial[0]})
+            self.partial = None
+        return events
+
     def get_audio_chunk_duration(self, input_bytes):
         """
         Calculates the duration of the provided audio chunk.
@@ -224,23 +523,45 @@ class ServeClientBase(object):
         """
         return input_bytes.shape[0] / self.RATE
 
-    def send_transcription_to_client(self, segments):
+    def send_transcription_to_client(self, segments, partial=False):
         """
         Sends the specified transcription segments to the client over the websocket connection.
 
         This method formats the transcription segments into a JSON object and attempts to send
         this object to the client. If an error occurs during the send operation, it logs the error.
 
-        Returns:
+        Args:
             segments (list): A list of transcription segments to be sent to the client.
+            partial (bool, optional): Whether no segment was completed since the previous message, so that
+                                      a newer message may replace this one. Defaults to False.
+        """
+        self.send_to_client({"uid": self.client_uid, "segments": segments}, partial=partial)
+
+    def send_transcript_events_to_client(self, events, partial=False):
+        """
+        Sends transcript events to the client over the websocket connection.
+
+        Args:
+            events (list): The events of `get_transcript_events`.
+            partial (bool, optional): Whether the events only update the incomplete segment, so that newer
+                                      events may replace them. Defaults to False.
+        """
+        self.send_to_client({"uid": self.client_uid, "events": events}, partial=partial)
+
+    def send_to_client(self, message, partial=False):
+        """
+        Sends a message to the client. If the websocket is an `OutboundQueue`, the message is queued and
+        partial messages still waiting are replaced by newer partial messages.
+
+        Args:
+            message (dict): The message, encoded as JSON.
+            partial (bool, optional): Whether the message is a partial result. Defaults to False.
         """
         try:
-            self.websocket.send(
-                json.dumps({
-                    "uid": self.client_uid,
-                    "segments": segments,
-                })
-            )
+            if partial and isinstance(self.websocket, OutboundQueue):
+                self.websocket.send(json.dumps(message), partial=True)
+            else:
+                self.websocket.send(json.dumps(message))
         except Exception as e:
             logging.error(f"[ERROR]: Sending data to client: {e}")
 
@@ -268,6 +589,8 @@ class ServeClientBase(object):
         """
         logging.info("Cleaning up.")
         self.exit = True
+        self.ready.set()
+        self.finished.set()
     
     def get_segment_no_speech_prob(self, segment):
         return getattr(segment, "no_speech_prob", 0)
@@ -278,6 +601,119 @@ class ServeClientBase(object):
     def get_segment_end(self, segment):
         return getattr(segment, "end", getattr(segment, "end_ts", 0))
 
+    def get_segment_words(self, segment):
+        return getattr(segment, "words", None) or []
+
+    def agreed_words(self, words, window_end):
+        """
+        Compare the words of the incomplete segment with those of the last pass over less audio.
+
+        Both passes agree on a prefix of the words that is unlikely to change as more audio arrives, so it can
+        be committed right away instead of waiting for `same_output_threshold` repetitions of the whole segment.
+        A pass over the same window as the last one, e.g. when no new audio arrived, is not a second opinion.
+
+        Args:
+            words (list): Words of the incomplete segment, with timestamps.
+            window_end (int or None): Absolute sample index of the end of the transcribed window.
+
+        Returns:
+            int: Number of leading words both passes agree on.
+        """
+        offset, previous_end, previous = self.hypothesis
+        if offset != self.timestamp_offset or window_end is None or previous_end is None or window_end <= previous_end:
+            return 0
+        agreed = 0
+        for word, last in zip(words, previous):
+            if word.word.strip().lower() != last:
+                break
+            agreed += 1
+        return agreed
+
+    def format_open_segment(self, start=None, end=None, text=""):
+        """
+        Format the incomplete last segment: the words of the open segment, followed by the words of the last
+        pass that were not committed yet. Must be called with the lock held.
+
+        Args:
+            start (float, optional): Absolute start of the words not committed yet, if any.
+            end (float, optional): Absolute end of the words not committed yet, if any.
+            text (str, optional): The words not committed yet.
+
+        Returns:
+            dict or None: The incomplete segment, or None if there are no words.
+        """
+        if self.open_segment is not None:
+            open_start, open_end, committed = self.open_segment
+            start, end, text = open_start, end if start is not None else open_end, committed + text
+        if start is None:
+            return None
+        return self.format_segment(start, end, text, completed=False)
+
+    def complete_segment(self, start, end, text):
+        """
+        Add a completed segment to the transcript. The segment ends the open segment, whose words come first.
+
+        Args:
+            start (float): Absolute start of the segment.
+            end (float): Absolute end of the segment.
+            text (str): Text of the segment.
+        """
+        with self.lock:
+            if self.open_segment is not None:
+                start, text = self.open_segment[0], self.open_segment[2] + text
+                self.open_segment = None
+            self.transcript.append(self.format_segment(start, end, text, completed=True))
+        self.text.append(text)
+
+    def end_open_segment(self):
+        """
+        Complete the open segment, at the end of a segment or at a pause in the speech.
+
+        Returns:
+            bool: True if there was an open segment, False otherwise.
+        """
+        with self.lock:
+            if self.open_segment is None:
+                return False
+            start, end, text = self.open_segment
+            self.open_segment = None
+            self.transcript.append(self.format_segment(start, end, text, completed=True))
+        self.text.append(text)
+        return True
+
+    def update_file_segments(self, segments, duration):
+        """
+        Processes the segments from Whisper in file mode and commits them to the transcript.
+
+        The last segment may be cut off by the end of the window, so it is left to the next window unless
+        the window reaches the end of the audio or holds no other segment.
+
+        Args:
+            segments (list): List of segments returned by the transcriber.
+            duration (float): Duration of the current audio chunk.
+
+        Returns:
+            None: There is no incomplete segment in file mode.
+        """
+        with self.lock:
+            final = self.end_of_audio and self.chunk_start + int(round(duration * self.RATE)) >= self.audio_buffer.end
+        keep_last = len(segments) > 1 and not final
+        offset = duration
+        for s in segments[:-1] if keep_last else segments:
+            start = self.get_segment_start(s)
+            end = min(duration, self.get_segment_end(s))
+            if keep_last:
+                offset = end
+            if start >= end or self.get_segment_no_speech_prob(s) > self.no_speech_thresh:
+                continue
+            self.text.append(s.text)
+            self.transcript.append(self.format_segment(
+                self.timestamp_offset + start, self.timestamp_offset + end, s.text, completed=True
+            ))
+        with self.lock:
+            self.timestamp_offset += offset
+        return None
+
     def update_segments(self, segments, duration):
         """
         Processes the segments from Whisper and updates the transcript.
@@ -290,6 +726,8 @@ class ServeClientBase(object):
         Returns:
             dict or None: The last processed segment (if any).
         """
+        if self.mode == "file":
+            return self.update_file_segments(segments, duration)
         offset = None
         self.current_out = ''
         last_segment = None
@@ -298,8 +736,6 @@ class ServeClientBase(object):
         # and if the last segment's no_speech_prob is below the threshold.
         if len(segments) > 1 and self.get_segment_no_speech_prob(segments[-1]) <= self.no_speech_thresh:
             for s in segments[:-1]:
-                text_ = s.text
-                self.text.append(text_)
                 with self.lock:
                     start = self.timestamp_offset + self.get_segment_start(s)
                     end = self.timestamp_offset + min(duration, self.get_segment_end(s))
@@ -307,19 +743,43 @@ class ServeClientBase(object):
                     continue
                 if self.get_segment_no_speech_prob(s) > self.no_speech_thresh:
                     continue
-                self.transcript.append(self.format_segment(start, end, text_, completed=True))
+                self.complete_segment(start, end, s.text)
                 offset = min(duration, self.get_segment_end(s))
+            # the end of a segment also ends the open segment, even if the segment was dropped
+            self.end_open_segment()
 
         # Process the last segment if its no_speech_prob is acceptable.
         if self.get_segment_no_speech_prob(segments[-1]) <= self.no_speech_thresh:
             self.current_out += segments[-1].text
             with self.lock:
-                last_segment = self.format_segment(
+                last_segment = self.format_open_segment(
                     self.timestamp_offset + self.get_segment_start(segments[-1]),
                     self.timestamp_offset + min(duration, self.get_segment_end(segments[-1])),
                     self.current_out,
-                    completed=False
                 )
+        else:
+            self.end_open_segment()
+
+        # Add the leading words of the incomplete segment that the last pass agrees on to the open segment. Once
+        # completed segments are cut from the window, the last pass no longer lines up with this one.
+        words = self.get_segment_words(segments[-1]) if last_segment is not None else []
+        window_end = self.last_window[1] if self.last_window else None
+        agreed = self.agreed_words(words, window_end) if offset is None else 0
+        if agreed:
+            committed, words = words[:agreed], words[agreed:]
+            offset = min(duration, committed[-1].end)
+            with self.lock:
+                text_ = "".join(word.word for word in committed)
+                if self.open_segment is None:
+                    self.open_segment = (self.timestamp_offset + committed[0].start, self.timestamp_offset + offset, text_)
+                else:
+                    self.open_segment = (self.open_segment[0], self.timestamp_offset + offset, self.open_segment[2] + text_)
+                self.current_out = "".join(word.word for word in words)
+                last_segment = self.format_open_segment(
+                    self.timestamp_offset + words[0].start,
+                    self.timestamp_offset + min(duration, self.get_segment_end(segments[-1])),
+                    self.current_out,
+                ) if words else self.format_open_segment()
 
         # Handle repeated output logic.
         if self.current_out.strip() == self.prev_out.strip() and self.current_out != '':
@@ -329,7 +789,6 @@ class ServeClientBase(object):
             # audio thats not yet transcribed so, capturing the time when it was repeated for the first time
             if self.end_time_for_same_output is None:
                 self.end_time_for_same_output = self.get_segment_end(segments[-1])
-            time.sleep(0.1)  # wait briefly for any new voice activity
         else:
             self.same_output_count = 0
             self.end_time_for_same_output = None
@@ -338,24 +797,23 @@ class ServeClientBase(object):
         # append it to the transcript and update the offset.
         if self.same_output_count > self.same_output_threshold:
             if not self.text or self.text[-1].strip().lower() != self.current_out.strip().lower():
-                self.text.append(self.current_out)
                 with self.lock:
-                    self.transcript.append(self.format_segment(
-                        self.timestamp_offset,
-                        self.timestamp_offset + min(duration, self.end_time_for_same_output),
-                        self.current_out,
-                        completed=True
-                    ))
+                    start = self.timestamp_offset
+                    end = self.timestamp_offset + min(duration, self.end_time_for_same_output)
+                self.complete_segment(start, end, self.current_out)
+            self.end_open_segment()
             self.current_out = ''
             offset = min(duration, self.end_time_for_same_output)
             self.same_output_count = 0
             last_segment = None
             self.end_time_for_same_output = None
+            words = []
         else:
             self.prev_out = self.current_out
 
         if offset is not None:
             with self.lock:
                 self.timestamp_offset += offset
+        self.hypothesis = (self.timestamp_offset, window_end, [word.word.strip().lower() for word in words])
 
         return last_segment
@@ -0,0 +1,150 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future
+
+from whisper_live.transcriber.transcriber_faster_whisper import BatchedInferencePipeline
+
+
+class BatchRequest(object):
+    """A single window of Mel features waiting to be decoded by the scheduler."""
+
+    def __init__(self, features, language, task, initial_prompt, word_timestamps):
+        self.features = features
+        self.language = language
+        self.task = task
+        self.initial_prompt = initial_prompt
+        self.word_timestamps = word_timestamps
+        self.future = Future()
+
+    @property
+    def key(self):
+        """Requests can only share a batch if they decode with the same prompt and options."""
+        return (self.language, self.task, self.initial_prompt, self.word_timestamps)
+
+
+class BatchInferenceScheduler(object):
+    """
+    Collects pending transcription windows from all sessions sharing a model and decodes them together.
+
+    Every session submits its current window from its own transcription thread and blocks until the
+    result is ready. A single scheduler thread waits up to `batch_timeout_ms` after the first request
+    arrives to gather more requests, then runs one batched encoder pass and one `generate` call for up
+    to `max_batch_size` windows and hands the segments back to each waiting session.
+    """
+
+    def __init__(self, transcriber, max_batch_size=8, batch_timeout_ms=10, lock=None):
+        """
+        Args:
+            transcriber (WhisperModel): The shared model used to decode the batches.
+            max_batch_size (int, optional): Maximum number of windows decoded in one call. Defaults to 8.
+            batch_timeout_ms (float, optional): How long to wait for more windows once the first one has
+                                                arrived. Defaults to 10 ms.
+            lock (threading.Lock, optional): Lock held while the model runs a batch, so that batches do not
+                                             interleave with direct calls on the same model. Defaults to None.
+        """
+        self.pipeline = BatchedInferencePipeline(model=transcriber)
+        self.max_batch_size = max(1, max_batch_size)
+        self.batch_timeout = batch_timeout_ms / 1000.0
+        self.lock = lock
+        self.pending = []
+        self.cond = threading.Condition()
+        self.exit = False
+
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def transcribe(self, features, language, task="transcribe", initial_prompt=None, word_timestamps=False):
+        """
+        Submit one window of Mel features and wait for it to be decoded as part of a batch.
+
+        Args:
+            features (np.ndarray): Mel spectrogram of shape (n_mels, n_frames), at most 30 seconds long.
+            language (str): Language of the window.
+            task (str, optional): The task type, e.g., "transcribe". Defaults to "transcribe".
+            initial_prompt (str, optional): Prompt for whisper inference. Defaults to None.
+            word_timestamps (bool, optional): Whether to align word-level timestamps. Defaults to False.
+
+        Returns:
+            list: The segments of the window, with timestamps relative to the start of the window.
+        """
+        request = BatchRequest(features, language, task, initial_prompt, word_timestamps)
+        with self.cond:
+            if self.exit:
+                raise RuntimeError("Batch inference scheduler is stopped.")
+            self.pending.append(request)
+            self.cond.notify()
+        return request.future.result()
+
+    def next_batch(self):
+        """
+        Wait for pending requests and pick the next batch to run.
+
+        Returns:
+            list: Requests sharing the same decoding options, or None if the scheduler is stopping.
+        """
+        with self.cond:
+            while not self.pending and not self.exit:
+                self.cond.wait()
+            if self.exit:
+                return None
+
+            deadline = time.monotonic() + self.batch_timeout
+            while len(self.pending) < self.max_batch_size and not self.exit:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.cond.wait(remaining)
+
+            key = self.pending[0].key
+            batch = [request for request in self.pending if request.key == key][:self.max_batch_size]
+            self.pending = [request for request in self.pending if request not in batch]
+            return batch
+
+    def run(self):
+        """Scheduler loop, runs batches until `stop` is called."""
+        while True:
+            batch = self.next_batch()
+            if batch is None:
+                break
+            self.run_batch(batch)
+
+    def run_batch(self, batch):
+        """
+        Decode a batch of windows and resolve the futures of the waiting sessions.
+
+        Args:
+            batch (list): Requests sharing the same decoding options.
+        """
+        first = batch[0]
+        try:
+            if self.lock is not None:
+                self.lock.acquire()
+            try:
+                results = self.pipeline.transcribe_features(
+                    [request.features for request in batch],
+                    language=first.language,
+                    task=first.task,
+                    initial_prompt=first.initial_prompt,
+                    word_timestamps=first.word_timestamps,
+                )
+            finally:
+                if self.lock is not None:
+                    self.lock.release()
+        except Exception as e:
+            logging.error(f"[ERROR]: Batched inference failed: {e}")
+            for request in batch:
+                request.future.set_exception(e)
+            return
+
+        for request, segments in zip(batch, results):
+            request.future.set_result(segments)
+
+    def stop(self):
+        """Stop the scheduler thread and fail any request that is still pending."""
+        with self.cond:
+            self.exit = True
+            pending, self.pending = self.pending, []
+            self.cond.notify_all()
+        for request in pending:
+            request.future.set_exception(RuntimeError("Batch inference scheduler is stopped."))
@@ -1,19 +1,34 @@
 import os
 import json
 import logging
-import threading
+import functools
 import time
+from types import SimpleNamespace
+import numpy as np
 import torch
 import ctranslate2
 from huggingface_hub import snapshot_download
+from faster_whisper.utils import download_model
 
-from whisper_live.transcriber.transcriber_faster_whisper import WhisperModel
+from whisper_live.transcriber.transcriber_faster_whisper import WhisperModel, restore_speech_timestamps
 from whisper_live.backend.base import ServeClientBase
+from whisper_live.backend.batch_scheduler import BatchInferenceScheduler
+from whisper_live.backend.feature_cache import FeatureCache, normalize_log_mel
+from whisper_live.vad import StreamingVAD
 
 
 class ServeClientFasterWhisper(ServeClientBase):
-    SINGLE_MODEL = None
-    SINGLE_MODEL_LOCK = threading.Lock()
+    BACKEND = "faster_whisper"
+    model_sizes = [
+        "tiny", "tiny.en", "base", "base.en", "small", "small.en",
+        "medium", "medium.en", "large-v2", "large-v3", "distil-small.en",
+        "distil-medium.en", "distil-large-v2", "distil-large-v3",
+        "large-v3-turbo", "turbo"
+    ]
+    LANGUAGE_DETECTION_THRESHOLD = 0.5
+    """Probability above which a detected language is used right away."""
+    LANGUAGE_DETECTION_PASSES = 5
+    """Passes after which the most likely language so far is used, even if no pass was confident about it."""
 
     def __init__(
         self,
@@ -26,12 +41,20 @@ class ServeClientFasterWhisper(ServeClientBase):
         initial_prompt=None,
         vad_parameters=None,
         use_vad=True,
-        single_model=False,
+        model_pool=None,
         send_last_n_segments=10,
         no_speech_thresh=0.45,
         clip_audio=False,
         same_output_threshold=10,
-        cache_path="~/.cache/whisper-live/"
+        cache_path="~/.cache/whisper-live/",
+        batch_inference=False,
+        max_batch_size=8,
+        batch_timeout_ms=10,
+        worker_pool=None,
+        metrics=None,
+        protocol_version=1,
+        target_latency_ms=None,
+        mode="live",
     ):
         """
         Initialize a ServeClient instance.
@@ -47,11 +70,28 @@ class ServeClientFasterWhisper(ServeClientBase):
             client_uid (str, optional): A unique identifier for the client. Defaults to None.
             model (str, optional): The whisper model size. Defaults to 'small.en'
             initial_prompt (str, optional): Prompt for whisper inference. Defaults to None.
-            single_model (bool, optional): Whether to instantiate a new model for each client connection. Defaults to False.
+            model_pool (ModelPool, optional): Pool the model is taken from, so that it is shared with the other sessions
+                                              using the same model. If None, the session loads its own model.
+                                              Defaults to None.
             send_last_n_segments (int, optional): Number of most recent segments to send to the client. Defaults to 10.
             no_speech_thresh (float, optional): Segments with no speech probability above this threshold will be discarded. Defaults to 0.45.
             clip_audio (bool, optional): Whether to clip audio with no valid segments. Defaults to False.
             same_output_threshold (int, optional): Number of repeated outputs before considering it as a valid segment. Defaults to 10.
+            batch_inference (bool, optional): Whether to decode the windows of all sessions sharing the model
+                                              in batches. Only used with a model pool. Defaults to False.
+            max_batch_size (int, optional): Maximum number of windows decoded in one batch. Defaults to 8.
+            batch_timeout_ms (float, optional): How long the scheduler waits for more windows to fill a batch.
+                                                Defaults to 10 ms.
+            worker_pool (TranscriptionWorkerPool, optional): Shared pool running the transcription passes. If None,
+                                                             the session runs on its own thread. Defaults to None.
+            metrics (ServerMetrics, optional): Server metrics to record the transcription passes in. Defaults to None.
+            protocol_version (int, optional): Version of the transcript protocol, 1 to send the last segments on
+                                              every pass or 2 to send only what changed. Defaults to 1.
+            target_latency_ms (float, optional): Milliseconds from receiving audio to sending its transcription
+                                                 that the pacing of the transcription passes aims for.
+                                                 Defaults to 1000 ms.
+            mode (str, optional): How the client sends its audio, "live" in real time or "file" as fast as it is
+                                  transcribed. Defaults to "live".
 
         """
         super().__init__(
@@ -61,39 +101,33 @@ class ServeClientFasterWhisper(ServeClientBase):
             no_speech_thresh,
             clip_audio,
             same_output_threshold,
+            worker_pool=worker_pool,
+            metrics=metrics,
+            protocol_version=protocol_version,
+            target_latency_ms=target_latency_ms,
+            mode=mode,
         )
         self.cache_path = cache_path
-        self.model_sizes = [
-            "tiny", "tiny.en", "base", "base.en", "small", "small.en",
-            "medium", "medium.en", "large-v2", "large-v3", "distil-small.en",
-            "distil-medium.en", "distil-large-v2", "distil-large-v3",
-            "large-v3-turbo", "turbo"
-        ]
-
         self.model_size_or_path = model
         self.language = "en" if self.model_size_or_path.endswith("en") else language
         self.task = task
         self.initial_prompt = initial_prompt
         self.vad_parameters = vad_parameters or {"onset": 0.5}
+        self.model_pool = model_pool
+        self.model_entry = None
+        self.language_probs = {}
+        """Highest probability of each language detected so far, while the language is not known."""
+        self.language_detection_passes = 0
 
-        device = "cuda" if torch.cuda.is_available() else "cpu"
-        if device == "cuda":
-            major, _ = torch.cuda.get_device_capability(device)
-            self.compute_type = "float16" if major >= 7 else "float32"
-        else:
-            self.compute_type = "int8"
+        device, self.compute_type = self.get_device_and_compute_type()
 
         if self.model_size_or_path is None:
             return
         logging.info(f"Using Device={device} with precision {self.compute_type}")
     
         try:
-            if single_model:
-                if ServeClientFasterWhisper.SINGLE_MODEL is None:
-                    self.create_model(device)
-                    ServeClientFasterWhisper.SINGLE_MODEL = self.transcriber
-                else:
-                    self.transcriber = ServeClientFasterWhisper.SINGLE_MODEL
+            if model_pool is not None:
+                self.acquire_model(device, batch_inference, max_batch_size, batch_timeout_ms)
             else:
                 self.create_model(device)
         except Exception as e:
@@ -107,10 +141,14 @@ class ServeClientFasterWhisper(ServeClientBase):
             return
 
         self.use_vad = use_vad
+        self.vad = StreamingVAD(self.vad_parameters) if use_vad else None
+        self.feature_cache = FeatureCache(
+            self.transcriber.feature_extractor,
+            self.BUFFER_DURATION * self.RATE,
+            headroom=self.BUFFER_HEADROOM * self.RATE,
+        )
 
-        # threading
-        self.trans_thread = threading.Thread(target=self.speech_to_text)
-        self.trans_thread.start()
+        self.start_transcription()
         self.websocket.send(
             json.dumps(
                 {
@@ -121,75 +159,171 @@ class ServeClientFasterWhisper(ServeClientBase):
             )
         )
 
+    @staticmethod
+    def get_device_and_compute_type():
+        """
+        Returns:
+            tuple: The device to run the models on and the compute type to load them with.
+        """
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        if device == "cuda":
+            major, _ = torch.cuda.get_device_capability(device)
+            compute_type = "float16" if major >= 7 else "float32"
+        else:
+            compute_type = "int8"
+        return device, compute_type
+
     def create_model(self, device):
         """
-        Instantiates a new model, sets it as the transcriber. If model is a huggingface model_id
-        then it is automatically converted to ctranslate2(faster_whisper) format.
+        Instantiates a new model for this session and sets it as the transcriber.
         """
-        model_ref = self.model_size_or_path
+        self.transcriber = self.load_model(self.model_size_or_path, device, self.compute_type, self.cache_path)
 
-        if model_ref in self.model_sizes:
-            model_to_load = model_ref
-        else:
-            logging.info(f"Model not in model_sizes")
-            if os.path.isdir(model_ref) and ctranslate2.contains_model(model_ref):
-                model_to_load = model_ref
-            else:
-                local_snapshot = snapshot_download(
-                    repo_id = model_ref,
-                    repo_type = "model",
-                )
-                if ctranslate2.contains_model(local_snapshot):
-                    model_to_load = local_snapshot
-                else:
-                    cache_root = os.path.expanduser(os.path.join(self.cache_path, "whisper-ct2-models/"))
-                    os.makedirs(cache_root, exist_ok=True)
-                    safe_name = model_ref.replace("/", "--")
-                    ct2_dir = os.path.join(cache_root, safe_name)
-
-                    if not ctranslate2.contains_model(ct2_dir):
-                        logging.info(f"Converting '{model_ref}' to CTranslate2 @ {ct2_dir}")
-                        ct2_converter = ctranslate2.converters.TransformersConverter(
-                            local_snapshot, 
-                            copy_files=["tokenizer.json", "preprocessor_config.json"]
-                        )
-                        ct2_converter.convert(
-                            output_dir=ct2_dir,
-                            quantization=self.compute_type,
-                            force=False,  # skip if already up-to-date
+    def acquire_model(self, device, batch_inference=False, max_batch_size=8, batch_timeout_ms=10):
+        """
+        Takes the model from the model pool and sets its first replica as the transcriber. The model is only
+        loaded if no other session is using it and it has not been loaded before. Transcription passes are
+        dispatched to the least loaded replica of the model.
+
+        Args:
+            device (str): The device to run the model on.
+            batch_inference (bool, optional): Whether to decode the windows of all sessions sharing the model in
+                                              batches. Defaults to False.
+            max_batch_size (int, optional): Maximum number of windows decoded in one batch. Defaults to 8.
+            batch_timeout_ms (float, optional): How long the scheduler waits for more windows to fill a batch.
+                                                Defaults to 10 ms.
+        """
+        key = (self.model_size_or_path, device, self.compute_type)
+        load = functools.partial(self.load_model, self.model_size_or_path, device, self.compute_type, self.cache_path)
+        self.model_entry = self.model_pool.acquire(key, load)
+        self.transcriber = self.model_entry.model
+        if batch_inference:
+            with self.model_pool.lock:
+                for replica in self.model_entry.replicas:
+                    if replica.batch_scheduler is None:
+                        replica.batch_scheduler = BatchInferenceScheduler(
+                            replica.model,
+                            max_batch_size=max_batch_size,
+                            batch_timeout_ms=batch_timeout_ms,
+                            lock=replica.lock,
                         )
-                    model_to_load = ct2_dir
 
+    @staticmethod
+    def preload_model(model_pool, model, cache_path="~/.cache/whisper-live/"):
+        """
+        Loads a model into the model pool before any client asks for it, and keeps it loaded.
+
+        Args:
+            model_pool (ModelPool): The pool to load the model into.
+            model (str): The whisper model size, huggingface model id or path to a custom model.
+            cache_path (str, optional): Path to cache the converted ctranslate2 models.
+        """
+        device, compute_type = ServeClientFasterWhisper.get_device_and_compute_type()
+        load = functools.partial(ServeClientFasterWhisper.load_model, model, device, compute_type, cache_path)
+        model_pool.preload((model, device, compute_type), load)
+
+    @staticmethod
+    def load_model(model_ref, device, compute_type, cache_path):
+        """
+        Instantiates a new model. If model is a huggingface model_id then it is automatically converted to
+        ctranslate2(faster_whisper) format.
+
+        Args:
+            model_ref (str): The whisper model size, huggingface model id or path to a custom model.
+            device (str): The device to run the model on.
+            compute_type (str): The compute type to load the model with.
+            cache_path (str): Path to cache the converted ctranslate2 models.
+
+        Returns:
+            WhisperModel: The loaded model.
+        """
+        model_to_load = ServeClientFasterWhisper.fetch_model(model_ref, compute_type, cache_path)
         logging.info(f"Loading model: {model_to_load}")
-        self.transcriber = WhisperModel(
+        return WhisperModel(
             model_to_load,
             device=device,
-            compute_type=self.compute_type,
+            compute_type=compute_type,
             local_files_only=False,
         )
 
+    @staticmethod
+    def fetch_model(model_ref, compute_type, cache_path, download=False):
+        """
+        Makes the files of a model available locally, downloading and converting them if needed.
+
+        Args:
+            model_ref (str): The whisper model size, huggingface model id or path to a custom model.
+            compute_type (str): The compute type to convert the model with.
+            cache_path (str): Path to cache the converted ctranslate2 models.
+            download (bool, optional): Also download the models given by size, which are otherwise downloaded
+                                       by `WhisperModel`. Defaults to False.
+
+        Returns:
+            str: The model size, or the path of the converted model.
+        """
+        if model_ref in ServeClientFasterWhisper.model_sizes:
+            if download:
+                download_model(model_ref)
+            return model_ref
+        logging.info(f"Model not in model_sizes")
+        if os.path.isdir(model_ref) and ctranslate2.contains_model(model_ref):
+            return model_ref
+        local_snapshot = snapshot_download(
+            repo_id = model_ref,
+            repo_type = "model",
+        )
+        if ctranslate2.contains_model(local_snapshot):
+            return local_snapshot
+        cache_root = os.path.expanduser(os.path.join(cache_path, "whisper-ct2-models/"))
+        os.makedirs(cache_root, exist_ok=True)
+        safe_name = model_ref.replace("/", "--")
+        ct2_dir = os.path.join(cache_root, safe_name)
+
+        if not ctranslate2.contains_model(ct2_dir):
+            logging.info(f"Converting '{model_ref}' to CTranslate2 @ {ct2_dir}")
+            ct2_converter = ctranslate2.converters.TransformersConverter(
+                local_snapshot, 
+                copy_files=["tokenizer.json", "preprocessor_config.json"]
+            )
+            ct2_converter.convert(
+                output_dir=ct2_dir,
+                quantization=compute_type,
+                force=False,  # skip if already up-to-date
+            )
+        return ct2_dir
+
     def set_language(self, info):
         """
         Updates the language attribute based on the detected language information.
 
+        The language is used once a pass detects it with a probability above `LANGUAGE_DETECTION_THRESHOLD`.
+        Otherwise, after `LANGUAGE_DETECTION_PASSES` passes, the language detected with the highest probability
+        is used, so that a session does not keep detecting the language of hard to identify audio. In file mode,
+        a pass covers a whole window, and the language it detects is used right away.
+
         Args:
             info (object): An object containing the detected language and its probability. This object
                         must have at least two attributes: `language`, a string indicating the detected
                         language, and `language_probability`, a float representing the confidence level
                         of the language detection.
         """
-        if info.language_probability > 0.5:
-            self.language = info.language
-            logging.info(f"Detected language {self.language} with probability {info.language_probability}")
-            self.websocket.send(json.dumps(
-                {"uid": self.client_uid, "language": self.language, "language_prob": info.language_probability}))
+        self.language_detection_passes += 1
+        self.language_probs[info.language] = max(info.language_probability, self.language_probs.get(info.language, 0.0))
+        if (info.language_probability <= self.LANGUAGE_DETECTION_THRESHOLD
+                and self.language_detection_passes < self.LANGUAGE_DETECTION_PASSES and self.mode == "live"):
+            return
+        self.language = max(self.language_probs, key=self.language_probs.get)
+        probability = self.language_probs[self.language]
+        logging.info(f"Detected language {self.language} with probability {probability}")
+        self.websocket.send(json.dumps(
+            {"uid": self.client_uid, "language": self.language, "language_prob": probability}))
 
     def transcribe_audio(self, input_sample):
         """
         Transcribes the provided audio sample using the configured transcriber instance.
 
-        If the language has not been set, it updates the session's language based on the transcription
-        information.
+        If the language has not been set, it is detected first, and the window is only decoded once the
+        language is known; see `run_pass`.
 
         Args:
             input_sample (np.array): The audio chunk to be transcribed. This should be a NumPy
@@ -198,24 +332,156 @@ class ServeClientFasterWhisper(ServeClientBase):
         Returns:
             The transcription result from the transcriber. The exact format of this result
             depends on the implementation of the `transcriber.transcribe` method but typically
-            includes the transcribed text.
+            includes the transcribed text. An empty list while the language is still being detected.
         """
-        if ServeClientFasterWhisper.SINGLE_MODEL:
-            ServeClientFasterWhisper.SINGLE_MODEL_LOCK.acquire()
-        result, info = self.transcriber.transcribe(
+        features, speech_chunks, shift = self.prepare_features(input_sample)
+        if features is None:
+            return None
+
+        if self.model_entry is None:
+            result = self.run_pass(self.transcriber, input_sample, features)
+        else:
+            with self.model_entry.dispatch() as replica:
+                result = self.transcribe_on_replica(replica, input_sample, features)
+        if self.language is None:
+            return []
+        if speech_chunks:
+            result = restore_speech_timestamps(result, speech_chunks, self.RATE)
+        if shift:
+            self.shift_segments(result, shift / self.RATE)
+        return result
+
+    def run_pass(self, model, input_sample, features):
+        """
+        Transcribe the window with the model, detecting its language first if it is not known yet.
+
+        Language detection only runs the encoder and the language head of the decoder on the first window
+        of the features, not a full decode. Once the detected language is settled on, the window is decoded
+        in it, reusing the encoder output of the detection.
+
+        Args:
+            model (WhisperModel): The model to run the pass on.
+            input_sample (np.array): The audio chunk to be transcribed.
+            features (np.ndarray): The normalized Mel features of the audio chunk.
+
+        Returns:
+            list: The segments, or an empty list if the language is still being detected.
+        """
+        encoder_output = None
+        if self.language is None:
+            if model.model.is_multilingual:
+                encoder_output = model.encode_first_window(features)
+                language, probability, _ = model.detect_language_from_encoder_output(encoder_output)
+            else:
+                language, probability = "en", 1.0
+            self.set_language(SimpleNamespace(language=language, language_probability=probability))
+            if self.language is None:
+                return []
+        result, _ = model.transcribe(
             input_sample,
             initial_prompt=self.initial_prompt,
             language=self.language,
             task=self.task,
-            vad_filter=self.use_vad,
-            vad_parameters=self.vad_parameters if self.use_vad else None)
-        if ServeClientFasterWhisper.SINGLE_MODEL:
-            ServeClientFasterWhisper.SINGLE_MODEL_LOCK.release()
-
-        if self.language is None and info is not None:
-            self.set_language(info)
+            word_timestamps=self.mode == "live",
+            features=features,
+            encoder_output=encoder_output)
         return result
 
+    def transcribe_on_replica(self, replica, input_sample, features):
+        """
+        Run a transcription pass on a replica of the shared model, through its batch scheduler if the window
+        can be batched.
+
+        Args:
+            replica (ModelReplica): The replica the pass was dispatched to.
+            input_sample (np.array): The audio chunk to be transcribed.
+            features (np.ndarray): The normalized Mel features of the audio chunk.
+
+        Returns:
+            list: The segments, or an empty list if the language is still being detected.
+        """
+        nb_max_frames = replica.model.feature_extractor.nb_max_frames
+        if (replica.batch_scheduler is not None and self.language is not None
+                and features.shape[-1] - 1 <= nb_max_frames):
+            return replica.batch_scheduler.transcribe(
+                features,
+                language=self.language,
+                task=self.task,
+                initial_prompt=self.initial_prompt,
+                word_timestamps=self.mode == "live",
+            )
+        wait_start = time.perf_counter()
+        with replica.lock:
+            self.record_lock_wait(time.perf_counter() - wait_start)
+            return self.run_pass(replica.model, input_sample, features)
+
+    def prepare_features(self, input_sample):
+        """
+        Get the Mel features of the audio chunk from the session's feature cache.
+
+        The window is extended back to the closest STFT frame boundary of the stream, so that its frames
+        line up with the cached ones. If VAD is enabled, only the frames of the speech are kept, like
+        `WhisperModel.transcribe` does with the audio when `vad_filter` is set. The speech chunks come from
+        the session's streaming VAD, which only scores the audio that arrived since the last pass.
+
+        Args:
+            input_sample (np.array): The audio chunk, starting at absolute sample `chunk_start`.
+
+        Returns:
+            tuple: A tuple containing:
+                - features (np.ndarray): The normalized Mel features, or None if no voice activity was detected.
+                - speech_chunks (list): The speech chunks of the window in samples, or None if VAD is disabled.
+                - shift (int): Number of samples the window was extended back by.
+        """
+        hop_length = self.feature_cache.hop_length
+        start = self.chunk_start
+        shift = start % hop_length
+        if shift and start - shift >= self.audio_buffer.start:
+            start -= shift
+            input_sample = self.audio_buffer.view(start, start + shift + input_sample.shape[0])
+        else:
+            shift = 0
+
+        self.feature_cache.update(self.audio_buffer)
+        log_spec = self.feature_cache.features(input_sample, start)
+        if not self.use_vad:
+            return normalize_log_mel(log_spec), None, shift
+
+        self.vad.update(self.audio_buffer)
+        speech_chunks = []
+        last_frame = log_spec.shape[-1] - 1
+        for chunk in self.vad.get_speech_timestamps(start, start + input_sample.shape[0]):
+            # snap the chunks to frame boundaries, so that the concatenated frames match the speech chunks
+            chunk_start = chunk["start"] // hop_length
+            chunk_end = min(-(-chunk["end"] // hop_length), last_frame)
+            if speech_chunks:
+                chunk_start = max(chunk_start, speech_chunks[-1]["end"] // hop_length)
+            if chunk_start < chunk_end:
+                speech_chunks.append({"start": chunk_start * hop_length, "end": chunk_end * hop_length})
+        if not speech_chunks:
+            return None, None, shift
+
+        frames = [log_spec[:, chunk["start"] // hop_length:chunk["end"] // hop_length] for chunk in speech_chunks]
+        end_frame = speech_chunks[-1]["end"] // hop_length
+        frames.append(log_spec[:, end_frame:end_frame + 1])
+        return normalize_log_mel(np.concatenate(frames, axis=1)), speech_chunks, shift
+
+    @staticmethod
+    def shift_segments(segments, shift):
+        """
+        Make the timestamps of the segments relative to a later start of the window.
+
+        Args:
+            segments (list): The transcribed segments.
+            shift (float): Seconds between the start of the transcribed window and the new start.
+        """
+        for segment in segments:
+            segment.start = max(segment.start - shift, 0.0)
+            segment.end = max(segment.end - shift, 0.0)
+            for word in segment.words or []:
+                word.start = max(word.start - shift, 0.0)
+                word.end = max(word.end - shift, 0.0)
+
     def handle_transcription_output(self, result, duration):
         """
         Handle the transcription output, updating the transcript and sending data to the client.
@@ -224,11 +490,16 @@ class ServeClientFasterWhisper(ServeClientBase):
             result (str): The result from whisper inference i.e. the list of segments.
             duration (float): Duration of the transcribed audio chunk.
         """
-        segments = []
         if len(result):
             self.t_start = None
             last_segment = self.update_segments(result, duration)
-            segments = self.prepare_segments(last_segment)
+            self.send_transcript_update(last_segment)
 
-        if len(segments):
-            self.send_transcription_to_client(segments)
+    def cleanup(self):
+        """
+        Stop the session and give the model back to the model pool.
+        """
+        super().cleanup()
+        if self.model_entry is not None:
+            self.model_pool.release(self.model_entry)
+            self.model_entry = None
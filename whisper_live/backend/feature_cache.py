@@ -0,0 +1,139 @@
+import numpy as np
+
+from whisper_live.backend.ring_buffer import RingBuffer
+
+
+def normalize_log_mel(log_spec):
+    """
+    Apply Whisper's dynamic range compression and scaling to a log10 Mel spectrogram.
+
+    Args:
+        log_spec (np.ndarray): log10 Mel spectrogram of shape (n_mels, n_frames).
+
+    Returns:
+        np.ndarray: The normalized spectrogram, as returned by `FeatureExtractor`.
+    """
+    log_spec = np.maximum(log_spec, log_spec.max() - 8.0)
+    return (log_spec + 4.0) / 4.0
+
+
+class FeatureCache(object):
+    """
+    log10 Mel spectrogram of a session's audio stream, computed incrementally.
+
+    STFT frames are addressed by absolute frame index, frame `k` being centered on absolute sample
+    `k * hop_length`. A frame is computed once, as soon as the audio on both sides of it has arrived,
+    and kept in a ring buffer that drops the oldest frames in step with the session's audio buffer.
+
+    The features of a window are sliced out of the cache. Only the frames at the edges of the window,
+    which `FeatureExtractor` computes from padded audio, are computed again for every window, so the
+    cost of a pass no longer grows with the length of the window.
+    """
+
+    def __init__(self, feature_extractor, capacity, headroom=0):
+        """
+        Args:
+            feature_extractor (FeatureExtractor): The feature extractor of the model.
+            capacity (int): Number of audio samples covered by the retained frames.
+            headroom (int, optional): Number of dropped audio samples whose frames are kept in storage,
+                                      like the headroom of the audio buffer. Defaults to 0.
+        """
+        self.hop_length = feature_extractor.hop_length
+        self.n_fft = feature_extractor.n_fft
+        self.context = self.n_fft // 2
+        self.mel_filters = feature_extractor.mel_filters
+        self.window = np.hanning(self.n_fft + 1)[:-1].astype(np.float32)
+        self.frames = RingBuffer(
+            capacity // self.hop_length,
+            item_shape=(self.mel_filters.shape[0],),
+            headroom=headroom // self.hop_length,
+        )
+
+    def log_mel(self, audio):
+        """
+        Compute the log10 Mel spectrogram of every full STFT frame in the audio, without padding.
+
+        Args:
+            audio (np.ndarray): Audio samples, at least `n_fft` long.
+
+        Returns:
+            np.ndarray: Spectrogram of shape (n_mels, 1 + (len(audio) - n_fft) // hop_length).
+        """
+        windows = np.lib.stride_tricks.sliding_window_view(audio, self.n_fft)[::self.hop_length]
+        stft = np.fft.rfft(windows * self.window, n=self.n_fft, axis=-1).astype(np.complex64)
+        magnitudes = np.abs(stft.T) ** 2
+        mel_spec = self.mel_filters @ magnitudes
+        return np.log10(np.clip(mel_spec, a_min=1e-10, a_max=None))
+
+    def extract(self, audio):
+        """
+        Compute the log10 Mel spectrogram of the audio the way `FeatureExtractor` does, i.e. with the audio
+        zero padded by one hop and reflect padded at both ends, but without the normalization.
+
+        Args:
+            audio (np.ndarray): Audio samples.
+
+        Returns:
+            np.ndarray: Spectrogram of shape (n_mels, len(audio) // hop_length + 1).
+        """
+        audio = np.pad(audio.astype(np.float32, copy=False), (0, self.hop_length))
+        audio = np.pad(audio, (self.context, self.context), mode="reflect")
+        return self.log_mel(audio)[:, :-1]
+
+    def update(self, audio_buffer):
+        """
+        Compute the frames of the audio that arrived since the last update.
+
+        Args:
+            audio_buffer (RingBuffer): The session's audio buffer.
+        """
+        buffer_start, buffer_end = audio_buffer.start, audio_buffer.end
+        # first frame with its left context still in the buffer, last frame with its right context received
+        first = -(-(buffer_start + self.context) // self.hop_length)
+        last = (buffer_end - self.context) // self.hop_length
+        if self.frames.end < first:
+            self.frames.clear(first)
+        start = self.frames.end
+        if last < start:
+            return
+
+        audio = audio_buffer.view(start * self.hop_length - self.context, last * self.hop_length + self.context)
+        self.frames.append(self.log_mel(audio).T)
+
+    def features(self, audio, start):
+        """
+        Get the log10 Mel spectrogram of a window of the audio stream.
+
+        Frames that are cached are sliced out of the cache; the first frames, if they are not cached, and
+        the frames at the end of the window, whose audio has not fully arrived yet, are computed with the
+        padding of `FeatureExtractor`. The result has the same shape as `FeatureExtractor` returns.
+
+        Args:
+            audio (np.ndarray): Audio of the window.
+            start (int): Absolute sample index of the first sample of the window.
+
+        Returns:
+            np.ndarray: Spectrogram of shape (n_mels, len(audio) // hop_length + 1), not normalized.
+        """
+        n_frames = audio.shape[0] // self.hop_length + 1
+        if start % self.hop_length:
+            # frames of the window do not line up with the cached frames
+            return self.extract(audio)
+
+        offset = start // self.hop_length
+        cached_start = min(max(self.frames.start - offset, 0), n_frames)
+        cached_end = max(min(self.frames.end - offset, n_frames), cached_start)
+        if cached_start == cached_end:
+            return self.extract(audio)
+
+        log_spec = np.empty((self.mel_filters.shape[0], n_frames), dtype=np.float32)
+        log_spec[:, cached_start:cached_end] = self.frames.view(offset + cached_start, offset + cached_end).T
+        if cached_start > 0:
+            head = audio[:(cached_start - 1) * self.hop_length + self.context]
+            log_spec[:, :cached_start] = self.extract(head)[:, :cached_start]
+        if cached_end < n_frames:
+            # recompute from far enough before the first missing frame that the padding does not reach it
+            lead = min(cached_end, -(-self.context // self.hop_length))
+            tail = audio[(cached_end - lead) * self.hop_length:]
+            log_spec[:, cached_end:] = self.extract(tail)[:, lead:]
+        return log_spec
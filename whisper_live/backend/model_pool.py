@@ -0,0 +1,213 @@
+import contextlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class ModelReplica(object):
+    """One copy of a model, running one transcription pass at a time."""
+
+    def __init__(self, model):
+        self.model = model
+        self.lock = threading.Lock()
+        """Held while the replica runs, so that the passes dispatched to it do not interleave their calls."""
+        self.active = 0
+        """Number of passes dispatched to the replica that are running or waiting for it."""
+        self.batch_scheduler = None
+
+    def close(self):
+        """Stop the helpers attached to the replica before it is dropped."""
+        if self.batch_scheduler is not None:
+            self.batch_scheduler.stop()
+            self.batch_scheduler = None
+        self.model = None
+
+
+class ModelEntry(object):
+    """A model held by the pool, together with the state shared by all sessions using it."""
+
+    def __init__(self, key):
+        self.key = key
+        self.replicas = []
+        self.size = 0
+        self.refcount = 0
+        self.pinned = False
+        self.last_used = time.monotonic()
+        self.load_lock = threading.Lock()
+        self.dispatch_lock = threading.Lock()
+
+    @property
+    def model(self):
+        """The first replica of the model, or None if it is not loaded."""
+        return self.replicas[0].model if self.replicas else None
+
+    @contextlib.contextmanager
+    def dispatch(self):
+        """
+        Pick the replica to run a transcription pass on: the one with the fewest passes running or waiting.
+
+        Yields:
+            ModelReplica: The replica, counted as busy until the context exits.
+        """
+        with self.dispatch_lock:
+            replica = min(self.replicas, key=lambda r: r.active)
+            replica.active += 1
+        try:
+            yield replica
+        finally:
+            with self.dispatch_lock:
+                replica.active -= 1
+
+    def close(self):
+        """Stop the helpers attached to the replicas and drop them."""
+        for replica in self.replicas:
+            replica.close()
+        self.replicas = []
+
+
+class ModelPool(object):
+    """
+    Process-wide registry of loaded models, shared by all sessions asking for the same model.
+
+    Models are keyed by e.g. (model id, device, compute type) and reference counted. A model is loaded
+    once, by the first session asking for it, while concurrent sessions asking for the same model wait
+    for that load instead of loading their own copy. Models no longer used by any session stay loaded,
+    so the next session gets them without delay, until the estimated memory of all loaded models
+    exceeds `memory_budget`; then the least recently used ones are unloaded. Models in use and preloaded
+    models are never unloaded.
+
+    Every model is loaded as `replicas` independent copies. Each copy runs one transcription pass at a
+    time and `ModelEntry.dispatch` sends every pass to the least loaded copy, so up to `replicas` passes
+    on the same model run in parallel, at the cost of `replicas` times the memory.
+    """
+
+    def __init__(self, memory_budget=None, replicas=1):
+        """
+        Args:
+            memory_budget (int, optional): Bytes of model weights to keep loaded. Defaults to None, which keeps
+                                           every loaded model.
+            replicas (int, optional): Number of copies of every model to load. Defaults to 1.
+        """
+        self.memory_budget = memory_budget
+        self.replicas = max(1, replicas)
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def acquire(self, key, load):
+        """
+        Get a model from the pool, loading it if needed. Every call must be paired with a `release`.
+
+        Args:
+            key (tuple): The key of the model.
+            load (callable): Called without arguments to load one replica of the model if it is not in the pool.
+
+        Returns:
+            ModelEntry: The entry of the model.
+
+        Raises:
+            Exception: Any exception raised by `load`.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = ModelEntry(key)
+                self.entries[key] = entry
+            entry.refcount += 1
+            entry.last_used = time.monotonic()
+            self.entries.move_to_end(key)
+
+        with entry.load_lock:
+            if entry.model is None:
+                try:
+                    logging.info(f"Loading {self.replicas} replica(s) of model {key} into the model pool.")
+                    models = [load() for _ in range(self.replicas)]
+                except Exception:
+                    with self.lock:
+                        entry.refcount -= 1
+                        if entry.refcount == 0 and self.entries.get(key) is entry:
+                            del self.entries[key]
+                    raise
+                entry.size = sum(self.estimate_size(model) for model in models)
+                entry.replicas = [ModelReplica(model) for model in models]
+
+        with self.lock:
+            self.evict()
+        return entry
+
+    def release(self, entry):
+        """
+        Give back a model taken with `acquire`.
+
+        Args:
+            entry (ModelEntry): The entry returned by `acquire`.
+        """
+        with self.lock:
+            entry.refcount = max(entry.refcount - 1, 0)
+            entry.last_used = time.monotonic()
+            self.evict()
+
+    def preload(self, key, load):
+        """
+        Load a model and keep it loaded regardless of the memory budget.
+
+        Args:
+            key (tuple): The key of the model.
+            load (callable): Called without arguments to load one replica of the model if it is not in the pool.
+
+        Returns:
+            ModelEntry: The entry of the model.
+        """
+        entry = self.acquire(key, load)
+        entry.pinned = True
+        self.release(entry)
+        return entry
+
+    def loaded_size(self):
+        """
+        Returns:
+            int: Estimated bytes of all loaded models.
+        """
+        return sum(entry.size for entry in self.entries.values() if entry.model is not None)
+
+    def evict(self):
+        """Unload the least recently used idle models until the budget is met. Must be called with the lock held."""
+        if self.memory_budget is None:
+            return
+        total = self.loaded_size()
+        for key, entry in list(self.entries.items()):
+            if total <= self.memory_budget:
+                break
+            if entry.refcount > 0 or entry.pinned or entry.model is None:
+                continue
+            logging.info(f"Unloading least recently used model {key} from the model pool.")
+            total -= entry.size
+            del self.entries[key]
+            entry.close()
+        if total > self.memory_budget:
+            logging.warning(
+                f"Models in use need {total / 2**20:.0f} MB, more than the model memory budget of "
+                f"{self.memory_budget / 2**20:.0f} MB."
+            )
+
+    @staticmethod
+    def estimate_size(model):
+        """
+        Estimate the memory used by a model from the size of its weights on disk.
+
+        Args:
+            model: The loaded model. Its files are looked up in its `model_path` attribute, if it has one.
+
+        Returns:
+            int: Estimated size in bytes, 0 if unknown.
+        """
+        model_path = getattr(model, "model_path", None)
+        if not model_path or not os.path.isdir(model_path):
+            return 0
+        size = 0
+        for name in os.listdir(model_path):
+            path = os.path.join(model_path, name)
+            if os.path.isfile(path):
+                size += os.path.getsize(path)
+        return size
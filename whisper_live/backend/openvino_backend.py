@@ -9,6 +9,7 @@ from whisper_live.transcriber.transcriber_openvino import WhisperOpenVINO
 
 
 class ServeClientOpenVINO(ServeClientBase):
+    BACKEND = "openvino"
     SINGLE_MODEL = None
     SINGLE_MODEL_LOCK = threading.Lock()
 
@@ -28,6 +29,11 @@ class ServeClientOpenVINO(ServeClientBase):
         no_speech_thresh=0.45,
         clip_audio=False,
         same_output_threshold=10,
+        worker_pool=None,
+        metrics=None,
+        protocol_version=1,
+        target_latency_ms=None,
+        mode="live",
     ):
         """
         Initialize a ServeClient instance.
@@ -48,6 +54,16 @@ class ServeClientOpenVINO(ServeClientBase):
             no_speech_thresh (float, optional): Segments with no speech probability above this threshold will be discarded. Defaults to 0.45.
             clip_audio (bool, optional): Whether to clip audio with no valid segments. Defaults to False.
             same_output_threshold (int, optional): Number of repeated outputs before considering it as a valid segment. Defaults to 10.
+            worker_pool (TranscriptionWorkerPool, optional): Shared pool running the transcription passes. If None,
+                                                             the session runs on its own thread. Defaults to None.
+            metrics (ServerMetrics, optional): Server metrics to record the transcription passes in. Defaults to None.
+            protocol_version (int, optional): Version of the transcript protocol, 1 to send the last segments on
+                                              every pass or 2 to send only what changed. Defaults to 1.
+            target_latency_ms (float, optional): Milliseconds from receiving audio to sending its transcription
+                                                 that the pacing of the transcription passes aims for.
+                                                 Defaults to 1000 ms.
+            mode (str, optional): How the client sends its audio, "live" in real time or "file" as fast as it is
+                                  transcribed. Defaults to "live".
         """
         super().__init__(
             client_uid,
@@ -56,6 +72,11 @@ class ServeClientOpenVINO(ServeClientBase):
             no_speech_thresh,
             clip_audio,
             same_output_threshold,
+            worker_pool=worker_pool,
+            metrics=metrics,
+            protocol_version=protocol_version,
+            target_latency_ms=target_latency_ms,
+            mode=mode,
         )
         self.language = "en" if language is None else language
         if not self.language.startswith("<|"):
@@ -84,9 +105,7 @@ class ServeClientOpenVINO(ServeClientBase):
         else:
             self.create_model(model)
 
-        # threading
-        self.trans_thread = threading.Thread(target=self.speech_to_text)
-        self.trans_thread.start()
+        self.start_transcription()
 
         self.websocket.send(json.dumps({
             "uid": self.client_uid,
@@ -124,7 +143,9 @@ class ServeClientOpenVINO(ServeClientBase):
             includes the transcribed text.
         """
         if ServeClientOpenVINO.SINGLE_MODEL:
+            wait_start = time.perf_counter()
             ServeClientOpenVINO.SINGLE_MODEL_LOCK.acquire()
+            self.record_lock_wait(time.perf_counter() - wait_start)
         result = self.transcriber.transcribe(input_sample)
         if ServeClientOpenVINO.SINGLE_MODEL:
             ServeClientOpenVINO.SINGLE_MODEL_LOCK.release()
@@ -138,11 +159,7 @@ class ServeClientOpenVINO(ServeClientBase):
             result (str): The result from whisper inference i.e. the list of segments.
             duration (float): Duration of the transcribed audio chunk.
         """
-        segments = []
         if len(result):
             self.t_start = None
             last_segment = self.update_segments(result, duration)
-            segments = self.prepare_segments(last_segment)
-
-        if len(segments):
-            self.send_transcription_to_client(segments)
+            self.send_transcript_update(last_segment)
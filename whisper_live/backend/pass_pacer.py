@@ -0,0 +1,75 @@
+class PassPacer(object):
+    """
+    Decides how often a session runs a transcription pass.
+
+    New audio waits for the next pass and then for the pass itself, so a pass is due once
+    `target_latency` minus the inference time of a pass worth of new audio has arrived. The inference
+    time is measured, as a moving average over the passes of the session.
+
+    When the worker pool is saturated, every pass also waits for a free worker and takes a turn from
+    the other sessions. Passes are then spaced by the inference time scaled by the load, so that a
+    session asks for no more than its share of the workers instead of queueing passes over windows that
+    only grew by a fraction of a second.
+    """
+
+    DEFAULT_TARGET_LATENCY = 1.0
+    """Seconds from receiving audio to sending its transcription, if the client does not ask otherwise."""
+    MIN_NEW_AUDIO = 0.2
+    """Seconds of new audio below which a pass is never worth running."""
+    MAX_NEW_AUDIO = 5.0
+    """Seconds of new audio after which a pass is always run, however loaded the server is."""
+    SMOOTHING = 0.3
+    """Weight of the latest pass in the moving average of the inference time."""
+
+    def __init__(self, target_latency=None, worker_pool=None):
+        """
+        Args:
+            target_latency (float, optional): Seconds from receiving audio to sending its transcription.
+                                              Defaults to `DEFAULT_TARGET_LATENCY`.
+            worker_pool (TranscriptionWorkerPool, optional): The pool running the passes, to read the load
+                                                             from. Defaults to None, for no shared load.
+        """
+        self.target_latency = target_latency or self.DEFAULT_TARGET_LATENCY
+        self.worker_pool = worker_pool
+        self.inference_time = 0.0
+
+    def record_pass(self, inference_time):
+        """
+        Args:
+            inference_time (float): Seconds taken by a pass.
+        """
+        if self.inference_time == 0.0:
+            self.inference_time = inference_time
+        else:
+            self.inference_time += self.SMOOTHING * (inference_time - self.inference_time)
+
+    def load(self):
+        """
+        Returns:
+            float: Passes running or due per worker, 0 without a worker pool.
+        """
+        return self.worker_pool.load() if self.worker_pool is not None else 0.0
+
+    def new_audio_needed(self):
+        """
+        Returns:
+            float: Seconds of new audio to wait for before the next pass.
+        """
+        needed = self.target_latency - self.inference_time
+        load = self.load()
+        if load > 1:
+            needed = max(needed, self.inference_time * load)
+        return min(max(needed, self.MIN_NEW_AUDIO), self.MAX_NEW_AUDIO)
+
+    def repeat_delay(self, delay):
+        """
+        Args:
+            delay (float): Seconds after which a pass over the same audio would run on an idle server.
+
+        Returns:
+            float: The delay, stretched by the load of the server.
+        """
+        load = self.load()
+        if load > 1:
+            return max(delay, self.inference_time * load)
+        return delay
@@ -0,0 +1,101 @@
+import numpy as np
+
+
+class RingBuffer(object):
+    """
+    Fixed-capacity circular buffer addressed by absolute item index.
+
+    Items are appended at `end` and the oldest items are dropped once more than `capacity` items are
+    retained, so `start` only moves forward. Every item is stored twice, in two mirrored halves of the
+    backing array, which makes any retained range readable as one contiguous view without copying.
+
+    A view stays valid until `capacity + headroom` further items have been appended after its first
+    item, so readers can keep using it while new audio keeps arriving.
+    """
+
+    def __init__(self, capacity, dtype=np.float32, item_shape=(), headroom=0):
+        """
+        Args:
+            capacity (int): Maximum number of items retained in the buffer.
+            dtype (np.dtype, optional): Data type of the items. Defaults to float32.
+            item_shape (tuple, optional): Shape of a single item, e.g. `(n_mels,)` for spectrogram frames.
+                                          Defaults to scalar items.
+            headroom (int, optional): Number of extra items kept in storage behind `start` so that views
+                                      handed out earlier are not overwritten immediately. Defaults to 0.
+        """
+        if capacity <= 0:
+            raise ValueError(f"Ring buffer capacity must be positive, got {capacity}")
+        self.capacity = int(capacity)
+        self.size = self.capacity + int(headroom)
+        self.data = np.zeros((2 * self.size,) + tuple(item_shape), dtype=dtype)
+        self.start = 0
+        self.end = 0
+
+    def __len__(self):
+        return self.end - self.start
+
+    def append(self, items):
+        """
+        Append items at the end of the buffer, dropping the oldest items if the capacity is exceeded.
+
+        Args:
+            items (np.ndarray): Items to append, along the first axis.
+
+        Returns:
+            int: The number of items that were dropped from the start of the buffer.
+        """
+        n = items.shape[0]
+        if n == 0:
+            return 0
+        if n > self.size:
+            # only the newest items can be stored
+            self.end += n - self.size
+            items = items[-self.size:]
+            n = self.size
+
+        pos = self.end % self.size
+        first = min(n, self.size - pos)
+        self.data[pos:pos + first] = items[:first]
+        self.data[pos + self.size:pos + self.size + first] = items[:first]
+        if first < n:
+            rest = n - first
+            self.data[:rest] = items[first:]
+            self.data[self.size:self.size + rest] = items[first:]
+        self.end += n
+
+        dropped = 0
+        if self.end - self.start > self.capacity:
+            new_start = self.end - self.capacity
+            dropped = new_start - self.start
+            self.start = new_start
+        return dropped
+
+    def view(self, start=None, end=None):
+        """
+        Get a read-only contiguous view of the items in the absolute range [start, end).
+
+        The range is clipped to the items currently retained in the buffer.
+
+        Args:
+            start (int, optional): Absolute index of the first item. Defaults to `self.start`.
+            end (int, optional): Absolute index one past the last item. Defaults to `self.end`.
+
+        Returns:
+            np.ndarray: A read-only view of the requested items.
+        """
+        start = self.start if start is None else min(max(int(start), self.start), self.end)
+        end = self.end if end is None else min(max(int(end), start), self.end)
+        pos = start % self.size
+        view = self.data[pos:pos + end - start]
+        view.flags.writeable = False
+        return view
+
+    def clear(self, position=None):
+        """
+        Drop all items and optionally move the buffer to a new absolute position.
+
+        Args:
+            position (int, optional): The absolute index the next appended item will get. Defaults to `self.end`.
+        """
+        self.end = self.end if position is None else int(position)
+        self.start = self.end
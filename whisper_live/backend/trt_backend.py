@@ -8,8 +8,10 @@ from whisper_live.transcriber.transcriber_tensorrt import WhisperTRTLLM
 
 
 class ServeClientTensorRT(ServeClientBase):
+    BACKEND = "tensorrt"
     SINGLE_MODEL = None
     SINGLE_MODEL_LOCK = threading.Lock()
+    MIN_CHUNK_DURATION = 0.4
 
     def __init__(
         self,
@@ -26,6 +28,10 @@ class ServeClientTensorRT(ServeClientBase):
         no_speech_thresh=0.45,
         clip_audio=False,
         same_output_threshold=10,
+        worker_pool=None,
+        metrics=None,
+        protocol_version=1,
+        target_latency_ms=None,
     ):
         """
         Initialize a ServeClient instance.
@@ -47,6 +53,14 @@ class ServeClientTensorRT(ServeClientBase):
             no_speech_thresh (float, optional): Segments with no speech probability above this threshold will be discarded. Defaults to 0.45.
             clip_audio (bool, optional): Whether to clip audio with no valid segments. Defaults to False.
             same_output_threshold (int, optional): Number of repeated outputs before considering it as a valid segment. Defaults to 10.
+            worker_pool (TranscriptionWorkerPool, optional): Shared pool running the transcription passes. If None,
+                                                             the session runs on its own thread. Defaults to None.
+            metrics (ServerMetrics, optional): Server metrics to record the transcription passes in. Defaults to None.
+            protocol_version (int, optional): Version of the transcript protocol, 1 to send the last segments on
+                                              every pass or 2 to send only what changed. Defaults to 1.
+            target_latency_ms (float, optional): Milliseconds from receiving audio to sending its transcription
+                                                 that the pacing of the transcription passes aims for.
+                                                 Defaults to 1000 ms.
         """
         super().__init__(
             client_uid,
@@ -55,6 +69,10 @@ class ServeClientTensorRT(ServeClientBase):
             no_speech_thresh,
             clip_audio,
             same_output_threshold,
+            worker_pool=worker_pool,
+            metrics=metrics,
+            protocol_version=protocol_version,
+            target_latency_ms=target_latency_ms,
         )
 
         self.language = language if multilingual else "en"
@@ -71,9 +89,7 @@ class ServeClientTensorRT(ServeClientBase):
         else:
             self.create_model(model, multilingual, use_py_session=use_py_session)
 
-        # threading
-        self.trans_thread = threading.Thread(target=self.speech_to_text)
-        self.trans_thread.start()
+        self.start_transcription()
 
         self.websocket.send(json.dumps({
             "uid": self.client_uid,
@@ -114,12 +130,17 @@ class ServeClientTensorRT(ServeClientBase):
         """
         Sets the End of Speech (EOS) flag.
 
+        At the end of speech the session is signalled as ready, so that the pending audio is
+        transcribed and committed without waiting for more audio.
+
         Args:
             eos (bool): The value to set for the EOS flag.
         """
         self.lock.acquire()
         self.eos = eos
         self.lock.release()
+        if eos:
+            self.notify_ready()
 
     def handle_transcription_output(self, last_segment, duration):
         """
@@ -130,8 +151,7 @@ class ServeClientTensorRT(ServeClientBase):
                                 of the possibility of word being truncated.
             duration (float): Duration of the transcribed audio chunk.
         """
-        segments = self.prepare_segments({"text": last_segment})
-        self.send_transcription_to_client(segments)
+        self.send_transcript_update({"text": last_segment})
         if self.eos:
             self.update_timestamp_offset(last_segment, duration)
 
@@ -143,7 +163,9 @@ class ServeClientTensorRT(ServeClientBase):
             input_bytes (np.array): The audio chunk to transcribe.
         """
         if ServeClientTensorRT.SINGLE_MODEL:
+            wait_start = time.perf_counter()
             ServeClientTensorRT.SINGLE_MODEL_LOCK.acquire()
+            self.record_lock_wait(time.perf_counter() - wait_start)
         logging.info(f"[WhisperTensorRT:] Processing audio with duration: {input_bytes.shape[0] / self.RATE}")
         mel, duration = self.transcriber.log_mel_spectrogram(input_bytes)
         last_segment = self.transcriber.transcribe(
@@ -152,6 +174,7 @@ class ServeClientTensorRT(ServeClientBase):
         )
         if ServeClientTensorRT.SINGLE_MODEL:
             ServeClientTensorRT.SINGLE_MODEL_LOCK.release()
+        self.last_result = last_segment
         if last_segment:
             self.handle_transcription_output(last_segment, duration)
 
@@ -171,40 +194,38 @@ class ServeClientTensorRT(ServeClientBase):
         with self.lock:
             self.timestamp_offset += duration
 
-    def speech_to_text(self):
-        """
-        Process an audio stream in an infinite loop, continuously transcribing the speech.
-
-        This method continuously receives audio frames, performs real-time transcription, and sends
-        transcribed segments to the client via a WebSocket connection.
-
-        If the client's language is not detected, it waits for 30 seconds of audio input to make a language prediction.
-        It utilizes the Whisper ASR model to transcribe the audio, continuously processing and streaming results. Segments
-        are sent to the client in real-time, and a history of segments is maintained to provide context.
-
-        Raises:
-            Exception: If there is an issue with audio processing or WebSocket communication.
-
-        """
-        while True:
-            if self.exit:
-                logging.info("Exiting speech to text thread")
-                break
-
-            if self.frames_np is None:
-                time.sleep(0.02)    # wait for any audio to arrive
-                continue
-
-            self.clip_audio_if_no_valid_segment()
-
-            input_bytes, duration = self.get_audio_chunk_for_processing()
-            if duration < 0.4:
-                continue
-
-            try:
-                input_sample = input_bytes.copy()
-                logging.info(f"[WhisperTensorRT:] Processing audio with duration: {duration}")
-                self.transcribe_audio(input_sample)
-
-            except Exception as e:
-                logging.error(f"[ERROR]: {e}")
+    def process_audio_chunk(self):
+        """
+        Run a single transcription pass over the untranscribed audio.
+
+        The output is sent to the client as a partial result; the audio is only committed to the
+        transcript once the client signalled the end of speech. If no audio arrived since the last pass,
+        e.g. when the end of speech is signalled, the output of the last pass is used again.
+
+        Returns:
+            None: The next pass waits until more audio arrives or the end of speech is signalled.
+        """
+        self.clip_audio_if_no_valid_segment()
+
+        input_bytes, duration = self.get_audio_chunk_for_processing()
+        if duration < self.MIN_CHUNK_DURATION:
+            return None
+        window = (self.chunk_start, self.chunk_start + input_bytes.shape[0])
+
+        try:
+            if window == self.last_window and self.last_result:
+                self.handle_transcription_output(self.last_result, duration)
+                return None
+            # the buffer hands out read-only views, the mel spectrogram needs a writable array
+            input_sample = input_bytes.copy()
+            logging.info(f"[WhisperTensorRT:] Processing audio with duration: {duration}")
+            pass_start = time.perf_counter()
+            self.last_window = window
+            self.transcribe_audio(input_sample)
+            self.record_pass(time.perf_counter() - pass_start, duration)
+
+        except Exception as e:
+            logging.error(f"[ERROR]: {e}")
+        finally:
+            self.new_audio_needed = self.pacer.new_audio_needed()
+        return None
@@ -0,0 +1,160 @@
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+
+
+class TranscriptionWorkerPool(object):
+    """
+    A bounded pool of threads running transcription passes for all connected sessions.
+
+    Sessions are not bound to a thread. A session is scheduled when it becomes ready, e.g. when
+    enough new audio has arrived, and one of the workers then runs a single pass of it by calling
+    `session.process_audio_chunk()`. The pass returns the delay before the session wants to run
+    again, or None if it should wait until it is scheduled again. A session is never queued twice
+    and never runs on two workers at the same time; if it becomes ready while a pass is running,
+    it is queued again as soon as that pass has finished.
+    """
+
+    def __init__(self, num_workers=None):
+        """
+        Args:
+            num_workers (int, optional): Number of worker threads. Defaults to the number of CPUs plus 4,
+                                         capped at 32.
+        """
+        if not num_workers:
+            num_workers = min(32, (os.cpu_count() or 1) + 4)
+        self.num_workers = num_workers
+        self.cond = threading.Condition()
+        self.heap = []
+        self.counter = itertools.count()
+        self.queued = {}
+        self.running = set()
+        self.rerun = {}
+        self.exit = False
+
+        self.threads = [
+            threading.Thread(target=self.worker, name=f"transcription-worker-{i}", daemon=True)
+            for i in range(num_workers)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def schedule(self, session, delay=0.0):
+        """
+        Queue a transcription pass for a session.
+
+        If the session is already queued, the earlier of the two due times is kept. If a pass of
+        the session is currently running, the new pass is queued once it has finished.
+
+        Args:
+            session (ServeClientBase): The session to run.
+            delay (float, optional): Seconds to wait before running the pass. Defaults to 0.
+        """
+        due = time.monotonic() + delay
+        with self.cond:
+            if self.exit:
+                return
+            if session in self.running:
+                if session not in self.rerun or due < self.rerun[session]:
+                    self.rerun[session] = due
+                return
+            self.push(session, due)
+
+    def push(self, session, due):
+        """Queue a session, must be called with the condition held."""
+        if session in self.queued and self.queued[session] <= due:
+            return
+        self.queued[session] = due
+        heapq.heappush(self.heap, (due, next(self.counter), session))
+        self.cond.notify()
+
+    def pop(self):
+        """
+        Wait for the next session that is due.
+
+        Returns:
+            ServeClientBase: The session to run, or None if the pool is shutting down.
+        """
+        with self.cond:
+            while not self.exit:
+                if self.heap:
+                    due, _, session = self.heap[0]
+                    if self.queued.get(session) != due:
+                        # stale entry, the session was queued again with an earlier due time
+                        heapq.heappop(self.heap)
+                        continue
+                    timeout = due - time.monotonic()
+                    if timeout <= 0:
+                        heapq.heappop(self.heap)
+                        del self.queued[session]
+                        self.running.add(session)
+                        return session
+                    self.cond.wait(timeout)
+                else:
+                    self.cond.wait()
+            return None
+
+    def worker(self):
+        """Worker loop, runs passes of due sessions until the pool is shut down."""
+        while True:
+            session = self.pop()
+            if session is None:
+                break
+
+            delay = None
+            if not session.exit:
+                try:
+                    delay = session.process_audio_chunk()
+                except Exception as e:
+                    logging.error(f"[ERROR]: Transcription pass failed for client {session.client_uid}: {e}")
+
+            with self.cond:
+                self.running.discard(session)
+                due = self.rerun.pop(session, None)
+                if session.exit:
+                    continue
+                if delay is not None:
+                    next_due = time.monotonic() + delay
+                    due = next_due if due is None else min(due, next_due)
+                if due is not None:
+                    self.push(session, due)
+
+    def queue_depth(self):
+        """
+        Returns:
+            int: Number of sessions that are due and waiting for a free worker.
+        """
+        now = time.monotonic()
+        with self.cond:
+            return sum(1 for due in self.queued.values() if due <= now)
+
+    def load(self):
+        """
+        Returns:
+            float: Passes running or due and waiting for a worker, per worker. Above 1 the pool is saturated.
+        """
+        now = time.monotonic()
+        with self.cond:
+            due = sum(1 for due in self.queued.values() if due <= now)
+            return (len(self.running) + due) / self.num_workers
+
+    def busy_workers(self):
+        """
+        Returns:
+            int: Number of workers currently running a pass.
+        """
+        with self.cond:
+            return len(self.running)
+
+    def shutdown(self):
+        """Stop all worker threads after their current pass."""
+        with self.cond:
+            self.exit = True
+            self.heap = []
+            self.queued = {}
+            self.cond.notify_all()
+        for thread in self.threads:
+            thread.join()
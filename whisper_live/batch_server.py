@@ -0,0 +1,418 @@
+import contextlib
+import functools
+import json
+import logging
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from whisper_live.audio_decoder import decode_audio_file
+from whisper_live.backend.model_pool import ModelPool
+from whisper_live.utils import format_time
+
+
+class JobQueueFull(Exception):
+    """Raised when a batch job arrives while the job queue is full."""
+
+
+class BatchJobQueue(object):
+    """
+    Admission control of batch jobs: runs at most `max_jobs` jobs at a time and lets at most
+    `max_queued_jobs` more wait for a slot. Jobs arriving beyond that are rejected instead of piling up.
+
+    A job takes its place in the queue with `reserve` before its file is received, so that the uploads of
+    rejected jobs are not read, and then waits for a slot to run in with `admit`.
+    """
+
+    def __init__(self, max_jobs=1, max_queued_jobs=8):
+        """
+        Args:
+            max_jobs (int, optional): Jobs running at the same time. Defaults to 1.
+            max_queued_jobs (int, optional): Jobs waiting for a running job to finish. Defaults to 8.
+        """
+        self.max_jobs = max(1, max_jobs)
+        self.max_queued_jobs = max(0, max_queued_jobs)
+        self.cond = threading.Condition()
+        self.running = 0
+        self.waiting = 0
+
+    @contextlib.contextmanager
+    def reserve(self):
+        """
+        Take a place in the queue and hold it until the context exits.
+
+        Raises:
+            JobQueueFull: If all slots are taken and `max_queued_jobs` jobs are already waiting.
+        """
+        with self.cond:
+            if self.running + self.waiting >= self.max_jobs + self.max_queued_jobs:
+                raise JobQueueFull()
+            self.waiting += 1
+        try:
+            yield
+        finally:
+            with self.cond:
+                self.waiting -= 1
+
+    @contextlib.contextmanager
+    def admit(self):
+        """
+        Wait for a free slot for a job holding a place in the queue, and hold the slot until the context exits.
+        """
+        with self.cond:
+            while self.running >= self.max_jobs:
+                self.cond.wait()
+            self.waiting -= 1
+            self.running += 1
+        try:
+            yield
+        finally:
+            with self.cond:
+                self.running -= 1
+                self.waiting += 1
+                self.cond.notify()
+
+
+def format_srt(segments):
+    """
+    Args:
+        segments (list): Segments with "start" and "end" in seconds and "text".
+
+    Returns:
+        str: The segments as SubRip subtitles.
+    """
+    return "".join(
+        f"{i}\n{format_time(segment['start'])} --> {format_time(segment['end'])}\n{segment['text'].strip()}\n\n"
+        for i, segment in enumerate(segments, start=1)
+    )
+
+
+def format_vtt(segments):
+    """
+    Args:
+        segments (list): Segments with "start" and "end" in seconds and "text".
+
+    Returns:
+        str: The segments as WebVTT subtitles.
+    """
+    def vtt_time(seconds):
+        return format_time(seconds).replace(",", ".")
+
+    return "WEBVTT\n\n" + "".join(
+        f"{vtt_time(segment['start'])} --> {vtt_time(segment['end'])}\n{segment['text'].strip()}\n\n"
+        for segment in segments
+    )
+
+
+class BatchTranscriptionServer(object):
+    """
+    Transcribes uploaded files over HTTP, next to the live websocket sessions.
+
+    A file is decoded with PyAV, split on the speech regions found by VAD, and the chunks are decoded in
+    batches by `BatchedInferencePipeline`. The models are taken from the same model pool as the live
+    sessions, so a model the live sessions use is not loaded again. Jobs go through a `BatchJobQueue`,
+    and the shared replica is only held for one batch at a time, so that the passes of live sessions
+    run between the batches of a long file. While the transcription workers of the live sessions are
+    saturated, a job also waits before each batch, up to `MAX_BATCH_DELAY`.
+    """
+
+    RESPONSE_FORMATS = ("json", "srt", "vtt", "text")
+    """Formats of the transcription a request can ask for with `response_format`."""
+    MAX_UPLOAD_BYTES = 25 * 2**20
+    """Largest request body accepted, the file size limit of the OpenAI transcription API. The bodies of the
+    jobs holding a place in the job queue are kept in memory."""
+    BACKOFF = 0.05
+    """Seconds a job waits at a time for the live sessions to catch up."""
+    MAX_BATCH_DELAY = 1.0
+    """Seconds a batch is delayed at most while the live sessions are saturating the workers."""
+
+    def __init__(self, model_pool=None, worker_pool=None, model="small", cache_path="~/.cache/whisper-live/",
+                 batch_size=8, max_jobs=1, max_queued_jobs=8):
+        """
+        Args:
+            model_pool (ModelPool, optional): The pool of the models of the live sessions. Defaults to None,
+                                              for a pool of the batch jobs only.
+            worker_pool (TranscriptionWorkerPool, optional): The pool running the passes of the live sessions,
+                                                             to read the load from. Defaults to None.
+            model (str, optional): Model used by jobs not asking for one. Defaults to "small".
+            cache_path (str, optional): Path to cache the converted ctranslate2 models.
+            batch_size (int, optional): Chunks decoded in one batch. Defaults to 8.
+            max_jobs (int, optional): Jobs running at the same time. Defaults to 1.
+            max_queued_jobs (int, optional): Jobs waiting for a running job to finish. Defaults to 8.
+        """
+        self.model_pool = model_pool if model_pool is not None else ModelPool()
+        self.worker_pool = worker_pool
+        self.model = model
+        self.cache_path = cache_path
+        self.batch_size = batch_size
+        self.job_queue = BatchJobQueue(max_jobs, max_queued_jobs)
+        self.httpd = None
+
+    def serve(self, host, port):
+        """
+        Start serving `POST /v1/audio/transcriptions` on a background thread.
+
+        Args:
+            host (str): The host address to bind the HTTP listener.
+            port (int): The port number to bind the HTTP listener.
+        """
+        handler = functools.partial(BatchRequestHandler, self)
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, name="batch-http", daemon=True).start()
+
+    def shutdown(self):
+        """Stop serving requests."""
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+    def transcribe(self, data, model=None, language=None, task="transcribe"):
+        """
+        Transcribe an audio file, once the job queue admits it. The job must hold a place in the job queue,
+        see `BatchJobQueue.reserve`.
+
+        Args:
+            data (bytes): The content of the file.
+            model (str, optional): The whisper model size, huggingface model id or path to a custom model.
+                                   Defaults to the model of the server.
+            language (str, optional): The language spoken in the file. Detected if not set.
+            task (str, optional): "transcribe" or "translate". Defaults to "transcribe".
+
+        Returns:
+            dict: The language, the duration and the segments of the file.
+
+        Raises:
+            ValueError: If the file could not be decoded.
+        """
+        with self.job_queue.admit():
+            audio = decode_audio_file(data)
+            from whisper_live.backend.faster_whisper_backend import ServeClientFasterWhisper
+            model = model or self.model
+            device, compute_type = ServeClientFasterWhisper.get_device_and_compute_type()
+            load = functools.partial(ServeClientFasterWhisper.load_model, model, device, compute_type, self.cache_path)
+            model_entry = self.model_pool.acquire((model, device, compute_type), load)
+            try:
+                with model_entry.dispatch() as replica:
+                    return self.run_pipeline(replica, audio, language, task)
+            finally:
+                self.model_pool.release(model_entry)
+
+    def run_pipeline(self, replica, audio, language, task):
+        """
+        Run `BatchedInferencePipeline` over the audio, holding the replica for language detection and then
+        for one batch at a time.
+
+        The pipeline runs VAD and extracts the features of the whole file before it returns its first
+        segment. These steps do not need the replica, so the speech chunks are found, and the language
+        detected, before the pipeline is run, and the replica is not held while it prepares the file.
+
+        Args:
+            replica (ModelReplica): The replica the job was dispatched to.
+            audio (np.ndarray): The float32 audio at 16kHz.
+            language (str): The language spoken in the audio, or None to detect it.
+            task (str): "transcribe" or "translate".
+
+        Returns:
+            dict: The language, the duration and the segments of the audio.
+        """
+        from whisper_live.transcriber.transcriber_faster_whisper import BatchedInferencePipeline
+        pipeline = BatchedInferencePipeline(replica.model)
+        forward = pipeline.forward
+
+        def forward_batch(*args):
+            self.yield_to_live_sessions()
+            with replica.lock:
+                return forward(*args)
+
+        pipeline.forward = forward_batch
+        clip_timestamps = self.speech_chunks(replica.model, audio)
+        if language is None:
+            language = self.detect_language(replica, audio, clip_timestamps)
+        if not clip_timestamps:
+            duration = audio.shape[0] / replica.model.feature_extractor.sampling_rate
+            return {"language": language, "duration": duration, "segments": []}
+        segments, info = pipeline.transcribe(
+            audio, language=language, task=task, batch_size=self.batch_size, clip_timestamps=clip_timestamps)
+        results = [{"start": segment.start, "end": segment.end, "text": segment.text} for segment in segments]
+        return {"language": info.language, "duration": info.duration, "segments": results}
+
+    @staticmethod
+    def speech_chunks(model, audio):
+        """
+        Find the chunks of speech of the audio the way `BatchedInferencePipeline` does with `vad_filter`.
+
+        Args:
+            model (WhisperModel): The model the audio is transcribed with.
+            audio (np.ndarray): The float32 audio at 16kHz.
+
+        Returns:
+            list: Dicts with the start and end sample of each chunk, at most one window of the model long.
+        """
+        from faster_whisper.vad import VadOptions, get_speech_timestamps, merge_segments
+        vad_parameters = VadOptions(
+            max_speech_duration_s=model.feature_extractor.chunk_length,
+            min_silence_duration_ms=160,
+        )
+        return merge_segments(get_speech_timestamps(audio, vad_parameters), vad_parameters)
+
+    def detect_language(self, replica, audio, clip_timestamps):
+        """
+        Detect the language of the first window of speech, like `BatchedInferencePipeline` does. Only the
+        features of that window are extracted, and the replica is only held for the detection itself.
+
+        Args:
+            replica (ModelReplica): The replica the job was dispatched to.
+            audio (np.ndarray): The float32 audio at 16kHz.
+            clip_timestamps (list): The chunks of speech of the audio.
+
+        Returns:
+            str: The detected language.
+        """
+        model = replica.model
+        if not model.model.is_multilingual:
+            return "en"
+        features, num_frames = [], 0
+        for chunk in clip_timestamps:
+            if num_frames >= model.feature_extractor.nb_max_frames:
+                break
+            features.append(model.feature_extractor(audio[chunk["start"]:chunk["end"]])[..., :-1])
+            num_frames += features[-1].shape[-1]
+        # add a dummy feature to account for audio without speech
+        features.append(np.full((model.model.n_mels, 1), -1.5, dtype=np.float32))
+        self.yield_to_live_sessions()
+        with replica.lock:
+            language, _, _ = model.detect_language(features=np.concatenate(features, axis=1))
+        return language
+
+    def yield_to_live_sessions(self):
+        """Wait while the live sessions are saturating the transcription workers, up to `MAX_BATCH_DELAY`."""
+        if self.worker_pool is None:
+            return
+        deadline = time.monotonic() + self.MAX_BATCH_DELAY
+        while self.worker_pool.load() > 1 and time.monotonic() < deadline:
+            time.sleep(self.BACKOFF)
+
+
+class BatchRequestHandler(BaseHTTPRequestHandler):
+    """
+    Handles `POST /v1/audio/transcriptions`.
+
+    The file is sent either as the `file` field of a multipart/form-data body, along with the `model`,
+    `language`, `task` and `response_format` fields, or as the raw request body with the fields in the
+    query string.
+    """
+
+    PATH = "/v1/audio/transcriptions"
+
+    def __init__(self, batch_server, *args, **kwargs):
+        self.batch_server = batch_server
+        super().__init__(*args, **kwargs)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != self.PATH:
+            self.send_error_json(404, f"Unknown path {url.path}")
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > self.batch_server.MAX_UPLOAD_BYTES:
+            self.close_connection = True
+            self.send_error_json(413, "File too large")
+            return
+        try:
+            with self.batch_server.job_queue.reserve():
+                self.handle_job(url, length)
+        except JobQueueFull:
+            # the body is not read, the connection cannot be reused
+            self.close_connection = True
+            self.send_error_json(503, "Too many transcription jobs, try again later", retry_after=5)
+
+    def handle_job(self, url, length):
+        """
+        Read the file of a job holding a place in the job queue, transcribe it and send the transcription.
+
+        Args:
+            url (ParseResult): The URL of the request.
+            length (int): The length of the request body.
+        """
+        body = self.rfile.read(length)
+        fields = {name: values[0] for name, values in parse_qs(url.query).items()}
+        content_type = self.headers.get("Content-Type", "")
+        if content_type.startswith("multipart/form-data"):
+            form = self.parse_form(content_type, body)
+            body = form.pop("file", None)
+            fields.update((name, value.decode("utf-8")) for name, value in form.items())
+        if not body:
+            self.send_error_json(400, "No audio file in the request")
+            return
+
+        response_format = fields.get("response_format", "json")
+        if response_format not in self.batch_server.RESPONSE_FORMATS:
+            self.send_error_json(400, f"Unsupported response_format {response_format}")
+            return
+        task = fields.get("task", "transcribe")
+        if task not in ("transcribe", "translate"):
+            self.send_error_json(400, f"Unsupported task {task}")
+            return
+
+        try:
+            result = self.batch_server.transcribe(
+                body, model=fields.get("model"), language=fields.get("language"), task=task)
+        except ValueError as e:
+            self.send_error_json(400, str(e))
+            return
+        except Exception as e:
+            logging.error(f"[ERROR]: Batch transcription failed: {e}")
+            self.send_error_json(500, "Transcription failed")
+            return
+
+        if response_format == "srt":
+            self.send_body(200, format_srt(result["segments"]), "application/x-subrip")
+        elif response_format == "vtt":
+            self.send_body(200, format_vtt(result["segments"]), "text/vtt")
+        elif response_format == "text":
+            self.send_body(200, "".join(s["text"] for s in result["segments"]).strip(), "text/plain")
+        else:
+            result["text"] = "".join(s["text"] for s in result["segments"]).strip()
+            self.send_body(200, json.dumps(result), "application/json")
+
+    @staticmethod
+    def parse_form(content_type, body):
+        """
+        Args:
+            content_type (str): The Content-Type header, with the boundary of the parts.
+            body (bytes): The multipart/form-data body.
+
+        Returns:
+            dict: The content of every field, by field name.
+        """
+        message = BytesParser(policy=HTTP).parsebytes(b"Content-Type: " + content_type.encode() + b"\r\n\r\n" + body)
+        form = {}
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            if name is not None:
+                form[name] = part.get_payload(decode=True)
+        return form
+
+    def send_body(self, status, text, content_type, headers=None):
+        data = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_error_json(self, status, message, retry_after=None):
+        headers = {"Retry-After": str(retry_after)} if retry_after is not None else None
+        self.send_body(status, json.dumps({"error": message}), "application/json", headers)
+
+    def log_message(self, format, *args):
+        logging.debug(f"{self.address_string()} {format % args}")
@@ -0,0 +1,181 @@
+import threading
+
+
+class CapacityModel(object):
+    """
+    Decides whether the server has room for one more session from the measured cost of its sessions, rather
+    than from a fixed number of clients.
+
+    The cost of a session is the share of a transcription worker its passes keep busy, i.e. seconds of
+    inference per second of the session. It depends on the model, the hardware and how much the client
+    speaks, so it is measured for every session, and averaged per model over the sessions that ended. A new
+    session is admitted while the projected load, the cost of the running sessions plus the expected cost of
+    the new one, stays within `target_utilization` of the workers. When the sessions share models, the load
+    of the sessions of a model must also stay within `target_utilization` of its replicas, since the passes
+    on a replica run one at a time.
+
+    A session is charged the expected cost of its model until it has run for `MIN_MEASURED_TIME`. The
+    expected cost is the average over the sessions of the model that ended, or else over the ones running
+    that were measured, or else `DEFAULT_SESSION_LOAD`. Since that default says nothing about the actual cost
+    of the model, at most `MAX_UNMEASURED_SESSIONS` sessions of a model are admitted until one of them has
+    been measured. An idle server always admits a session, however costly its model.
+    """
+
+    DEFAULT_SESSION_LOAD = 0.25
+    """Share of a worker a session of a model that was never measured is expected to keep busy."""
+    MIN_MEASURED_TIME = 10.0
+    """Seconds a session must have run before its own cost is used."""
+    SMOOTHING = 0.2
+    """Weight of the latest session in the moving average of the cost of the sessions of a model."""
+    MAX_UNMEASURED_SESSIONS = 2
+    """Sessions of a model admitted at once before the cost of the model is measured."""
+
+    def __init__(self, num_workers, target_utilization=0.8, replicas=None):
+        """
+        Args:
+            num_workers (int): Number of transcription workers.
+            target_utilization (float, optional): Share of the workers the sessions may keep busy. Defaults
+                                                  to 0.8.
+            replicas (int, optional): Copies of every shared model, None if sessions do not share models.
+        """
+        self.num_workers = num_workers
+        self.target_utilization = target_utilization
+        self.replicas = replicas
+        self.sessions = {}
+        """Model and session of every admitted websocket, the session being None until it has started."""
+        self.session_loads = {}
+        """Moving average of the cost of the sessions that ended, by model."""
+        self.lock = threading.Lock()
+
+    def reserve(self, websocket, model=None):
+        """
+        Admit a session if the projected load leaves room for it.
+
+        Args:
+            websocket: The websocket of the client.
+            model (str, optional): The model the session asks for.
+
+        Returns:
+            bool: True if the session was admitted, False otherwise.
+        """
+        with self.lock:
+            if self.sessions:
+                if (not self.is_measured(model) and sum(1 for other, _ in self.sessions.values() if other == model)
+                        >= self.MAX_UNMEASURED_SESSIONS):
+                    return False
+                load, model_load = self.projected_load(model)
+                if load > self.target_utilization * self.num_workers:
+                    return False
+                if self.replicas is not None and model_load > self.target_utilization * self.replicas:
+                    return False
+            self.sessions[websocket] = [model, None]
+            return True
+
+    def start(self, websocket, session):
+        """
+        Start measuring the session of an admitted client.
+
+        Args:
+            websocket: The websocket of the client.
+            session (ServeClientBase): The session of the client.
+        """
+        with self.lock:
+            if websocket in self.sessions:
+                self.sessions[websocket][1] = session
+
+    def release(self, websocket):
+        """
+        Forget the session of a client, recording its cost for its model if it ran long enough.
+
+        Args:
+            websocket: The websocket of the client.
+        """
+        with self.lock:
+            model, session = self.sessions.pop(websocket, (None, None))
+            if session is None:
+                return
+            load, elapsed = session.compute_load()
+            if elapsed < self.MIN_MEASURED_TIME:
+                return
+            if model not in self.session_loads:
+                self.session_loads[model] = load
+            else:
+                self.session_loads[model] += self.SMOOTHING * (load - self.session_loads[model])
+
+    def is_measured(self, model):
+        """
+        Must be called with the lock held.
+
+        Args:
+            model (str): The model of a session.
+
+        Returns:
+            bool: Whether a session of the model that ended, or one still running, was measured.
+        """
+        return model in self.session_loads or any(
+            session.compute_load()[1] >= self.MIN_MEASURED_TIME
+            for other, session in self.sessions.values() if other == model and session is not None
+        )
+
+    def expected_load(self, model):
+        """
+        Must be called with the lock held.
+
+        Args:
+            model (str): The model of a session.
+
+        Returns:
+            float: Share of a worker a new session of the model is expected to keep busy.
+        """
+        if model in self.session_loads:
+            return self.session_loads[model]
+        measured = [
+            load for load, elapsed in (
+                session.compute_load() for other, session in self.sessions.values()
+                if other == model and session is not None
+            ) if elapsed >= self.MIN_MEASURED_TIME
+        ]
+        return sum(measured) / len(measured) if measured else self.DEFAULT_SESSION_LOAD
+
+    def session_load(self, model, session):
+        """Must be called with the lock held."""
+        if session is not None:
+            load, elapsed = session.compute_load()
+            if elapsed >= self.MIN_MEASURED_TIME:
+                return load
+        return self.expected_load(model)
+
+    def projected_load(self, model=None):
+        """
+        Must be called with the lock held.
+
+        Args:
+            model (str, optional): The model of a new session to account for.
+
+        Returns:
+            tuple: Workers kept busy by the running sessions and the new one, and by those of its model.
+        """
+        load = model_load = self.expected_load(model)
+        for other, session in self.sessions.values():
+            session_load = self.session_load(other, session)
+            load += session_load
+            if other == model:
+                model_load += session_load
+        return load, model_load
+
+    def utilization(self):
+        """
+        Returns:
+            float: Share of the workers the running sessions keep busy.
+        """
+        with self.lock:
+            load = sum(self.session_load(model, session) for model, session in self.sessions.values())
+        return load / self.num_workers
+
+    def model_loads(self):
+        """
+        Returns:
+            dict: Share of a worker a new session is expected to keep busy, by model measured so far.
+        """
+        with self.lock:
+            return dict(self.session_loads)
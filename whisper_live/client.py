@@ -39,6 +39,10 @@ class Client:
         clip_audio=False,
         same_output_threshold=10,
         transcription_callback=None,
+        audio_format="int16",
+        protocol_version=2,
+        target_latency_ms=None,
+        mode="live",
     ):
         """
         Initializes a Client instance for audio recording and streaming to a server.
@@ -56,13 +60,22 @@ class Client:
             srt_file_path (str, optional): The file path to save the output SRT file. Default is "output.srt".
             use_vad (bool, optional): Whether to enable voice activity detection. Default is True.
             log_transcription (bool, optional): Whether to log transcription output to the console. Default is True.
-            max_clients (int, optional): Maximum number of client connections allowed. Default is 4.
-            max_connection_time (int, optional): Maximum allowed connection time in seconds. Default is 600.
+            max_clients (int, optional): Ignored by the server, which sets its own limits. Default is 4.
+            max_connection_time (int, optional): Ignored by the server, which sets its own limits. Default is 600.
             send_last_n_segments (int, optional): Number of most recent segments to send to the client. Defaults to 10.
             no_speech_thresh (float, optional): Segments with no speech probability above this threshold will be discarded. Defaults to 0.45.
             clip_audio (bool, optional): Whether to clip audio with no valid segments. Defaults to False.
             same_output_threshold (int, optional): Number of repeated outputs before considering it as a valid segment. Defaults to 10.
             transcription_callback (callable, optional): A callback function to handle transcription results. Default is None.
+            audio_format (str, optional): Sample format of the audio sent to the server, "int16", "float16" or "float32".
+                                          Default is "int16", which takes half the bandwidth of "float32".
+            protocol_version (int, optional): Version of the transcript protocol. 1 receives the last segments on every
+                                              pass, 2 receives only new and changed segments. Default is 2.
+            target_latency_ms (float, optional): Milliseconds from sending audio to receiving its transcription that
+                                                 the server paces its transcription passes for. Lower values cost
+                                                 more passes. Default is None, for the server default of 1000 ms.
+            mode (str, optional): "live" to send audio in real time, or "file" to send files as fast as the server
+                                  transcribes them, within the credit it grants. Default is "live".
         """
         self.recording = False
         self.task = "transcribe"
@@ -86,6 +99,16 @@ class Client:
         self.clip_audio = clip_audio
         self.same_output_threshold = same_output_threshold
         self.transcription_callback = transcription_callback
+        self.audio_format = audio_format
+        self.protocol_version = protocol_version
+        self.target_latency_ms = target_latency_ms
+        self.mode = mode
+        self.credit = 0
+        """Number of samples of audio the server accepts in total, in file mode."""
+        self.sent_samples = 0
+        self.credit_condition = threading.Condition()
+        self.segments = {}
+        """Most recent segments by id, rebuilt from the transcript events of protocol version 2."""
 
         if translate:
             self.task = "translate"
@@ -124,6 +147,9 @@ class Client:
         if status == "WAIT":
             self.waiting = True
             print(f"[INFO]: Server is full. Estimated wait time {round(message_data['message'])} minutes.")
+        elif status == "QUEUED":
+            print(f"[INFO]: Server is full, position {message_data['position']} in the queue. "
+                  f"Estimated wait time {round(message_data['message'])} minutes.")
         elif status == "ERROR":
             print(f"Message from Server: {message_data['message']}")
             self.server_error = True
@@ -142,6 +168,48 @@ class Client:
                       (not self.transcript or
                         float(seg['start']) >= float(self.transcript[-1]['end']))):
                     self.transcript.append(seg)
+        self.handle_segments(text, segments)
+
+    def process_events(self, events):
+        """
+        Applies the transcript events of protocol version 2 and processes the resulting segments.
+
+        Completed segments are only received once, in a "final" event, and are added to the transcript as
+        they arrive. The incomplete last segment is replaced by every "partial" event with its id and
+        removed by a "retract" event.
+        """
+        for event in events:
+            segment_id = event["id"]
+            if event["event"] == "retract":
+                self.segments.pop(segment_id, None)
+                if self.last_segment is not None and self.last_segment.get("id") == segment_id:
+                    self.last_segment = None
+                continue
+            segment = {key: value for key, value in event.items() if key != "event"}
+            self.segments[segment_id] = segment
+            if event["event"] == "partial":
+                self.last_segment = segment
+                continue
+            if self.last_segment is not None and self.last_segment.get("id") == segment_id:
+                self.last_segment = None
+            if self.server_backend == "faster_whisper":
+                self.transcript.append(segment)
+
+        # keep as many segments as the server sends with protocol version 1
+        for segment_id in sorted(self.segments)[:-(self.send_last_n_segments + 1)]:
+            del self.segments[segment_id]
+        if self.segments:
+            segments = [self.segments[segment_id] for segment_id in sorted(self.segments)]
+            self.handle_segments([segment["text"] for segment in segments], segments)
+
+    def handle_segments(self, text, segments):
+        """
+        Reports the current segments to the transcription callback, or prints them.
+
+        Args:
+            text (list): The text to report, in order.
+            segments (list): The most recent segments, the last one possibly incomplete.
+        """
         # update last received segment and last valid response time
         if self.last_received_segment is None or self.last_received_segment != segments[-1]["text"]:
             self.last_response_received = time.time()
@@ -195,6 +263,12 @@ class Client:
             print(f"[INFO]: Server Running with backend {self.server_backend}")
             return
 
+        if "credit" in message.keys():
+            with self.credit_condition:
+                self.credit = message["credit"]
+                self.credit_condition.notify_all()
+            return
+
         if "language" in message.keys():
             self.language = message.get("language")
             lang_prob = message.get("language_prob")
@@ -206,6 +280,9 @@ class Client:
         if "segments" in message.keys():
             self.process_segments(message["segments"])
 
+        if "events" in message.keys():
+            self.process_events(message["events"])
+
     def on_error(self, ws, error):
         print(f"[ERROR] WebSocket Error: {error}")
         self.server_error = True
@@ -215,6 +292,8 @@ class Client:
         print(f"[INFO]: Websocket connection closed: {close_status_code}: {close_msg}")
         self.recording = False
         self.waiting = False
+        with self.credit_condition:
+            self.credit_condition.notify_all()
 
     def on_open(self, ws):
         """
@@ -242,6 +321,10 @@ class Client:
                     "no_speech_thresh": self.no_speech_thresh,
                     "clip_audio": self.clip_audio,
                     "same_output_threshold": self.same_output_threshold,
+                    "audio_format": self.audio_format,
+                    "protocol_version": self.protocol_version,
+                    "target_latency_ms": self.target_latency_ms,
+                    "mode": self.mode,
                 }
             )
         )
@@ -301,6 +384,28 @@ class Client:
                 self.transcript.append(self.last_segment)
             utils.create_srt_file(self.transcript, output_path)
 
+    def wait_for_credit(self, samples):
+        """
+        In file mode, waits until the server accepts `samples` more samples of audio.
+
+        Args:
+            samples (int): Number of samples about to be sent.
+
+        Returns:
+            bool: True once the samples may be sent, False if the connection was closed first.
+        """
+        with self.credit_condition:
+            while self.recording and self.sent_samples + samples > self.credit:
+                self.credit_condition.wait()
+            self.sent_samples += samples
+            return self.recording
+
+    def wait_until_closed(self):
+        """In file mode, waits until the server closed the connection after transcribing the whole file."""
+        with self.credit_condition:
+            while self.recording:
+                self.credit_condition.wait()
+
     def wait_before_disconnect(self):
         """Waits a bit before disconnecting in order to process pending responses."""
         assert self.last_response_received
@@ -403,6 +508,40 @@ class TranscriptionTeeClient:
             if (unconditional or client.recording):
                 client.send_packet_to_server(packet)
 
+    def multicast_audio(self, audio):
+        """
+        Sends audio via all recording clients, encoded in the audio format each client negotiated.
+
+        Args:
+            audio (np.ndarray): The audio, as int16 PCM or as float samples between -1 and 1.
+        """
+        packets = {}
+        for client in self.clients:
+            if client.recording:
+                if client.audio_format not in packets:
+                    packets[client.audio_format] = self.encode_audio(audio, client.audio_format)
+                client.send_packet_to_server(packets[client.audio_format])
+
+    @staticmethod
+    def encode_audio(audio, audio_format="int16"):
+        """
+        Encode audio in one of the sample formats the server accepts.
+
+        Args:
+            audio (np.ndarray): The audio, as int16 PCM or as float samples between -1 and 1.
+            audio_format (str, optional): "int16", "float16" or "float32". Default is "int16".
+
+        Returns:
+            bytes: The encoded audio.
+        """
+        if audio_format == "int16":
+            if audio.dtype != np.int16:
+                audio = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+            return audio.tobytes()
+        if audio.dtype == np.int16:
+            audio = audio.astype(np.float32) / 32768.0
+        return audio.astype(np.float16 if audio_format == "float16" else np.float32).tobytes()
+
     def play_file(self, filename):
         """
         Play an audio file and send it to the server for processing.
@@ -414,20 +553,25 @@ class TranscriptionTeeClient:
         This method is typically used when you want to process pre-recorded audio and send it
         to the server in real-time.
 
+        If all clients are in file mode, the file is not played. It is sent as fast as the servers grant
+        credit for it, and the clients wait for the servers to transcribe it to its end.
+
         Args:
             filename (str): The path to the audio file to be played and sent to the server.
         """
 
+        file_mode = all(client.mode == "file" for client in self.clients)
         # read audio and create pyaudio stream
         with wave.open(filename, "rb") as wavfile:
-            self.stream = self.p.open(
-                format=self.p.get_format_from_width(wavfile.getsampwidth()),
-                channels=wavfile.getnchannels(),
-                rate=wavfile.getframerate(),
-                input=True,
-                output=True,
-                frames_per_buffer=self.chunk,
-            )
+            if not file_mode:
+                self.stream = self.p.open(
+                    format=self.p.get_format_from_width(wavfile.getsampwidth()),
+                    channels=wavfile.getnchannels(),
+                    rate=wavfile.getframerate(),
+                    input=True,
+                    output=True,
+                    frames_per_buffer=self.chunk,
+                )
             chunk_duration = self.chunk / float(wavfile.getframerate())
             try:
                 while any(client.recording for client in self.clients):
@@ -435,8 +579,13 @@ class TranscriptionTeeClient:
                     if data == b"":
                         break
 
-                    audio_array = self.bytes_to_float_array(data)
-                    self.multicast_packet(audio_array.tobytes())
+                    audio = np.frombuffer(data, dtype=np.int16)
+                    if file_mode:
+                        for client in self.clients:
+                            client.wait_for_credit(audio.shape[0])
+                        self.multicast_audio(audio)
+                        continue
+                    self.multicast_audio(audio)
                     if self.mute_audio_playback:
                         time.sleep(chunk_duration)
                     else:
@@ -444,17 +593,23 @@ class TranscriptionTeeClient:
     
                 wavfile.close()
 
-                for client in self.clients:
-                    client.wait_before_disconnect()
-                self.multicast_packet(Client.END_OF_AUDIO.encode('utf-8'), True)
+                if file_mode:
+                    self.multicast_packet(Client.END_OF_AUDIO.encode('utf-8'), True)
+                    for client in self.clients:
+                        client.wait_until_closed()
+                else:
+                    for client in self.clients:
+                        client.wait_before_disconnect()
+                    self.multicast_packet(Client.END_OF_AUDIO.encode('utf-8'), True)
+                    self.stream.close()
                 self.write_all_clients_srt()
-                self.stream.close()
                 self.close_all_clients()
 
             except KeyboardInterrupt:
                 wavfile.close()
-                self.stream.stop_stream()
-                self.stream.close()
+                if not file_mode:
+                    self.stream.stop_stream()
+                    self.stream.close()
                 self.p.terminate()
                 self.close_all_clients()
                 self.write_all_clients_srt()
@@ -525,8 +680,7 @@ class TranscriptionTeeClient:
         try:
             for packet in container.demux(audio_stream):
                 for frame in packet.decode():
-                    audio_data = frame.to_ndarray().tobytes()
-                    self.multicast_packet(audio_data)
+                    self.multicast_audio(frame.to_ndarray())
 
                     if save_file:
                         output_container.mux(frame)
@@ -601,9 +755,7 @@ class TranscriptionTeeClient:
                 data = self.stream.read(self.chunk, exception_on_overflow=False)
                 self.frames += data
 
-                audio_array = self.bytes_to_float_array(data)
-
-                self.multicast_packet(audio_array.tobytes())
+                self.multicast_audio(np.frombuffer(data, dtype=np.int16))
 
                 # save frames if more than a minute
                 if len(self.frames) > 60 * self.rate:
@@ -709,14 +861,21 @@ class TranscriptionClient(TranscriptionTeeClient):
         output_recording_filename (str, optional): Path to save the output recording WAV file. Default is "./output_recording.wav".
         output_transcription_path (str, optional): File path to save the output transcription (SRT file). Default is "./output.srt".
         log_transcription (bool, optional): Whether to log transcription output to the console. Default is True.
-        max_clients (int, optional): Maximum number of client connections allowed. Default is 4.
-        max_connection_time (int, optional): Maximum allowed connection time in seconds. Default is 600.
+        max_clients (int, optional): Ignored by the server, which sets its own limits. Default is 4.
+        max_connection_time (int, optional): Ignored by the server, which sets its own limits. Default is 600.
         mute_audio_playback (bool, optional): If True, mutes audio playback during file playback. Default is False.
         send_last_n_segments (int, optional): Number of most recent segments to send to the client. Defaults to 10.
         no_speech_thresh (float, optional): Segments with no speech probability above this threshold will be discarded. Defaults to 0.45.
         clip_audio (bool, optional): Whether to clip audio with no valid segments. Defaults to False.
         same_output_threshold (int, optional): Number of repeated outputs before considering it as a valid segment. Defaults to 10.
         transcription_callback (callable, optional): A callback function to handle transcription results. Default is None.
+        audio_format (str, optional): Sample format of the audio sent to the server, "int16", "float16" or "float32".
+                                      Default is "int16".
+        protocol_version (int, optional): Version of the transcript protocol, 1 or 2. Default is 2.
+        mode (str, optional): "live" to send audio in real time, or "file" to send files as fast as the server
+                              transcribes them. Default is "live".
+        target_latency_ms (float, optional): Milliseconds from sending audio to receiving its transcription that the
+                                             server paces its transcription passes for. Default is None, for 1000 ms.
 
     Attributes:
         client (Client): An instance of the underlying Client class responsible for handling the WebSocket connection.
@@ -749,6 +908,10 @@ class TranscriptionClient(TranscriptionTeeClient):
         clip_audio=False,
         same_output_threshold=10,
         transcription_callback=None,
+        audio_format="int16",
+        protocol_version=2,
+        target_latency_ms=None,
+        mode="live",
     ):
         self.client = Client(
             host,
@@ -767,6 +930,10 @@ class TranscriptionClient(TranscriptionTeeClient):
             clip_audio=clip_audio,
             same_output_threshold=same_output_threshold,
             transcription_callback=transcription_callback,
+            audio_format=audio_format,
+            protocol_version=protocol_version,
+            target_latency_ms=target_latency_ms,
+            mode=mode,
         )
 
         if save_output_recording and not output_recording_filename.endswith(".wav"):
@@ -0,0 +1,252 @@
+import asyncio
+import json
+import logging
+import urllib.request
+
+from websockets.asyncio.client import connect
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosed
+
+
+class ServerInstance(object):
+    """A transcription server behind the gateway, with the last load it reported."""
+
+    def __init__(self, address):
+        """
+        Args:
+            address (str): The "host:port" of the websocket port of the server.
+        """
+        self.address = address
+        self.url = f"ws://{address}"
+        self.load_url = f"http://{address}/load"
+        self.report = None
+        """The last load report of the server, None while it is unreachable."""
+        self.placed = 0
+        """Sessions placed on the server since its last load report, which the report does not count yet."""
+
+    @property
+    def available(self):
+        return self.report is not None
+
+    def sessions(self):
+        """
+        Returns:
+            int: Sessions on the server, including the ones placed since the last report.
+        """
+        return self.report["active_sessions"] + self.placed
+
+    def utilization(self):
+        """
+        Returns:
+            float: Share of the workers of the server its sessions take, assuming the sessions placed since the
+                   last report cost as much as the reported ones, or 0.0 if the server does not report it.
+        """
+        utilization = self.report.get("utilization") or 0.0
+        active_sessions = self.report["active_sessions"]
+        if active_sessions:
+            utilization *= self.sessions() / active_sessions
+        return utilization
+
+    def is_full(self):
+        max_clients = self.report.get("max_clients")
+        if max_clients is not None and self.sessions() >= max_clients:
+            return True
+        target = self.report.get("target_utilization")
+        return target is not None and self.utilization() >= target
+
+    def has_model(self, model):
+        return model in self.report.get("loaded_models", [])
+
+
+class SessionGateway(object):
+    """
+    Fronts several transcription servers and places every new session on one of them.
+
+    The gateway polls the load report of every server, at `/load` on its websocket port. A new session
+    goes to a server that has the model it asks for loaded, if any, and otherwise to the least loaded
+    server, i.e. the one with the lowest utilization, then the fewest sessions, then the fewest
+    transcription passes per worker. A server is full once it holds `max_clients` sessions or reaches its
+    target utilization, and full servers are tried last. If the chosen server turns the client away, or
+    queues it, because it filled up since its last report, the next server is tried. If every server
+    queues the client, it stays in the queue with the shortest estimated wait, and if every server turns
+    it away, it gets the WAIT of the last one.
+
+    Once placed, the frames of the session are proxied unchanged in both directions.
+    """
+
+    POLL_INTERVAL = 1.0
+    """Seconds between two load reports of a server."""
+    POLL_TIMEOUT = 2.0
+    """Seconds after which a server not answering its load report is considered down."""
+
+    def __init__(self, addresses, poll_interval=POLL_INTERVAL):
+        """
+        Args:
+            addresses (list): The "host:port" of every server.
+            poll_interval (float, optional): Seconds between two load reports of a server.
+        """
+        self.instances = [ServerInstance(address) for address in addresses]
+        self.poll_interval = poll_interval
+
+    def fetch_report(self, instance):
+        with urllib.request.urlopen(instance.load_url, timeout=self.POLL_TIMEOUT) as response:
+            return json.loads(response.read())
+
+    async def poll(self, instance):
+        """Update the load report of a server."""
+        try:
+            report = await asyncio.to_thread(self.fetch_report, instance)
+        except Exception as e:
+            if instance.report is not None:
+                logging.warning(f"Server {instance.address} is unreachable: {e}")
+            instance.report = None
+            return
+        if instance.report is None:
+            logging.info(f"Server {instance.address} is available.")
+        instance.report = report
+        instance.placed = 0
+
+    async def poll_forever(self):
+        while True:
+            await asyncio.gather(*(self.poll(instance) for instance in self.instances))
+            await asyncio.sleep(self.poll_interval)
+
+    def rank(self, model=None):
+        """
+        Args:
+            model (str, optional): The model the session asks for.
+
+        Returns:
+            list: The available servers, best first. Full servers come last, as they can only queue the session.
+        """
+        candidates = [instance for instance in self.instances if instance.available]
+        return sorted(
+            candidates,
+            key=lambda instance: (
+                instance.is_full(),
+                not instance.has_model(model),
+                instance.utilization(),
+                instance.sessions(),
+                instance.report.get("load", 0.0),
+            ),
+        )
+
+    async def place(self, options, model=None):
+        """
+        Open the session on the best server that accepts it.
+
+        Args:
+            options (str): The first message of the client, with the options of the session.
+            model (str, optional): The model the session asks for.
+
+        Returns:
+            tuple: The connection to the server, or None if no server accepted the session, and the first
+                   message of the server, e.g. a QUEUED or WAIT status, or None if no server could be reached.
+        """
+        reply = None
+        queued = None
+        """The estimated wait, connection and first message of the shortest queue the session is in."""
+        for instance in self.rank(model):
+            try:
+                upstream = await connect(instance.url, max_size=None)
+            except Exception as e:
+                logging.warning(f"Failed to connect to server {instance.address}: {e}")
+                instance.report = None
+                continue
+            instance.placed += 1
+            try:
+                await upstream.send(options)
+                reply = await upstream.recv()
+            except ConnectionClosed:
+                continue
+            status = self.reply_status(reply)
+            if status == "WAIT":
+                # the server filled up since its last report
+                await upstream.close()
+                continue
+            if status == "QUEUED":
+                # keep the place in the shortest queue while looking for a server with a free slot
+                wait = json.loads(reply).get("message", float("inf"))
+                if queued is None or wait < queued[0]:
+                    if queued is not None:
+                        await queued[1].close()
+                    queued = (wait, upstream, reply)
+                else:
+                    await upstream.close()
+                continue
+            if queued is not None:
+                await queued[1].close()
+            return upstream, reply
+        if queued is not None:
+            return queued[1], queued[2]
+        return None, reply
+
+    @staticmethod
+    def reply_status(message):
+        """
+        Args:
+            message: The first message of a server.
+
+        Returns:
+            str: The status of the message, e.g. "WAIT" or "QUEUED", None for any other message.
+        """
+        if not isinstance(message, str):
+            return None
+        try:
+            return json.loads(message).get("status")
+        except (json.JSONDecodeError, AttributeError):
+            return None
+
+    async def handle(self, websocket):
+        """Place the session of a new client and proxy its frames until either side closes."""
+        try:
+            options = await websocket.recv()
+        except ConnectionClosed:
+            return
+        try:
+            session_options = json.loads(options)
+            uid, model = session_options.get("uid"), session_options.get("model")
+        except (json.JSONDecodeError, AttributeError):
+            uid, model = None, None
+        upstream, reply = await self.place(options, model)
+        if upstream is None:
+            if reply is None:
+                if not any(instance.available for instance in self.instances):
+                    logging.error("[ERROR]: No transcription server is available.")
+                reply = json.dumps({"uid": uid, "status": "WAIT", "message": self.poll_interval / 60})
+            await websocket.send(reply)
+            await websocket.close()
+            return
+        async with upstream:
+            await websocket.send(reply)
+            await self.proxy(websocket, upstream)
+
+    @staticmethod
+    async def proxy(websocket, upstream):
+        """Forward the frames of both connections to the other one until either closes."""
+        async def forward(source, destination):
+            try:
+                async for message in source:
+                    await destination.send(message)
+            except ConnectionClosed:
+                pass
+            finally:
+                await destination.close()
+
+        await asyncio.gather(forward(websocket, upstream), forward(upstream, websocket))
+
+    async def serve(self, host, port):
+        """
+        Accept clients until the gateway is stopped.
+
+        Args:
+            host (str): The host address to bind the gateway.
+            port (int): The port number to bind the gateway.
+        """
+        poller = asyncio.create_task(self.poll_forever())
+        try:
+            async with serve(self.handle, host, port, max_size=None) as server:
+                logging.info(f"Gateway serving on ws://{host}:{port} for {len(self.instances)} servers.")
+                await server.serve_forever()
+        finally:
+            poller.cancel()
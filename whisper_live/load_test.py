@@ -0,0 +1,369 @@
+import bisect
+import json
+import logging
+import threading
+import time
+import uuid
+
+import av
+import numpy as np
+from websockets.exceptions import ConnectionClosed
+from websockets.sync.client import connect
+
+
+def decode_audio(path, sample_rate=16000):
+    """
+    Decode an audio file into a mono float32 waveform, in memory.
+
+    Args:
+        path (str): The audio file to decode.
+        sample_rate (int, optional): The sample rate to resample the audio to. Defaults to 16000.
+
+    Returns:
+        np.ndarray: The waveform, with samples in [-1, 1].
+    """
+    resampler = av.AudioResampler(format="flt", layout="mono", rate=sample_rate)
+    chunks = []
+    with av.open(path) as container:
+        for frame in container.decode(audio=0):
+            frame.pts = None
+            for resampled in resampler.resample(frame):
+                chunks.append(resampled.to_ndarray().reshape(-1))
+        for resampled in resampler.resample(None):
+            chunks.append(resampled.to_ndarray().reshape(-1))
+    return np.concatenate(chunks).astype(np.float32) if chunks else np.zeros(0, dtype=np.float32)
+
+
+def encode_audio(audio, audio_format="int16"):
+    """
+    Args:
+        audio (np.ndarray): float32 waveform.
+        audio_format (str, optional): "int16", "float16" or "float32". Defaults to "int16".
+
+    Returns:
+        np.ndarray: The waveform in the sample format sent to the server.
+    """
+    if audio_format == "int16":
+        return (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+    return audio.astype(np.float16 if audio_format == "float16" else np.float32)
+
+
+def summarize(values):
+    """
+    Args:
+        values (list): Measured values.
+
+    Returns:
+        dict: Count, mean, median, 95th percentile and maximum of the values, None if there are none.
+    """
+    if not values:
+        return {"count": 0, "mean": None, "p50": None, "p95": None, "max": None}
+    values = np.asarray(values, dtype=np.float64)
+    return {
+        "count": int(values.size),
+        "mean": float(values.mean()),
+        "p50": float(np.percentile(values, 50)),
+        "p95": float(np.percentile(values, 95)),
+        "max": float(values.max()),
+    }
+
+
+class LoadTestSession(object):
+    """
+    One headless client streaming an audio file to the server and timing the responses.
+
+    The session does the same handshake as `Client.on_open`, streams the audio in chunks of `chunk_size`
+    samples at `speed` times real time and records, relative to when the audio was sent:
+        - the time from the first audio chunk to the first partial result,
+        - the time from sending the end of a segment's audio to receiving that segment completed,
+        - how far the end of the transcribed audio trails the audio sent, at every result.
+
+    Like `Client`, the session waits until the transcript has not changed for `drain_timeout` seconds
+    after the last chunk before it sends the end of audio and disconnects.
+    """
+
+    def __init__(self, audio, host="localhost", port=9090, options=None, speed=1.0, chunk_size=4096,
+                 drain_timeout=5.0, ready_timeout=60.0, sample_rate=16000):
+        """
+        Args:
+            audio (np.ndarray): The waveform to stream.
+            host (str, optional): The hostname of the server. Defaults to "localhost".
+            port (int, optional): The websocket port of the server. Defaults to 9090.
+            options (dict, optional): Options sent in the handshake, overriding the defaults of `Client`.
+            speed (float, optional): Pace of the stream relative to real time; 0 streams as fast as possible.
+                                     Defaults to 1.0.
+            chunk_size (int, optional): Samples sent per message. Defaults to 4096, like `Client`.
+            drain_timeout (float, optional): Seconds without a new result after which the session ends.
+                                             Defaults to 5.
+            ready_timeout (float, optional): Seconds to wait for the server to be ready. Defaults to 60.
+            sample_rate (int, optional): Sample rate of the audio. Defaults to 16000.
+        """
+        self.audio = audio
+        self.url = f"ws://{host}:{port}"
+        self.uid = str(uuid.uuid4())
+        self.options = {
+            "uid": self.uid,
+            "language": None,
+            "task": "transcribe",
+            "model": "small",
+            "use_vad": True,
+            "max_clients": 4,
+            "max_connection_time": 600,
+            "send_last_n_segments": 10,
+            "no_speech_thresh": 0.45,
+            "clip_audio": False,
+            "same_output_threshold": 10,
+            "audio_format": "int16",
+            "protocol_version": 2,
+        }
+        self.options.update(options or {})
+        self.speed = speed
+        self.chunk_size = chunk_size
+        self.drain_timeout = drain_timeout
+        self.ready_timeout = ready_timeout
+        self.sample_rate = sample_rate
+
+        self.status = None
+        self.error = None
+        self.first_partial = None
+        self.final_latencies = []
+        self.lags = []
+        self.finalized = set()
+        self.segments = {}
+        """Segments by id, rebuilt from the transcript events of protocol version 2."""
+        self.last_text = None
+        self.last_change = None
+        self.stream_start = None
+        self.sent_ends = []
+        """Seconds of audio sent after each chunk."""
+        self.sent_times = []
+        """Time at which each chunk was sent."""
+        self.lock = threading.Lock()
+
+    def run(self):
+        """Connect, stream the audio and wait for the results. Errors are recorded, not raised."""
+        try:
+            with connect(self.url, open_timeout=self.ready_timeout, max_size=None) as websocket:
+                websocket.send(json.dumps(self.options))
+                if not self.wait_until_ready(websocket):
+                    return
+                receiver = threading.Thread(target=self.receive, args=(websocket,), daemon=True)
+                receiver.start()
+                self.stream(websocket)
+                self.drain()
+                websocket.send(b"END_OF_AUDIO")
+            receiver.join(self.drain_timeout)
+            if self.status is None:
+                self.status = "completed"
+        except Exception as e:
+            self.status = "error"
+            self.error = self.error or f"{type(e).__name__}: {e}"
+
+    def wait_until_ready(self, websocket):
+        """
+        Returns:
+            bool: True once the server sent SERVER_READY, False if it asked to wait or failed. A client queued for
+                  a session slot keeps waiting, up to `ready_timeout`.
+        """
+        deadline = time.monotonic() + self.ready_timeout
+        while True:
+            message = json.loads(websocket.recv(timeout=max(deadline - time.monotonic(), 0)))
+            if message.get("status") == "WAIT":
+                self.status = "wait"
+                return False
+            if message.get("status") == "ERROR":
+                self.status = "error"
+                self.error = message.get("message")
+                return False
+            if message.get("message") == "SERVER_READY":
+                return True
+
+    def stream(self, websocket):
+        """Send the audio in chunks of the negotiated audio format, paced at `speed` times real time."""
+        audio = encode_audio(self.audio, self.options["audio_format"])
+        self.stream_start = self.last_change = time.monotonic()
+        for start in range(0, audio.shape[0], self.chunk_size):
+            chunk = audio[start:start + self.chunk_size]
+            end = (start + chunk.shape[0]) / self.sample_rate
+            if self.speed > 0:
+                delay = self.stream_start + end / self.speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            websocket.send(chunk.tobytes())
+            with self.lock:
+                self.sent_ends.append(end)
+                self.sent_times.append(time.monotonic())
+                self.last_change = max(self.last_change, self.sent_times[-1])
+
+    def drain(self):
+        """Wait until the transcript has not changed for `drain_timeout` seconds."""
+        while True:
+            with self.lock:
+                quiet = time.monotonic() - self.last_change
+            if quiet >= self.drain_timeout or self.status == "error":
+                return
+            time.sleep(min(self.drain_timeout - quiet, 0.1))
+
+    def receive(self, websocket):
+        """Receive and time the results until the connection is closed."""
+        try:
+            for message in websocket:
+                self.handle_message(json.loads(message), time.monotonic())
+        except ConnectionClosed:
+            pass
+        except Exception as e:
+            self.status = "error"
+            self.error = f"{type(e).__name__}: {e}"
+
+    def handle_message(self, message, received):
+        """
+        Record the timings of a message from the server.
+
+        Args:
+            message (dict): The decoded message.
+            received (float): Monotonic time at which it was received.
+        """
+        if message.get("status") == "ERROR":
+            self.status = "error"
+            self.error = message.get("message")
+            return
+        segments = message.get("segments")
+        if "events" in message:
+            for event in message["events"]:
+                if event["event"] == "retract":
+                    self.segments.pop(event["id"], None)
+                else:
+                    self.segments[event["id"]] = dict(event, completed=event["event"] == "final")
+            for segment_id in sorted(self.segments)[:-(self.options["send_last_n_segments"] + 1)]:
+                del self.segments[segment_id]
+            segments = [self.segments[segment_id] for segment_id in sorted(self.segments)]
+        if not segments:
+            return
+
+        with self.lock:
+            if self.first_partial is None:
+                self.first_partial = received - self.stream_start
+            if segments[-1]["text"] != self.last_text:
+                self.last_text = segments[-1]["text"]
+                self.last_change = received
+            sent = self.sent_ends[-1] if self.sent_ends else 0.0
+            self.lags.append(max(sent - float(segments[-1]["end"]), 0.0))
+            for segment in segments:
+                if not segment.get("completed") or segment["start"] in self.finalized:
+                    continue
+                self.finalized.add(segment["start"])
+                latency = self.latency_since_sent(float(segment["end"]), received)
+                if latency is not None:
+                    self.final_latencies.append(latency)
+
+    def latency_since_sent(self, audio_time, received):
+        """
+        Args:
+            audio_time (float): Position in the audio, in seconds.
+            received (float): Monotonic time a result covering that position was received.
+
+        Returns:
+            float: Seconds since the chunk holding the position was sent, None if it was not sent.
+        """
+        index = bisect.bisect_left(self.sent_ends, audio_time)
+        if index == len(self.sent_ends):
+            return None
+        return received - self.sent_times[index]
+
+
+class HostMonitor(object):
+    """Samples the CPU use of the host and, optionally, the CPU use and RSS of the server process."""
+
+    def __init__(self, server_pid=None, interval=1.0):
+        """
+        Args:
+            server_pid (int, optional): PID of the server to sample. Defaults to None.
+            interval (float, optional): Seconds between samples. Defaults to 1.
+        """
+        self.server_pid = server_pid
+        self.interval = interval
+        self.samples = {"cpu_percent": [], "server_cpu_percent": [], "server_rss_mb": []}
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        try:
+            import psutil
+        except ImportError:
+            logging.warning("psutil is not installed, host CPU and RSS are not reported.")
+            return
+        process = psutil.Process(self.server_pid) if self.server_pid is not None else None
+        self.thread = threading.Thread(target=self.run, args=(psutil, process), daemon=True)
+        self.thread.start()
+
+    def run(self, psutil, process):
+        psutil.cpu_percent()
+        if process is not None:
+            process.cpu_percent()
+        while not self.stopped.wait(self.interval):
+            self.samples["cpu_percent"].append(psutil.cpu_percent())
+            if process is not None:
+                try:
+                    self.samples["server_cpu_percent"].append(process.cpu_percent())
+                    self.samples["server_rss_mb"].append(process.memory_info().rss / 2**20)
+                except psutil.NoSuchProcess:
+                    process = None
+
+    def stop(self):
+        """
+        Returns:
+            dict: Summary of every sampled value, or None if nothing was sampled.
+        """
+        self.stopped.set()
+        if self.thread is None:
+            return None
+        self.thread.join()
+        return {name: summarize(values) for name, values in self.samples.items() if values} or None
+
+
+def run_load_test(audio, num_clients, host="localhost", port=9090, ramp_up=0.0, server_pid=None, **session_kwargs):
+    """
+    Stream the audio from `num_clients` concurrent sessions and report the timings of all of them.
+
+    Args:
+        audio (np.ndarray): The waveform every session streams.
+        num_clients (int): Number of concurrent sessions.
+        host (str, optional): The hostname of the server. Defaults to "localhost".
+        port (int, optional): The websocket port of the server. Defaults to 9090.
+        ramp_up (float, optional): Seconds over which the sessions are started. Defaults to 0.
+        server_pid (int, optional): PID of the server, to report its CPU use and RSS. Defaults to None.
+        **session_kwargs: Passed on to `LoadTestSession`.
+
+    Returns:
+        dict: The report, JSON serializable.
+    """
+    sessions = [LoadTestSession(audio, host, port, **session_kwargs) for _ in range(num_clients)]
+    monitor = HostMonitor(server_pid)
+    monitor.start()
+    started = time.monotonic()
+    threads = []
+    for i, session in enumerate(sessions):
+        if ramp_up > 0 and num_clients > 1:
+            time.sleep(max(started + ramp_up * i / (num_clients - 1) - time.monotonic(), 0))
+        thread = threading.Thread(target=session.run, daemon=True)
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    duration = time.monotonic() - started
+
+    statuses = [session.status for session in sessions]
+    return {
+        "num_clients": num_clients,
+        "duration": duration,
+        "completed": statuses.count("completed"),
+        "waits": statuses.count("wait"),
+        "errors": statuses.count("error"),
+        "wait_rate": statuses.count("wait") / num_clients,
+        "error_rate": statuses.count("error") / num_clients,
+        "time_to_first_partial": summarize([s.first_partial for s in sessions if s.first_partial is not None]),
+        "time_to_final_segment": summarize([latency for s in sessions for latency in s.final_latencies]),
+        "server_lag": summarize([lag for s in sessions for lag in s.lags]),
+        "host": monitor.stop(),
+        "error_messages": sorted({s.error for s in sessions if s.error}),
+    }
@@ -0,0 +1,191 @@
+from prometheus_client import CollectorRegistry, Counter, Histogram, start_http_server
+from prometheus_client.core import GaugeMetricFamily
+
+
+class MeteredWebSocket(object):
+    """
+    Wraps the websocket of a session and counts the bytes sent to the client.
+
+    Everything except `send` is passed through to the wrapped websocket.
+    """
+
+    def __init__(self, websocket, counter):
+        """
+        Args:
+            websocket: The websocket of the client.
+            counter (Counter): The counter of sent bytes.
+        """
+        self.websocket = websocket
+        self.counter = counter
+
+    def send(self, message):
+        self.counter.inc(len(message.encode("utf-8")) if isinstance(message, str) else len(message))
+        # returns the coroutine of an asyncio websocket, for the caller to await
+        return self.websocket.send(message)
+
+    def __getattr__(self, name):
+        return getattr(self.websocket, name)
+
+
+class ServerMetrics(object):
+    """
+    Prometheus metrics of a `TranscriptionServer`, served over HTTP on `/metrics`.
+
+    Transcription passes, model lock waits and traffic are recorded as they happen. The state of the
+    sessions, i.e. the connected and waiting sessions and the audio each session has not transcribed
+    yet, is read from the server when the metrics are scraped.
+    """
+
+    def __init__(self, server, registry=None):
+        """
+        Args:
+            server (TranscriptionServer): The server to report on.
+            registry (CollectorRegistry, optional): Registry to register the metrics with. Defaults to a new
+                                                    registry.
+        """
+        self.server = server
+        self.registry = registry if registry is not None else CollectorRegistry()
+        self.inference_seconds = Histogram(
+            "whisper_live_inference_seconds",
+            "Time taken by a transcription pass.",
+            ["backend"],
+            registry=self.registry,
+        )
+        self.model_lock_wait_seconds = Histogram(
+            "whisper_live_model_lock_wait_seconds",
+            "Time a transcription pass waited for a shared model.",
+            ["backend"],
+            registry=self.registry,
+        )
+        self.real_time_factor = Histogram(
+            "whisper_live_real_time_factor",
+            "Time taken by a transcription pass divided by the duration of the transcribed audio.",
+            ["backend"],
+            buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.5, 5.0),
+            registry=self.registry,
+        )
+        self.passes = Counter(
+            "whisper_live_transcription_passes",
+            "Transcription passes run.",
+            ["backend"],
+            registry=self.registry,
+        )
+        self.audio_seconds = Counter(
+            "whisper_live_transcribed_audio_seconds",
+            "Seconds of audio run through transcription passes.",
+            ["backend"],
+            registry=self.registry,
+        )
+        self.rejected_sessions = Counter(
+            "whisper_live_rejected_sessions",
+            "Clients told to wait because the server was full.",
+            registry=self.registry,
+        )
+        self.received_bytes = Counter(
+            "whisper_live_received_bytes",
+            "Bytes of audio frames received from clients, as sent on the wire.",
+            registry=self.registry,
+        )
+        self.sent_bytes = Counter(
+            "whisper_live_sent_bytes",
+            "Bytes of messages sent to clients.",
+            registry=self.registry,
+        )
+        self.registry.register(self)
+
+    def serve(self, host, port):
+        """
+        Start serving the metrics on a background thread.
+
+        Args:
+            host (str): The host address to bind the metrics listener.
+            port (int): The port number to bind the metrics listener.
+        """
+        start_http_server(port, addr=host, registry=self.registry)
+
+    def wrap(self, websocket):
+        """
+        Args:
+            websocket: The websocket of a client.
+
+        Returns:
+            MeteredWebSocket: The websocket, counting the bytes sent through it.
+        """
+        return MeteredWebSocket(websocket, self.sent_bytes)
+
+    def observe_pass(self, backend, inference_time, duration):
+        """
+        Record a transcription pass.
+
+        Args:
+            backend (str): The backend that ran the pass.
+            inference_time (float): Seconds taken by the pass.
+            duration (float): Seconds of audio transcribed by the pass.
+        """
+        self.inference_seconds.labels(backend).observe(inference_time)
+        self.passes.labels(backend).inc()
+        self.audio_seconds.labels(backend).inc(duration)
+        if duration > 0:
+            self.real_time_factor.labels(backend).observe(inference_time / duration)
+
+    def observe_lock_wait(self, backend, wait_time):
+        """
+        Record the time a transcription pass waited for a shared model.
+
+        Args:
+            backend (str): The backend of the model.
+            wait_time (float): Seconds waited.
+        """
+        self.model_lock_wait_seconds.labels(backend).observe(wait_time)
+
+    def collect(self):
+        """Read the state of the sessions from the server. Called by the registry on every scrape."""
+        client_manager = self.server.client_manager
+        clients = list(client_manager.clients.values()) if client_manager is not None else []
+
+        active = GaugeMetricFamily("whisper_live_active_sessions", "Connected sessions.")
+        active.add_metric([], len(clients))
+        yield active
+
+        worker_pool = self.server.worker_pool
+        waiting = GaugeMetricFamily(
+            "whisper_live_waiting_sessions", "Sessions ready for a transcription pass and waiting for a worker."
+        )
+        waiting.add_metric([], worker_pool.queue_depth() if worker_pool is not None else 0)
+        yield waiting
+
+        busy = GaugeMetricFamily("whisper_live_busy_workers", "Workers running a transcription pass.")
+        busy.add_metric([], worker_pool.busy_workers() if worker_pool is not None else 0)
+        yield busy
+
+        capacity_model = self.server.capacity_model
+        if capacity_model is not None:
+            utilization = GaugeMetricFamily(
+                "whisper_live_utilization", "Share of the workers the measured load of the sessions takes."
+            )
+            utilization.add_metric([], capacity_model.utilization())
+            yield utilization
+
+            session_load = GaugeMetricFamily(
+                "whisper_live_session_load",
+                "Share of a worker a session of the model is expected to keep busy.",
+                labels=["model"],
+            )
+            for model, load in capacity_model.model_loads().items():
+                session_load.add_metric([str(model)], load)
+            yield session_load
+
+        buffered = GaugeMetricFamily(
+            "whisper_live_session_buffered_audio_seconds",
+            "Seconds of audio a session has received but not transcribed yet.",
+            labels=["uid"],
+        )
+        for client in clients:
+            buffered.add_metric([str(client.client_uid)], client.pending_audio_duration())
+        yield buffered
+
+        if self.server.model_pool is not None:
+            loaded = GaugeMetricFamily("whisper_live_loaded_model_bytes", "Estimated bytes of the loaded models.")
+            loaded.add_metric([], self.server.model_pool.loaded_size())
+            yield loaded
+
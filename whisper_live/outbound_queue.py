@@ -0,0 +1,175 @@
+import asyncio
+import collections
+import logging
+import threading
+
+from websockets.exceptions import ConnectionClosed
+
+
+class OutboundQueue(object):
+    """
+    Queue of the messages a session sends to its client, drained by the I/O layer instead of the
+    transcription workers, so that a slow client never holds up a transcription pass.
+
+    `send` never blocks. A message sent with `partial=True` replaces the last queued message if that one
+    is a partial result still waiting to be sent, so a slow client gets only the latest partial result.
+    Other messages are never dropped. If more than `max_bytes` are waiting, the client is too slow to keep
+    up: the queued messages are dropped and the connection is closed.
+
+    Without an event loop, the queue is drained by a thread of its own calling the blocking `send` of a
+    sync websocket. With a loop, it is drained by a task on the loop awaiting the `send` coroutine of an
+    asyncio websocket.
+    """
+
+    CLOSE_TIMEOUT = 2.0
+    """Seconds to wait for the queued messages to be sent once the queue is closed."""
+
+    def __init__(self, websocket, max_bytes=2**20, loop=None):
+        """
+        Args:
+            websocket: The websocket of the client.
+            max_bytes (int, optional): Bytes of messages allowed to wait before the client is disconnected.
+                                       Defaults to 1 MiB.
+            loop (asyncio.AbstractEventLoop, optional): The event loop running an asyncio websocket.
+                                                        Defaults to None, for a sync websocket.
+        """
+        self.websocket = websocket
+        self.max_bytes = max_bytes
+        self.loop = loop
+        self.messages = collections.deque()
+        self.queued_bytes = 0
+        self.last_is_partial = False
+        self.closed = False
+        self.overflowed = False
+        self.condition = threading.Condition()
+        self.wakeup = None
+        self.drained = threading.Event()
+
+    def start(self):
+        """Start draining the queue."""
+        if self.loop is None:
+            threading.Thread(target=self.run, daemon=True).start()
+        else:
+            self.loop.call_soon_threadsafe(self.start_task)
+
+    def start_task(self):
+        self.wakeup = asyncio.Event()
+        self.loop.create_task(self.run_async())
+
+    def send(self, message, partial=False):
+        """
+        Queue a message to be sent to the client.
+
+        Args:
+            message (str or bytes): The message.
+            partial (bool, optional): Whether the message is a partial result that a later partial result
+                                      supersedes. Defaults to False.
+        """
+        with self.condition:
+            if self.closed or self.overflowed:
+                return
+            if partial and self.last_is_partial:
+                self.queued_bytes -= len(self.messages.pop())
+            self.messages.append(message)
+            self.queued_bytes += len(message)
+            self.last_is_partial = partial
+            if self.queued_bytes > self.max_bytes:
+                logging.warning(
+                    f"Client is not receiving its messages, {self.queued_bytes} bytes are waiting. Disconnecting."
+                )
+                self.overflowed = True
+                self.messages.clear()
+                self.queued_bytes = 0
+            self.condition.notify()
+        self.notify_loop()
+
+    def close(self):
+        """Send the queued messages, then close the connection and stop draining the queue."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.notify_loop()
+
+    def wait_drained(self):
+        """
+        Returns:
+            bool: True once the queue is closed and drained, False if `CLOSE_TIMEOUT` passed first.
+        """
+        return self.drained.wait(self.CLOSE_TIMEOUT)
+
+    def notify_loop(self):
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.set_wakeup)
+
+    def set_wakeup(self):
+        if self.wakeup is not None:
+            self.wakeup.set()
+
+    def pop(self):
+        """
+        Must be called holding `condition`.
+
+        Returns:
+            The next message to send, or None if there is none or the client is disconnected.
+        """
+        if self.overflowed or not self.messages:
+            return None
+        message = self.messages.popleft()
+        self.queued_bytes -= len(message)
+        if not self.messages:
+            self.last_is_partial = False
+        return message
+
+    def run(self):
+        """Drain the queue into a sync websocket, until the queue is closed."""
+        while True:
+            with self.condition:
+                while not (self.messages or self.closed or self.overflowed):
+                    self.condition.wait()
+                message = self.pop()
+            if message is None:
+                break
+            try:
+                self.websocket.send(message)
+            except Exception as e:
+                self.handle_send_error(e)
+                return
+        try:
+            self.websocket.close()
+        except Exception as e:
+            logging.error(f"[ERROR]: Closing connection to client: {e}")
+        finally:
+            self.drained.set()
+
+    async def run_async(self):
+        """Drain the queue into an asyncio websocket, until the queue is closed."""
+        while True:
+            with self.condition:
+                message = self.pop()
+                done = message is None and (self.closed or self.overflowed)
+            if message is not None:
+                try:
+                    await self.websocket.send(message)
+                except Exception as e:
+                    self.handle_send_error(e)
+                    return
+            elif done:
+                break
+            else:
+                await self.wakeup.wait()
+                self.wakeup.clear()
+        try:
+            await self.websocket.close()
+        except Exception as e:
+            logging.error(f"[ERROR]: Closing connection to client: {e}")
+        finally:
+            self.drained.set()
+
+    def handle_send_error(self, error):
+        with self.condition:
+            self.closed = True
+            self.messages.clear()
+            self.queued_bytes = 0
+        self.drained.set()
+        if not isinstance(error, ConnectionClosed):
+            logging.error(f"[ERROR]: Sending data to client: {error}")
@@ -0,0 +1,210 @@
+import logging
+import multiprocessing
+import multiprocessing.connection
+import os
+import signal
+import time
+
+
+class SharedSessionTable(object):
+    """
+    The sessions of all server processes, in shared memory, so that the limit on connected clients holds
+    for the whole server rather than per process.
+
+    Every session takes a slot holding its start time, 0 for a free slot, and the pid of the process that
+    took it, so that the slots of a process that died can be freed. Slots are taken and freed under a lock
+    shared by the processes, so that two processes accepting a client at the same time cannot both take the
+    last free one. Every process also publishes the utilization of its transcription workers, from which the
+    utilization of the whole server is reported.
+    """
+
+    CAPACITY = 1024
+    """Number of slots, i.e. the most sessions the server can ever hold, whatever `max_clients` is."""
+
+    def __init__(self, capacity=CAPACITY, num_processes=1, ctx=None):
+        """
+        Args:
+            capacity (int, optional): Number of slots. Defaults to `CAPACITY`.
+            num_processes (int, optional): Number of server processes. Defaults to 1.
+            ctx (multiprocessing.context.BaseContext, optional): Context of the server processes. Defaults to
+                                                                 the default context of the platform.
+        """
+        ctx = ctx or multiprocessing.get_context()
+        self.start_times = ctx.Array("d", capacity)
+        self.owners = ctx.Array("i", capacity, lock=False)
+        """Pid of the process holding every slot, 0 for a free slot."""
+        self.utilizations = ctx.Array("d", max(num_processes, 1), lock=False)
+        """Share of its transcription workers the sessions of every process keep busy."""
+
+    def reserve(self, max_clients):
+        """
+        Take a free slot, unless `max_clients` sessions are connected.
+
+        Args:
+            max_clients (int): Sessions allowed on the whole server, None for as many as there are slots.
+
+        Returns:
+            int: The slot taken, or None if the server is full.
+        """
+        with self.start_times.get_lock():
+            free = None
+            used = 0
+            for index, start_time in enumerate(self.start_times):
+                if start_time:
+                    used += 1
+                elif free is None:
+                    free = index
+            if (max_clients is not None and used >= max_clients) or free is None:
+                return None
+            self.start_times[free] = time.time()
+            self.owners[free] = os.getpid()
+            return free
+
+    def release(self, slot):
+        """
+        Args:
+            slot (int): A slot returned by `reserve`.
+        """
+        with self.start_times.get_lock():
+            self.start_times[slot] = 0.0
+            self.owners[slot] = 0
+
+    def release_process(self, pid):
+        """
+        Free the slots of a process that died without releasing them.
+
+        Args:
+            pid (int): The pid of the process.
+
+        Returns:
+            int: Number of slots freed.
+        """
+        freed = 0
+        with self.start_times.get_lock():
+            for slot, owner in enumerate(self.owners):
+                if owner == pid:
+                    self.start_times[slot] = 0.0
+                    self.owners[slot] = 0
+                    freed += 1
+        return freed
+
+    def publish_utilization(self, index, utilization):
+        """
+        Args:
+            index (int): Index of the server process.
+            utilization (float): Share of its transcription workers the sessions of the process keep busy.
+        """
+        self.utilizations[index] = utilization
+
+    def utilization(self):
+        """
+        Returns:
+            float: Share of the transcription workers of all processes the sessions keep busy.
+        """
+        return sum(self.utilizations) / len(self.utilizations)
+
+    def session_start_times(self):
+        """
+        Returns:
+            list: The start times of all connected sessions.
+        """
+        with self.start_times.get_lock():
+            return [start_time for start_time in self.start_times if start_time]
+
+
+class ServerProcessPool(object):
+    """
+    Runs the server in several forked processes accepting connections from one listening socket.
+
+    Each process owns its transcription workers, sessions and model pool, so the work done with the GIL
+    held, e.g. websocket framing, slicing audio and building results, runs in parallel across processes.
+    The kernel hands every new connection to one of the processes waiting on the socket. Every process loads
+    its own copy of the models, since the threads a model starts when it is loaded do not survive a fork. A
+    process that dies is replaced, once the session slots it held are freed.
+    """
+
+    RESTART_DELAY = 1.0
+    """Seconds to wait before replacing a process that died, so that a process failing on startup does not spin."""
+
+    def __init__(self, target, num_processes, sessions=None):
+        """
+        Args:
+            target (callable): Run in every process with the index of the process, e.g. to serve the socket.
+            num_processes (int): Number of processes.
+            sessions (SharedSessionTable, optional): The sessions of all processes, to free the slots of a
+                                                     process that died. Defaults to None.
+        """
+        self.target = target
+        self.num_processes = num_processes
+        self.sessions = sessions
+        self.ctx = multiprocessing.get_context("fork")
+        self.processes = {}
+        self.exit = False
+
+    def start(self, index):
+        process = self.ctx.Process(target=self.run_process, args=(index,), name=f"whisper-live-{index}")
+        process.start()
+        self.processes[index] = process
+        logging.info(f"Started server process {index} (pid {process.pid}).")
+
+    def run_process(self, index):
+        """Entry point of a forked process."""
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        try:
+            self.target(index)
+        except KeyboardInterrupt:
+            pass
+
+    def run(self):
+        """Start the processes and replace those that die, until interrupted."""
+        previous_handler = signal.signal(signal.SIGTERM, lambda signum, frame: self.stop())
+        try:
+            for index in range(self.num_processes):
+                self.start(index)
+            while not self.exit:
+                self.replace_dead(timeout=1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            signal.signal(signal.SIGTERM, previous_handler)
+            self.stop()
+            self.join()
+
+    def replace_dead(self, timeout=None):
+        """
+        Wait for processes to die and start a replacement for each of them.
+
+        Args:
+            timeout (float, optional): Seconds to wait for a process to die. Defaults to None, to wait forever.
+        """
+        sentinels = {process.sentinel: index for index, process in self.processes.items()}
+        for sentinel in multiprocessing.connection.wait(list(sentinels), timeout=timeout):
+            if self.exit:
+                return
+            index = sentinels[sentinel]
+            process = self.processes[index]
+            process.join()
+            logging.error(f"[ERROR]: Server process {index} exited with code {process.exitcode}, restarting it.")
+            if self.sessions is not None:
+                freed = self.sessions.release_process(process.pid)
+                if freed:
+                    logging.info(f"Freed {freed} session slots of server process {index}.")
+                self.sessions.publish_utilization(index, 0.0)
+            time.sleep(self.RESTART_DELAY)
+            self.start(index)
+
+    def stop(self):
+        """Ask all processes to stop."""
+        self.exit = True
+        for process in self.processes.values():
+            if process.is_alive():
+                process.terminate()
+
+    def join(self, timeout=10):
+        """Wait for all processes to stop, killing those that take longer than `timeout` seconds."""
+        deadline = time.monotonic() + timeout
+        for process in self.processes.values():
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.kill()
+                process.join()
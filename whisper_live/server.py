@@ -1,6 +1,9 @@
 import os
 import time
+import socket
+import asyncio
 import threading
+import multiprocessing
 import json
 import functools
 import logging
@@ -10,26 +13,49 @@ from typing import List, Optional
 import numpy as np
 from websockets.sync.server import serve
 from websockets.exceptions import ConnectionClosed
-from whisper_live.vad import VoiceActivityDetector
+from websockets.protocol import State
+from whisper_live.vad import VADEngine
+from whisper_live.audio_decoder import DECODERS, create_decoder
 from whisper_live.backend.base import ServeClientBase
+from whisper_live.backend.worker_pool import TranscriptionWorkerPool
+from whisper_live.backend.model_pool import ModelPool
+from whisper_live.outbound_queue import OutboundQueue
+from whisper_live.admission import AdmissionQueue
+from whisper_live.capacity import CapacityModel
 
 logging.basicConfig(level=logging.INFO)
 
 
 class ClientManager:
-    def __init__(self, max_clients=4, max_connection_time=600):
+    def __init__(self, max_clients=4, max_connection_time=600, shared_sessions=None, admission_queue=None,
+                 capacity_model=None):
         """
         Initializes the ClientManager with specified limits on client connections and connection durations.
 
         Args:
-            max_clients (int, optional): The maximum number of simultaneous client connections allowed. Defaults to 4.
+            max_clients (int, optional): The maximum number of simultaneous client connections allowed, None for no
+                                         limit. Defaults to 4.
             max_connection_time (int, optional): The maximum duration (in seconds) a client can stay connected. Defaults
                                                  to 600 seconds (10 minutes).
+            shared_sessions (SharedSessionTable, optional): The sessions of all server processes, to enforce
+                                                            `max_clients` across processes. Defaults to None, for
+                                                            the clients of this process only.
+            admission_queue (AdmissionQueue, optional): The queue of clients waiting for a slot, which new
+                                                        clients may not overtake. Defaults to None.
+            capacity_model (CapacityModel, optional): Admits clients while the measured load of the sessions
+                                                      leaves room for them. Defaults to None.
         """
         self.clients = {}
         self.start_times = {}
         self.max_clients = max_clients
         self.max_connection_time = max_connection_time
+        self.shared_sessions = shared_sessions
+        self.admission_queue = admission_queue
+        self.capacity_model = capacity_model
+        self.slots = {}
+        self.admitted = set()
+        """Websockets holding a slot of this process, from their admission until they are removed."""
+        self.lock = threading.Lock()
 
     def add_client(self, websocket, client):
         """
@@ -41,6 +67,8 @@ class ClientManager:
         """
         self.clients[websocket] = client
         self.start_times[websocket] = time.time()
+        if self.capacity_model is not None:
+            self.capacity_model.start(websocket, client)
 
     def get_client(self, websocket):
         """
@@ -67,25 +95,105 @@ class ClientManager:
         client = self.clients.pop(websocket, None)
         if client:
             client.cleanup()
-        self.start_times.pop(websocket, None)
+        start_time = self.start_times.pop(websocket, None)
+        if start_time is not None and self.admission_queue is not None:
+            self.admission_queue.record_session(time.time() - start_time)
+        with self.lock:
+            self.admitted.discard(websocket)
+            slot = self.slots.pop(websocket, None)
+        if slot is not None:
+            self.shared_sessions.release(slot)
+        if self.capacity_model is not None:
+            self.capacity_model.release(websocket)
 
-    def get_wait_time(self):
+    def get_wait_time(self, position=0):
         """
         Calculates the estimated wait time for new clients based on the remaining connection times of current clients.
 
+        A session is expected to last as long as the sessions that ended so far did on average, and at most
+        `max_connection_time`. The client at `position` in the admission queue gets the slot freed after the
+        ones taken by the clients before it.
+
+        Args:
+            position (int, optional): Number of clients queued before the client. Defaults to 0.
+
         Returns:
             The estimated wait time in minutes for new clients to connect. Returns 0 if there are available slots.
         """
-        wait_time = None
-        for start_time in self.start_times.values():
-            current_client_time_remaining = self.max_connection_time - (time.time() - start_time)
-            if wait_time is None or current_client_time_remaining < wait_time:
-                wait_time = current_client_time_remaining
-        return wait_time / 60 if wait_time is not None else 0
+        if self.shared_sessions is not None:
+            start_times = self.shared_sessions.session_start_times()
+        else:
+            start_times = list(self.start_times.values())
+        if not start_times:
+            return 0
+        expected = self.max_connection_time
+        if self.admission_queue is not None:
+            expected = min(self.admission_queue.expected_session_duration() or expected, expected)
+        now = time.time()
+        remaining = sorted(
+            min(max(expected - (now - start_time), 0), self.max_connection_time - (now - start_time))
+            for start_time in start_times
+        )
+        rounds, index = divmod(position, len(remaining))
+        return (remaining[index] + rounds * expected) / 60
+
+    def admit(self, websocket, ticket=None, model=None):
+        """
+        Takes a session slot for a client if one is free, unless other clients are queued before it.
+
+        A slot is free while fewer than `max_clients` sessions are connected and, with a capacity model,
+        while the measured load of the sessions leaves room for one more session of the model. The capacity
+        model only measures the sessions of this process, so with several processes a queued client this
+        process has no room for is skipped, and the clients queued after it may be admitted by other processes.
+
+        Args:
+            websocket: The websocket of the client.
+            ticket (int, optional): The ticket of the client in the admission queue, None if it is not queued.
+            model (str, optional): The model the client asks for.
+
+        Returns:
+            True if the client got a slot, False otherwise.
+        """
+        if self.admission_queue is not None and self.admission_queue.position(ticket) > 0:
+            return False
+        with self.lock:
+            slot = None
+            if self.shared_sessions is not None:
+                # the slot is taken right away, so that the check and the reservation are atomic across processes
+                slot = self.shared_sessions.reserve(self.max_clients)
+                if slot is None:
+                    if ticket is not None:
+                        # the server is full for every process, the client keeps its place
+                        self.admission_queue.skip(ticket, False)
+                    return False
+            elif self.max_clients is not None and len(self.admitted.union(self.clients)) >= self.max_clients:
+                return False
+            if self.capacity_model is not None and not self.capacity_model.reserve(websocket, model):
+                if slot is not None:
+                    self.shared_sessions.release(slot)
+                    if ticket is not None:
+                        self.admission_queue.skip(ticket)
+                return False
+            if slot is not None:
+                self.slots[websocket] = slot
+            self.admitted.add(websocket)
+            return True
+
+    def send_wait(self, websocket, options):
+        """
+        Tells a client turned away how long it would have to wait.
+
+        Args:
+            websocket: The websocket of the client.
+            options: A dictionary of options that may include the client's unique identifier.
+        """
+        response = {"uid": options["uid"], "status": "WAIT", "message": self.get_wait_time()}
+        websocket.send(json.dumps(response))
 
     def is_server_full(self, websocket, options):
         """
         Checks if the server is at its maximum client capacity and sends a wait message to the client if necessary.
+        Otherwise the client takes a slot.
 
         Args:
             websocket: The websocket of the client attempting to connect.
@@ -94,12 +202,10 @@ class ClientManager:
         Returns:
             True if the server is full, False otherwise.
         """
-        if len(self.clients) >= self.max_clients:
-            wait_time = self.get_wait_time()
-            response = {"uid": options["uid"], "status": "WAIT", "message": wait_time}
-            websocket.send(json.dumps(response))
-            return True
-        return False
+        if self.admit(websocket):
+            return False
+        self.send_wait(websocket, options)
+        return True
 
     def is_client_timeout(self, websocket):
         """
@@ -119,6 +225,62 @@ class ClientManager:
         return False
 
 
+class AsyncWebSocketAdapter:
+    """
+    Wraps an asyncio websocket connection so that it can be used like a sync websocket by the server
+    and the transcription sessions.
+
+    `send` and `close` may be called from any thread. They never block; the operation is scheduled on
+    the event loop running the connection, and sends go out in the order they were made.
+    """
+
+    def __init__(self, websocket, loop):
+        """
+        Args:
+            websocket: The asyncio websocket connection.
+            loop (asyncio.AbstractEventLoop): The event loop running the connection.
+        """
+        self.websocket = websocket
+        self.loop = loop
+
+    def send(self, message):
+        """
+        Schedule a message to be sent to the client.
+
+        Args:
+            message (str or bytes): The message to send.
+        """
+        self.schedule(self.websocket.send, message)
+
+    def close(self):
+        """Schedule the connection to be closed, after all messages sent before."""
+        self.schedule(self.websocket.close)
+
+    def schedule(self, method, *args):
+        """
+        Run a websocket coroutine method on the event loop without waiting for it.
+
+        Args:
+            method: The coroutine method of the websocket to run.
+            *args: Arguments passed to the method.
+        """
+        if self.loop.is_closed():
+            return
+        self.loop.call_soon_threadsafe(self.start_task, method, args)
+
+    def start_task(self, method, args):
+        task = self.loop.create_task(method(*args))
+        task.add_done_callback(self.log_task_error)
+
+    @staticmethod
+    def log_task_error(task):
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None and not isinstance(error, ConnectionClosed):
+            logging.error(f"[ERROR]: Failed to send to client: {error}")
+
+
 class BackendType(Enum):
     FASTER_WHISPER = "faster_whisper"
     TENSORRT = "tensorrt"
@@ -144,24 +306,59 @@ class BackendType(Enum):
 
 class TranscriptionServer:
     RATE = 16000
+    AUDIO_FORMATS = {"float32": np.float32, "float16": np.float16, "int16": np.int16}
+    """Sample formats of the audio frames a client can send, negotiated with the `audio_format` option."""
+    QUEUE_POLL_INTERVAL = 0.1
+    """Seconds between two checks for a free slot by a client in the admission queue."""
+    QUEUE_UPDATE_INTERVAL = 5.0
+    """Seconds between two position updates sent to a client in the admission queue, if it did not move."""
+    LOAD_REPORT_PATH = "/load"
+    """Path of the HTTP endpoint reporting the load of the server, on the websocket port."""
+    LISTEN_BACKLOG = 1024
+    """Connections waiting to be accepted by one of the server processes."""
+    UTILIZATION_PUBLISH_INTERVAL = 1.0
+    """Seconds between two updates of the utilization a server process publishes to the others."""
+    ENCODINGS = ("pcm",) + tuple(DECODERS)
+    """Encodings of the audio a client can send, negotiated with the `encoding` option. Anything but raw
+    "pcm" samples is decoded and resampled on the server."""
 
     def __init__(self):
         self.client_manager = None
         self.no_voice_activity_chunks = 0
         self.use_vad = True
         self.single_model = False
+        self.batch_inference = False
+        self.max_batch_size = 8
+        self.batch_timeout_ms = 10
+        self.worker_pool = None
+        self.model_pool = None
+        self.metrics = None
+        self.batch_server = None
+        self.shared_sessions = None
+        self.admission_queue = None
+        self.capacity_model = None
+        self.process_index = 0
+        self.max_clients = 4
+        self.max_connection_time = 600
+        self.target_utilization = None
+        self.max_send_queue_bytes = 2**20
+        self.outbound_queues = {}
+        self.vad_streams = {}
+        self.audio_formats = {}
+        self.audio_decoders = {}
 
     def initialize_client(
         self, websocket, options, faster_whisper_custom_model_path,
         whisper_tensorrt_path, trt_multilingual, trt_py_session=False,
     ):
         client: Optional[ServeClientBase] = None
+        session_websocket = self.create_outbound_queue(websocket)
 
         if self.backend.is_tensorrt():
             try:
                 from whisper_live.backend.trt_backend import ServeClientTensorRT
                 client = ServeClientTensorRT(
-                    websocket,
+                    session_websocket,
                     multilingual=trt_multilingual,
                     language=options["language"],
                     task=options["task"],
@@ -173,6 +370,10 @@ class TranscriptionServer:
                     no_speech_thresh=options.get("no_speech_thresh", 0.45),
                     clip_audio=options.get("clip_audio", False),
                     same_output_threshold=options.get("same_output_threshold", 10),
+                    worker_pool=self.worker_pool,
+                    metrics=self.metrics,
+                    protocol_version=options.get("protocol_version", 1),
+                    target_latency_ms=options.get("target_latency_ms"),
                 )
                 logging.info("Running TensorRT backend.")
             except Exception as e:
@@ -190,7 +391,7 @@ class TranscriptionServer:
             try:
                 from whisper_live.backend.openvino_backend import ServeClientOpenVINO
                 client = ServeClientOpenVINO(
-                    websocket,
+                    session_websocket,
                     language=options["language"],
                     task=options["task"],
                     client_uid=options["uid"],
@@ -200,6 +401,11 @@ class TranscriptionServer:
                     no_speech_thresh=options.get("no_speech_thresh", 0.45),
                     clip_audio=options.get("clip_audio", False),
                     same_output_threshold=options.get("same_output_threshold", 10),
+                    worker_pool=self.worker_pool,
+                    metrics=self.metrics,
+                    protocol_version=options.get("protocol_version", 1),
+                    target_latency_ms=options.get("target_latency_ms"),
+                    mode=options.get("mode", "live"),
                 )
                 logging.info("Running OpenVINO backend.")
             except Exception as e:
@@ -220,7 +426,7 @@ class TranscriptionServer:
                     logging.info(f"Using custom model {faster_whisper_custom_model_path}")
                     options["model"] = faster_whisper_custom_model_path
                 client = ServeClientFasterWhisper(
-                    websocket,
+                    session_websocket,
                     language=options["language"],
                     task=options["task"],
                     client_uid=options["uid"],
@@ -228,12 +434,20 @@ class TranscriptionServer:
                     initial_prompt=options.get("initial_prompt"),
                     vad_parameters=options.get("vad_parameters"),
                     use_vad=self.use_vad,
-                    single_model=self.single_model,
+                    model_pool=self.model_pool,
                     send_last_n_segments=options.get("send_last_n_segments", 10),
                     no_speech_thresh=options.get("no_speech_thresh", 0.45),
                     clip_audio=options.get("clip_audio", False),
                     same_output_threshold=options.get("same_output_threshold", 10),
                     cache_path=self.cache_path,
+                    batch_inference=self.batch_inference,
+                    max_batch_size=self.max_batch_size,
+                    batch_timeout_ms=self.batch_timeout_ms,
+                    worker_pool=self.worker_pool,
+                    metrics=self.metrics,
+                    protocol_version=options.get("protocol_version", 1),
+                    target_latency_ms=options.get("target_latency_ms"),
+                    mode=options.get("mode", "live"),
                 )
 
                 logging.info("Running faster_whisper backend.")
@@ -246,6 +460,27 @@ class TranscriptionServer:
 
         self.client_manager.add_client(websocket, client)
 
+    def create_outbound_queue(self, websocket):
+        """
+        Creates the queue the session of a client sends its messages through, so that transcription
+        passes never wait for the client to receive them.
+
+        Args:
+            websocket: The websocket of the client, or its `AsyncWebSocketAdapter` in async mode.
+
+        Returns:
+            OutboundQueue: The started queue, sending to the websocket.
+        """
+        target, loop = websocket, None
+        if isinstance(websocket, AsyncWebSocketAdapter):
+            target, loop = websocket.websocket, websocket.loop
+        if self.metrics is not None:
+            target = self.metrics.wrap(target)
+        queue = OutboundQueue(target, max_bytes=self.max_send_queue_bytes, loop=loop)
+        queue.start()
+        self.outbound_queues[websocket] = queue
+        return queue
+
     def get_audio_from_websocket(self, websocket):
         """
         Receives audio buffer from websocket and creates a numpy array out of it.
@@ -256,9 +491,64 @@ class TranscriptionServer:
         Returns:
             A numpy array containing the audio.
         """
-        frame_data = websocket.recv()
+        return self.decode_frame(websocket, websocket.recv())
+
+    def decode_frame(self, websocket, frame_data):
+        """
+        Decodes a frame received from a client with the encoding and audio format of its session.
+
+        Args:
+            websocket: The websocket the frame was received from.
+            frame_data (bytes): The received frame.
+
+        Returns:
+            A float32 numpy array containing the audio, possibly empty for compressed audio, or False if the
+            client signalled the end of the audio.
+        """
+        if self.metrics is not None:
+            # the bytes on the wire, whatever the audio decodes to
+            self.metrics.received_bytes.inc(len(frame_data))
+        decoder = self.audio_decoders.get(websocket)
+        if decoder is None or frame_data == b"END_OF_AUDIO":
+            return self.get_audio_from_frame(frame_data, self.audio_formats.get(websocket, "float32"))
+        return decoder.decode(frame_data)
+
+    def flush_decoder(self, websocket):
+        """
+        Decodes what the decoder of a client sending compressed audio still holds, once the client sent all
+        of its audio.
+
+        Args:
+            websocket: The websocket of the client.
+
+        Returns:
+            A float32 numpy array containing the rest of the audio, empty for uncompressed audio.
+        """
+        decoder = self.audio_decoders.get(websocket)
+        if decoder is None:
+            return np.zeros(0, dtype=np.float32)
+        return decoder.flush()
+
+    @staticmethod
+    def get_audio_from_frame(frame_data, audio_format="float32"):
+        """
+        Creates a float32 numpy array out of an audio frame received from a client.
+
+        Args:
+            frame_data (bytes): The received frame.
+            audio_format (str, optional): The sample format of the frame, one of `AUDIO_FORMATS`.
+                                          Defaults to "float32".
+
+        Returns:
+            A numpy array containing the audio, or False if the client signalled the end of the audio.
+        """
         if frame_data == b"END_OF_AUDIO":
             return False
+        if audio_format == "int16":
+            # scale straight into a float32 array, without an intermediate copy
+            return np.multiply(np.frombuffer(frame_data, dtype=np.int16), np.float32(1 / 32768.0), dtype=np.float32)
+        if audio_format == "float16":
+            return np.frombuffer(frame_data, dtype=np.float16).astype(np.float32)
         return np.frombuffer(frame_data, dtype=np.float32)
 
     def handle_new_connection(self, websocket, faster_whisper_custom_model_path,
@@ -266,40 +556,326 @@ class TranscriptionServer:
         try:
             logging.info("New client connected")
             options = websocket.recv()
-            options = json.loads(options)
+        except ConnectionClosed:
+            logging.info("Connection closed by client")
+            return False
+        except Exception as e:
+            logging.error(f"Error during new connection initialization: {str(e)}")
+            return False
+        return self.setup_connection(websocket, options, faster_whisper_custom_model_path,
+                                     whisper_tensorrt_path, trt_multilingual, trt_py_session=trt_py_session)
+
+    def setup_connection(self, websocket, options, faster_whisper_custom_model_path,
+                         whisper_tensorrt_path, trt_multilingual, trt_py_session=False):
+        """
+        Sets up the session of a new client from the options sent in its first message.
+
+        If the server is full, the client waits in the admission queue, on the calling thread, until it gets
+        a slot or is turned away.
+
+        Args:
+            websocket: The websocket of the client.
+            options (str): The JSON encoded options sent by the client.
 
-            if self.client_manager is None:
-                max_clients = options.get('max_clients', 4)
-                max_connection_time = options.get('max_connection_time', 600)
-                self.client_manager = ClientManager(max_clients, max_connection_time)
+        Returns:
+            bool: True if the connection should continue, False otherwise.
+        """
+        try:
+            options = self.parse_options(websocket, options)
+            if options is None:
+                return False
+            waiting = self.wait_for_slot(websocket, options)
+            try:
+                while True:
+                    time.sleep(next(waiting))
+            except StopIteration as admitted:
+                if not admitted.value:
+                    websocket.close()
+                    return False  # Indicates that the connection should not continue
+        except Exception as e:
+            return self.connection_failed(websocket, e)
+        return self.start_session(websocket, options, faster_whisper_custom_model_path,
+                                  whisper_tensorrt_path, trt_multilingual, trt_py_session=trt_py_session)
+
+    async def setup_connection_async(self, websocket, client_websocket, options, faster_whisper_custom_model_path,
+                                     whisper_tensorrt_path, trt_multilingual, trt_py_session=False):
+        """
+        Same as `setup_connection`, but a client waiting in the admission queue only costs a task on the event
+        loop. Starting the session, which may load a model, runs on the default executor.
 
-            self.use_vad = options.get('use_vad')
-            if self.client_manager.is_server_full(websocket, options):
+        Args:
+            websocket: The asyncio websocket connection of the client.
+            client_websocket (AsyncWebSocketAdapter): The same connection, as passed to the session.
+            options (str): The JSON encoded options sent by the client.
+
+        Returns:
+            bool: True if the connection should continue, False otherwise.
+        """
+        try:
+            options = self.parse_options(client_websocket, options)
+            if options is None:
+                await websocket.wait_closed()  # the error goes out before the close scheduled after it
+                return False
+            waiting = self.wait_for_slot(client_websocket, options)
+            try:
+                while True:
+                    delay = next(waiting)
+                    if websocket.state is not State.OPEN:
+                        waiting.close()
+                        logging.info("Connection closed by client")
+                        return False
+                    await asyncio.sleep(delay)
+            except StopIteration as admitted:
+                if not admitted.value:
+                    client_websocket.close()
+                    await websocket.wait_closed()
+                    return False
+        except Exception as e:
+            return self.connection_failed(client_websocket, e)
+        start = functools.partial(
+            self.start_session, client_websocket, options, faster_whisper_custom_model_path,
+            whisper_tensorrt_path, trt_multilingual, trt_py_session=trt_py_session,
+        )
+        return await asyncio.get_running_loop().run_in_executor(None, start)
+
+    def parse_options(self, websocket, options):
+        """
+        Decodes the options sent by a client and checks that the server supports them.
+
+        Args:
+            websocket: The websocket of the client.
+            options (str): The JSON encoded options sent by the client.
+
+        Returns:
+            dict: The options, or None if the client was sent an error and the connection closed.
+        """
+        options = json.loads(options)
+
+        if self.client_manager is None:
+            self.client_manager = ClientManager(
+                self.max_clients, self.max_connection_time, self.shared_sessions, self.admission_queue,
+                self.capacity_model,
+            )
+
+        self.use_vad = options.get('use_vad')
+        mode = options.get('mode', 'live')
+        # the TensorRT backend keeps no transcript to commit whole windows to
+        modes = ("live",) if self.backend.is_tensorrt() else ServeClientBase.MODES
+        for name, value, supported in (
+            ("audio_format", options.get('audio_format', 'float32'), self.AUDIO_FORMATS),
+            ("encoding", options.get('encoding', 'pcm'), self.ENCODINGS),
+            ("protocol_version", options.get('protocol_version', 1), ServeClientBase.PROTOCOL_VERSIONS),
+            ("mode", mode, modes),
+        ):
+            if value not in supported:
+                logging.error(f"Unsupported {name} from client: {value}")
+                websocket.send(json.dumps({
+                    "uid": options.get("uid"),
+                    "status": "ERROR",
+                    "message": f"Unsupported {name} '{value}'. Choose from {list(supported)}"
+                }))
                 websocket.close()
-                return False  # Indicates that the connection should not continue
+                return None
+        return options
 
-            if self.backend.is_tensorrt():
-                self.vad_detector = VoiceActivityDetector(frame_rate=self.RATE)
+    def wait_for_slot(self, websocket, options):
+        """
+        Admits a client as soon as a session slot is free, keeping it in the FIFO admission queue meanwhile.
+
+        A queued client stays connected and is sent its position and estimated wait, as
+        `{"uid": ..., "status": "QUEUED", "position": 1, "message": minutes}`, whenever its position changes
+        and every `QUEUE_UPDATE_INTERVAL` seconds. A client is turned away with a WAIT status if the queue is
+        full, or once it has waited for the queue timeout.
+
+        This is a generator yielding the seconds to wait before checking for a slot again, so that the wait
+        can be driven by a thread or by the event loop.
+
+        Args:
+            websocket: The websocket of the client.
+            options (dict): The options of the client.
+
+        Returns:
+            bool: True once the client has a slot, False if it was turned away.
+        """
+        client_manager = self.client_manager
+        queue = client_manager.admission_queue
+        model = options.get("model")
+        if client_manager.admit(websocket, model=model):
+            return True
+        ticket = queue.join() if queue is not None else None
+        if ticket is None:
+            self.reject_client(websocket, options)
+            return False
+        try:
+            deadline = time.monotonic() + queue.timeout
+            last_position, next_update = None, 0
+            while time.monotonic() < deadline:
+                if client_manager.admit(websocket, ticket, model):
+                    return True
+                position = queue.position(ticket)
+                if position != last_position or time.monotonic() >= next_update:
+                    websocket.send(json.dumps({
+                        "uid": options["uid"],
+                        "status": "QUEUED",
+                        "position": position + 1,
+                        "message": client_manager.get_wait_time(position),
+                    }))
+                    last_position, next_update = position, time.monotonic() + self.QUEUE_UPDATE_INTERVAL
+                yield self.QUEUE_POLL_INTERVAL
+        finally:
+            queue.leave(ticket)
+        self.reject_client(websocket, options)
+        return False
+
+    def reject_client(self, websocket, options):
+        """
+        Turns a client away because the server is full.
+
+        Args:
+            websocket: The websocket of the client.
+            options (dict): The options of the client.
+        """
+        if self.metrics is not None:
+            self.metrics.rejected_sessions.inc()
+        self.client_manager.send_wait(websocket, options)
+
+    def start_session(self, websocket, options, faster_whisper_custom_model_path,
+                      whisper_tensorrt_path, trt_multilingual, trt_py_session=False):
+        """
+        Starts the session of an admitted client.
+
+        Args:
+            websocket: The websocket of the client.
+            options (dict): The options of the client.
+
+        Returns:
+            bool: True if the connection should continue, False otherwise.
+        """
+        try:
             self.initialize_client(websocket, options, faster_whisper_custom_model_path,
                                    whisper_tensorrt_path, trt_multilingual, trt_py_session=trt_py_session)
+            client = self.client_manager.get_client(websocket)
+            if client:
+                self.audio_formats[websocket] = options.get('audio_format', 'float32')
+                encoding = options.get('encoding', 'pcm')
+                if encoding != "pcm":
+                    self.audio_decoders[websocket] = create_decoder(encoding, self.RATE)
+                if self.backend.is_tensorrt():
+                    self.vad_streams[websocket] = VADEngine.shared().create_stream()
+                if client.mode == "file":
+                    client.send_credit()
+            else:
+                self.cleanup(websocket)  # the session failed to start, stop its outbound queue
             return True
-        except json.JSONDecodeError:
+        except Exception as e:
+            return self.connection_failed(websocket, e)
+
+    def connection_failed(self, websocket, error):
+        """
+        Logs why a connection failed to set up and frees what it holds, e.g. its session slot.
+
+        Args:
+            websocket: The websocket of the client.
+            error (Exception): The error raised while setting up the connection.
+
+        Returns:
+            bool: False, the connection should not continue.
+        """
+        if isinstance(error, json.JSONDecodeError):
             logging.error("Failed to decode JSON from client")
-            return False
-        except ConnectionClosed:
+        elif isinstance(error, ConnectionClosed):
             logging.info("Connection closed by client")
-            return False
-        except Exception as e:
-            logging.error(f"Error during new connection initialization: {str(e)}")
-            return False
+        else:
+            logging.error(f"Error during new connection initialization: {str(error)}")
+        if self.client_manager is not None:
+            self.cleanup(websocket)
+        return False
+
+    def load_report(self):
+        """
+        Returns:
+            dict: The load of the server, e.g. for a gateway placing sessions on one of several servers:
+                - active_sessions (int): Connected sessions, across all server processes.
+                - max_clients (int): Sessions allowed at most, None for no fixed limit.
+                - queue_depth (int): Sessions ready for a transcription pass and waiting for a worker.
+                - load (float): Passes running or waiting per transcription worker.
+                - loaded_models (list): Models loaded in the model pool.
+                - utilization (float): Share of the transcription workers the measured load of the sessions
+                  takes, across all server processes, None without a capacity model.
+                - target_utilization (float): Utilization up to which new sessions are admitted, None without a
+                  capacity model.
+        """
+        client_manager = self.client_manager
+        if self.shared_sessions is not None:
+            active_sessions = len(self.shared_sessions.session_start_times())
+        else:
+            active_sessions = len(client_manager.clients) if client_manager is not None else 0
+        utilization = None
+        if self.capacity_model is not None:
+            utilization = self.capacity_model.utilization()
+            if self.shared_sessions is not None:
+                self.shared_sessions.publish_utilization(self.process_index, utilization)
+                utilization = self.shared_sessions.utilization()
+        worker_pool = self.worker_pool
+        loaded_models = []
+        if self.model_pool is not None:
+            with self.model_pool.lock:
+                loaded_models = [key[0] for key, entry in self.model_pool.entries.items() if entry.model is not None]
+        return {
+            "active_sessions": active_sessions,
+            "max_clients": self.max_clients,
+            "queue_depth": worker_pool.queue_depth() if worker_pool is not None else 0,
+            "load": worker_pool.load() if worker_pool is not None else 0.0,
+            "loaded_models": loaded_models,
+            "utilization": utilization,
+            "target_utilization": self.target_utilization if self.capacity_model is not None else None,
+        }
+
+    def process_request(self, connection, request):
+        """
+        Answers `GET /load` on the websocket port with the `load_report` of the server as JSON. Any other
+        request goes on with the websocket handshake.
+
+        Args:
+            connection: The connection of the request.
+            request: The HTTP request.
+
+        Returns:
+            The HTTP response, or None to accept the websocket connection.
+        """
+        if request.path != self.LOAD_REPORT_PATH:
+            return None
+        response = connection.respond(200, json.dumps(self.load_report()))
+        del response.headers["Content-Type"]
+        response.headers["Content-Type"] = "application/json"
+        return response
 
     def process_audio_frames(self, websocket):
         frame_np = self.get_audio_from_websocket(websocket)
+        return self.handle_audio_frame(websocket, frame_np)
+
+    def handle_audio_frame(self, websocket, frame_np):
+        """
+        Passes a received audio frame on to the session of the client.
+
+        Args:
+            websocket: The websocket of the client.
+            frame_np (numpy.ndarray or bool): The received audio, or False at the end of the audio.
+
+        Returns:
+            bool: True if more audio should be received, False otherwise.
+        """
         client = self.client_manager.get_client(websocket)
         if frame_np is False:
+            # the last chunks of compressed audio are only decoded once the stream ends
+            self.handle_audio_frame(websocket, self.flush_decoder(websocket))
             if self.backend.is_tensorrt():
                 client.set_eos(True)
+            if client.mode == "file":
+                client.end_audio()
             return False
+        if frame_np.shape[0] == 0:
+            return True  # compressed audio that did not decode to any samples yet
 
         if self.backend.is_tensorrt():
             voice_active = self.voice_activity(websocket, frame_np)
@@ -352,16 +928,104 @@ class TranscriptionServer:
             while not self.client_manager.is_client_timeout(websocket):
                 if not self.process_audio_frames(websocket):
                     break
+            client = self.client_manager.get_client(websocket)
+            if client and client.end_of_audio:
+                # the whole file is transcribed before the connection is closed
+                client.finished.wait()
         except ConnectionClosed:
             logging.info("Connection closed by client")
         except Exception as e:
             logging.error(f"Unexpected error: {str(e)}")
         finally:
             if self.client_manager.get_client(websocket):
+                queue = self.outbound_queues.get(websocket)
                 self.cleanup(websocket)
+                if queue is not None:
+                    queue.wait_drained()
                 websocket.close()
             del websocket
 
+    async def recv_audio_async(self,
+                               websocket,
+                               backend: BackendType = BackendType.FASTER_WHISPER,
+                               faster_whisper_custom_model_path=None,
+                               whisper_tensorrt_path=None,
+                               trt_multilingual=False,
+                               trt_py_session=False):
+        """
+        Receive audio chunks from a client on the event loop.
+
+        Same as `recv_audio`, but an idle connection only costs a pending receive on the event loop
+        instead of a thread. Setting up the session, which may load a model, runs on the default
+        executor, and so does the voice activity detection of the TensorRT backend. The session
+        sends through an `OutboundQueue` drained by a task on the event loop, so its sends never block.
+
+        Args:
+            websocket: The asyncio websocket connection for the client.
+            backend (str): The backend to run the server with.
+            faster_whisper_custom_model_path (str): path to custom faster whisper model.
+            whisper_tensorrt_path (str): Required for tensorrt backend.
+            trt_multilingual(bool): Only used for tensorrt, True if multilingual model.
+        """
+        self.backend = backend
+        loop = asyncio.get_running_loop()
+        client_websocket = AsyncWebSocketAdapter(websocket, loop)
+        try:
+            logging.info("New client connected")
+            options = await websocket.recv()
+        except ConnectionClosed:
+            logging.info("Connection closed by client")
+            return
+        except Exception as e:
+            logging.error(f"Error during new connection initialization: {str(e)}")
+            return
+
+        if not await self.setup_connection_async(websocket, client_websocket, options, faster_whisper_custom_model_path,
+                                                 whisper_tensorrt_path, trt_multilingual, trt_py_session=trt_py_session):
+            return
+
+        try:
+            while not self.client_manager.is_client_timeout(client_websocket):
+                frame_np = self.decode_frame(client_websocket, await websocket.recv())
+                if self.backend.is_tensorrt() or frame_np is False:
+                    # voice activity detection, or waiting for the decoder to finish the stream
+                    receiving = await loop.run_in_executor(
+                        None, self.handle_audio_frame, client_websocket, frame_np
+                    )
+                else:
+                    receiving = self.handle_audio_frame(client_websocket, frame_np)
+                if not receiving:
+                    break
+            client = self.client_manager.get_client(client_websocket)
+            if client and client.end_of_audio:
+                # the whole file is transcribed before the connection is closed
+                await loop.run_in_executor(None, client.finished.wait)
+        except ConnectionClosed:
+            logging.info("Connection closed by client")
+        except Exception as e:
+            logging.error(f"Unexpected error: {str(e)}")
+        finally:
+            if self.client_manager.get_client(client_websocket):
+                queue = self.outbound_queues.get(client_websocket)
+                self.cleanup(client_websocket)
+                if queue is not None:
+                    await loop.run_in_executor(None, queue.wait_drained)
+                client_websocket.close()
+
+    async def serve_async(self, handler, host, port, sock=None):
+        """
+        Serve connections on an asyncio event loop until the server is stopped.
+
+        Args:
+            handler: The coroutine function handling a connection.
+            host (str): The host address to bind the server.
+            port (int): The port number to bind the server.
+            sock (socket.socket, optional): A listening socket to accept connections from instead.
+        """
+        from websockets.asyncio.server import serve as serve_asyncio
+        async with serve_asyncio(handler, host, port, sock=sock, process_request=self.process_request) as server:
+            await server.serve_forever()
+
     def run(self,
             host,
             port=9090,
@@ -371,48 +1035,278 @@ class TranscriptionServer:
             trt_multilingual=False,
             trt_py_session=False,
             single_model=False,
-            cache_path="~/.cache/whisper-live/"):
+            cache_path="~/.cache/whisper-live/",
+            batch_inference=False,
+            max_batch_size=8,
+            batch_timeout_ms=10,
+            num_workers=None,
+            async_mode=False,
+            preload=None,
+            model_memory_budget_mb=None,
+            model_replicas=1,
+            metrics_port=None,
+            max_send_queue_kb=1024,
+            http_port=None,
+            http_batch_size=8,
+            http_max_jobs=1,
+            http_max_queued_jobs=8,
+            workers=1,
+            max_queue_size=16,
+            queue_timeout=300,
+            max_clients=None,
+            max_connection_time=600,
+            target_utilization=0.8):
         """
         Run the transcription server.
 
         Args:
             host (str): The host address to bind the server.
             port (int): The port number to bind the server.
+            single_model (bool): Share models between connections. With the faster_whisper backend all
+                                 models are shared through a model pool; the other backends only share
+                                 custom models.
+            batch_inference (bool): Decode the windows of all sessions sharing a faster_whisper model in batches.
+            max_batch_size (int): Maximum number of windows decoded in one batch.
+            batch_timeout_ms (float): How long to wait for more windows before running a batch.
+            num_workers (int): Number of transcription worker threads shared by all clients. Defaults to the
+                               number of CPUs plus 4, capped at 32.
+            async_mode (bool): Receive from all clients on an asyncio event loop instead of one thread per
+                               connection.
+            preload (list): faster_whisper models to load at startup and keep loaded.
+            model_memory_budget_mb (int): Megabytes of faster_whisper model weights to keep loaded. Models not used
+                                          by any client are unloaded, least recently used first, when the
+                                          budget is exceeded. Defaults to no limit.
+            model_replicas (int): Copies of every shared faster_whisper model to load. Passes on the same
+                                  model run in parallel up to this number, each copy using the memory of
+                                  one model. Defaults to 1.
+            metrics_port (int): Port to serve Prometheus metrics on, at `/metrics`. Defaults to None, which
+                                disables the metrics.
+            max_send_queue_kb (int): Kilobytes of results allowed to wait for a client before it is
+                                     disconnected as too slow. Defaults to 1024.
+            http_port (int): Port to serve batch transcription of uploaded files on, at
+                             `/v1/audio/transcriptions`. Only supported by the faster_whisper backend. Defaults
+                             to None, which disables the endpoint.
+            http_batch_size (int): Speech chunks of an uploaded file decoded in one batch. Defaults to 8.
+            http_max_jobs (int): Uploaded files transcribed at the same time. Defaults to 1.
+            http_max_queued_jobs (int): Uploaded files waiting to be transcribed. Further uploads are rejected
+                                        until a job finishes. Defaults to 8.
+            workers (int): Server processes accepting connections, each with its own transcription workers,
+                           sessions and copy of the models. `max_clients` is enforced across all of them.
+                           Process `i` serves its metrics on `metrics_port + i`, and the first one serves
+                           batch transcription. Defaults to 1.
+            max_queue_size (int): Clients allowed to wait for a session slot while the server is full. They are
+                                  admitted in arrival order and sent their position in the queue until then.
+                                  Further clients are sent a WAIT status. Defaults to 16, 0 to turn away every
+                                  client arriving while the server is full.
+            queue_timeout (float): Seconds a client waits in the admission queue before it is sent a WAIT status.
+                                   Defaults to 300.
+            max_clients (int): Sessions allowed at most, whatever their measured load. Defaults to None, for no
+                               limit but `target_utilization`.
+            max_connection_time (int): Seconds a session may stay connected. Defaults to 600.
+            target_utilization (float): Share of the transcription workers, and of the replicas of a shared
+                                        model, that the measured load of the sessions may reach. New sessions
+                                        are admitted while the projected load stays within it. With `workers`,
+                                        it applies to the workers of every process. Defaults to 0.8, None or 0
+                                        to admit sessions up to `max_clients` only.
         """
         self.cache_path = cache_path
+        self.batch_inference = batch_inference
+        self.max_batch_size = max_batch_size
+        self.batch_timeout_ms = batch_timeout_ms
+        self.max_send_queue_bytes = max_send_queue_kb * 1024
+        self.max_clients = max_clients
+        self.max_connection_time = max_connection_time
+        self.target_utilization = target_utilization
         if faster_whisper_custom_model_path is not None and not os.path.exists(faster_whisper_custom_model_path):
             raise ValueError(f"Custom faster_whisper model '{faster_whisper_custom_model_path}' is not a valid path.")
         if whisper_tensorrt_path is not None and not os.path.exists(whisper_tensorrt_path):
             raise ValueError(f"TensorRT model '{whisper_tensorrt_path}' is not a valid path.")
+        if not BackendType.is_valid(backend):
+            raise ValueError(f"{backend} is not a valid backend type. Choose backend from {BackendType.valid_types()}")
         if single_model:
             if faster_whisper_custom_model_path or whisper_tensorrt_path:
                 logging.info("Custom model option was provided. Switching to single model mode.")
                 self.single_model = True
-                # TODO: load model initially
-            else:
+            elif not BackendType(backend).is_faster_whisper():
                 logging.info("Single model mode currently only works with custom models.")
-        if not BackendType.is_valid(backend):
-            raise ValueError(f"{backend} is not a valid backend type. Choose backend from {BackendType.valid_types()}")
+            if BackendType(backend).is_faster_whisper():
+                memory_budget = model_memory_budget_mb * 2**20 if model_memory_budget_mb else None
+                self.model_pool = ModelPool(memory_budget=memory_budget, replicas=model_replicas)
+                if self.model_pool.replicas > 1:
+                    logging.info(f"Loading {self.model_pool.replicas} replicas of every shared model.")
+        if batch_inference and self.model_pool is None:
+            logging.info("Batch inference is only used when faster_whisper models are shared.")
+        if max_queue_size > 0:
+            # the fork start method is only available, and only needed, to share the queue between processes
+            ctx = multiprocessing.get_context("fork") if workers > 1 else None
+            self.admission_queue = AdmissionQueue(max_queue_size, queue_timeout, ctx=ctx)
+        handler_kwargs = dict(
+            backend=BackendType(backend),
+            faster_whisper_custom_model_path=faster_whisper_custom_model_path,
+            whisper_tensorrt_path=whisper_tensorrt_path,
+            trt_multilingual=trt_multilingual,
+            trt_py_session=trt_py_session,
+        )
+        start_services = functools.partial(
+            self.start_services, host, BackendType(backend), num_workers, metrics_port, http_port,
+            faster_whisper_custom_model_path, http_batch_size, http_max_jobs, http_max_queued_jobs,
+        )
+        if workers > 1:
+            # models run on threads started when they are loaded, which do not survive a fork, so the
+            # parent only downloads them and every process loads its own copy
+            self.preload_models(preload, faster_whisper_custom_model_path, download_only=True)
+
+            def serve_process(index):
+                self.preload_models(preload, faster_whisper_custom_model_path)
+                start_services(index=index)
+                self.serve_connections(handler_kwargs, async_mode, sock=sock)
+
+            from whisper_live.process_pool import ServerProcessPool, SharedSessionTable
+            self.shared_sessions = SharedSessionTable(num_processes=workers, ctx=multiprocessing.get_context("fork"))
+            sock = socket.create_server((host, port), backlog=self.LISTEN_BACKLOG)
+            logging.info(f"Serving clients from {workers} processes.")
+            ServerProcessPool(serve_process, workers, self.shared_sessions).run()
+            return
+        self.preload_models(preload, faster_whisper_custom_model_path)
+        start_services()
+        self.serve_connections(handler_kwargs, async_mode, host=host, port=port)
+
+    def start_services(self, host, backend, num_workers=None, metrics_port=None, http_port=None,
+                       faster_whisper_custom_model_path=None, http_batch_size=8, http_max_jobs=1,
+                       http_max_queued_jobs=8, index=0):
+        """
+        Starts the transcription workers of this process, and the metrics and batch transcription listeners
+        if enabled. See `run` for the arguments.
+
+        Args:
+            index (int, optional): Index of the server process. Process `index` serves its metrics on
+                                   `metrics_port + index`, and only the first process serves batch
+                                   transcription. Defaults to 0.
+        """
+        self.process_index = index
+        self.worker_pool = TranscriptionWorkerPool(num_workers)
+        logging.info(f"Running transcription on {self.worker_pool.num_workers} worker threads.")
+        if self.target_utilization:
+            replicas = self.model_pool.replicas if self.model_pool is not None else None
+            self.capacity_model = CapacityModel(self.worker_pool.num_workers, self.target_utilization, replicas)
+            if self.shared_sessions is not None:
+                threading.Thread(target=self.publish_utilization, name="utilization", daemon=True).start()
+        if metrics_port is not None:
+            self.start_metrics(host, metrics_port + index)
+        if http_port is not None and index == 0:
+            if backend.is_faster_whisper():
+                self.start_batch_server(
+                    host, http_port, faster_whisper_custom_model_path, http_batch_size, http_max_jobs,
+                    http_max_queued_jobs,
+                )
+            else:
+                logging.warning("Batch transcription over HTTP is only supported by the faster_whisper backend.")
+
+    def publish_utilization(self):
+        """Publish the utilization of this process to the other server processes, until the process exits."""
+        while True:
+            self.shared_sessions.publish_utilization(self.process_index, self.capacity_model.utilization())
+            time.sleep(self.UTILIZATION_PUBLISH_INTERVAL)
+
+    def serve_connections(self, handler_kwargs, async_mode=False, host=None, port=None, sock=None):
+        """
+        Serve websocket connections until the server is stopped.
+
+        Args:
+            handler_kwargs (dict): Keyword arguments of `recv_audio`.
+            async_mode (bool, optional): Receive from all clients on an asyncio event loop. Defaults to False.
+            host (str, optional): The host address to bind the server.
+            port (int, optional): The port number to bind the server.
+            sock (socket.socket, optional): A listening socket to accept connections from instead of binding
+                                            `host` and `port`.
+        """
+        if async_mode:
+            logging.info("Serving clients on an asyncio event loop.")
+            asyncio.run(self.serve_async(functools.partial(self.recv_audio_async, **handler_kwargs), host, port, sock))
+            return
         with serve(
-            functools.partial(
-                self.recv_audio,
-                backend=BackendType(backend),
-                faster_whisper_custom_model_path=faster_whisper_custom_model_path,
-                whisper_tensorrt_path=whisper_tensorrt_path,
-                trt_multilingual=trt_multilingual,
-                trt_py_session=trt_py_session,
-            ),
+            functools.partial(self.recv_audio, **handler_kwargs),
             host,
-            port
+            port,
+            sock=sock,
+            process_request=self.process_request,
         ) as server:
             server.serve_forever()
 
+    def start_metrics(self, host, port):
+        """
+        Starts serving Prometheus metrics of the server over HTTP on a background thread.
+
+        Args:
+            host (str): The host address to bind the metrics listener.
+            port (int): The port number to bind the metrics listener.
+        """
+        from whisper_live.metrics import ServerMetrics
+        self.metrics = ServerMetrics(self)
+        self.metrics.serve(host, port)
+        logging.info(f"Serving metrics on http://{host}:{port}/metrics")
+
+    def start_batch_server(self, host, port, model=None, batch_size=8, max_jobs=1, max_queued_jobs=8):
+        """
+        Starts serving batch transcription of uploaded files over HTTP on a background thread. The jobs use
+        the models of the model pool, if the server has one.
+
+        Args:
+            host (str): The host address to bind the HTTP listener.
+            port (int): The port number to bind the HTTP listener.
+            model (str, optional): Model used by jobs not asking for one. Defaults to "small".
+            batch_size (int, optional): Speech chunks decoded in one batch. Defaults to 8.
+            max_jobs (int, optional): Files transcribed at the same time. Defaults to 1.
+            max_queued_jobs (int, optional): Files waiting to be transcribed. Defaults to 8.
+        """
+        from whisper_live.batch_server import BatchTranscriptionServer
+        self.batch_server = BatchTranscriptionServer(
+            model_pool=self.model_pool,
+            worker_pool=self.worker_pool,
+            model=model or "small",
+            cache_path=self.cache_path,
+            batch_size=batch_size,
+            max_jobs=max_jobs,
+            max_queued_jobs=max_queued_jobs,
+        )
+        self.batch_server.serve(host, port)
+        logging.info(f"Serving batch transcription on http://{host}:{port}/v1/audio/transcriptions")
+
+    def preload_models(self, preload, faster_whisper_custom_model_path=None, download_only=False):
+        """
+        Loads faster_whisper models into the model pool before any client connects.
+
+        Args:
+            preload (list): Models to load.
+            faster_whisper_custom_model_path (str, optional): Custom model, which is always loaded.
+            download_only (bool, optional): Only download and convert the models, without loading them, e.g.
+                                            before forking server processes that load their own copy.
+        """
+        models = list(preload or [])
+        if faster_whisper_custom_model_path is not None and self.model_pool is not None:
+            models.append(faster_whisper_custom_model_path)
+        if not models:
+            return
+        if self.model_pool is None:
+            logging.warning("Preloading models is only supported with shared faster_whisper models.")
+            return
+
+        from whisper_live.backend.faster_whisper_backend import ServeClientFasterWhisper
+        for model in models:
+            if download_only:
+                logging.info(f"Downloading model {model}")
+                _, compute_type = ServeClientFasterWhisper.get_device_and_compute_type()
+                ServeClientFasterWhisper.fetch_model(model, compute_type, self.cache_path, download=True)
+            else:
+                logging.info(f"Preloading model {model}")
+                ServeClientFasterWhisper.preload_model(self.model_pool, model, self.cache_path)
+
     def voice_activity(self, websocket, frame_np):
         """
         Evaluates the voice activity in a given audio frame and manages the state of voice activity detection.
 
-        This method uses the configured voice activity detection (VAD) model to assess whether the given audio frame
-        contains speech. If the VAD model detects no voice activity for more than three consecutive frames,
+        This method uses the VAD stream of the client, scored by the process-wide `VADEngine`, to assess whether the
+        given audio frame contains speech. If the VAD model detects no voice activity for more than three consecutive frames,
         it sets an end-of-speech (EOS) flag for the associated client. This method aims to efficiently manage
         speech detection to improve subsequent processing steps.
 
@@ -427,7 +1321,7 @@ class TranscriptionServer:
                 after detecting no voice activity for more than three consecutive frames, it also triggers the
                 end-of-speech (EOS) flag for the client.
         """
-        if not self.vad_detector(frame_np):
+        if not self.vad_streams[websocket](frame_np):
             self.no_voice_activity_chunks += 1
             if self.no_voice_activity_chunks > 3:
                 client = self.client_manager.get_client(websocket)
@@ -444,6 +1338,14 @@ class TranscriptionServer:
         Args:
             websocket: The websocket associated with the client to be cleaned up.
         """
-        if self.client_manager.get_client(websocket):
-            self.client_manager.remove_client(websocket)
+        self.vad_streams.pop(websocket, None)
+        self.audio_formats.pop(websocket, None)
+        queue = self.outbound_queues.pop(websocket, None)
+        if queue is not None:
+            queue.close()
+        decoder = self.audio_decoders.pop(websocket, None)
+        if decoder is not None:
+            decoder.close()
+        # also frees the slot of a session that failed to start
+        self.client_manager.remove_client(websocket)
 
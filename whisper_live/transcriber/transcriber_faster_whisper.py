@@ -572,6 +572,127 @@ class BatchedInferencePipeline:
         pbar.close()
         self.last_speech_timestamp = 0.0
 
+    def transcribe_features(
+        self,
+        features: List[np.ndarray],
+        language: str,
+        task: str = "transcribe",
+        beam_size: int = 5,
+        patience: float = 1,
+        length_penalty: float = 1,
+        repetition_penalty: float = 1,
+        no_repeat_ngram_size: int = 0,
+        temperature: float = 0.0,
+        initial_prompt: Optional[str] = None,
+        suppress_blank: bool = True,
+        suppress_tokens: Optional[List[int]] = [-1],
+        without_timestamps: bool = False,
+        word_timestamps: bool = False,
+        prepend_punctuations: str = "\"'“¿([{-",
+        append_punctuations: str = "\"'.。,，!！?？:：”)]}、",
+        max_new_tokens: Optional[int] = None,
+        hotwords: Optional[str] = None,
+    ) -> List[List[Segment]]:
+        """Transcribe several independent windows of Mel features in one batched call.
+
+        Unlike `transcribe`, the windows usually come from different audio streams, so the
+        encoder and `generate` run once for the whole batch and the segments are returned
+        per window with timestamps relative to the start of that window. All windows share
+        the same language, task and prompt; temperature fallback is not applied.
+
+        Arguments:
+            features: List of Mel spectrograms with shape (n_mels, n_frames). Each window
+                must not be longer than `chunk_length` seconds.
+            language: The language spoken in the windows.
+            task: Task to execute (transcribe or translate).
+            initial_prompt: Optional text string to provide as a prompt for every window.
+            without_timestamps: Only sample text tokens.
+            word_timestamps: Extract word-level timestamps for each segment.
+
+        Returns:
+          A list with the transcribed segments of every window, in input order.
+        """
+        if not features:
+            return []
+
+        if not self.model.model.is_multilingual and language != "en":
+            language = "en"
+
+        tokenizer = Tokenizer(
+            self.model.hf_tokenizer,
+            self.model.model.is_multilingual,
+            task=task,
+            language=language,
+        )
+
+        options = TranscriptionOptions(
+            beam_size=beam_size,
+            best_of=1,
+            patience=patience,
+            length_penalty=length_penalty,
+            repetition_penalty=repetition_penalty,
+            no_repeat_ngram_size=no_repeat_ngram_size,
+            log_prob_threshold=None,
+            no_speech_threshold=None,
+            compression_ratio_threshold=None,
+            temperatures=[temperature],
+            initial_prompt=initial_prompt,
+            prefix=None,
+            suppress_blank=suppress_blank,
+            suppress_tokens=get_suppressed_tokens(tokenizer, suppress_tokens),
+            prepend_punctuations=prepend_punctuations,
+            append_punctuations=append_punctuations,
+            max_new_tokens=max_new_tokens,
+            hotwords=hotwords,
+            word_timestamps=word_timestamps,
+            hallucination_silence_threshold=None,
+            condition_on_previous_text=False,
+            clip_timestamps=[],
+            prompt_reset_on_temperature=0.5,
+            multilingual=False,
+            without_timestamps=without_timestamps,
+            max_initial_timestamp=0.0,
+        )
+
+        time_per_frame = self.model.feature_extractor.time_per_frame
+        chunks_metadata = [
+            {"start_time": 0.0, "end_time": (feature.shape[-1] - 1) * time_per_frame}
+            for feature in features
+        ]
+        batch = np.stack([pad_or_trim(feature[..., :-1]) for feature in features])
+
+        self.last_speech_timestamp = 0.0
+        results = self.forward(batch, tokenizer, chunks_metadata, options)
+        self.last_speech_timestamp = 0.0
+
+        all_segments = []
+        for result in results:
+            segments = []
+            for segment in result:
+                if segment["start"] == segment["end"] or not segment["text"].strip():
+                    continue
+                segments.append(
+                    Segment(
+                        seek=segment["seek"],
+                        id=len(segments) + 1,
+                        text=segment["text"],
+                        start=round(segment["start"], 3),
+                        end=round(segment["end"], 3),
+                        words=(
+                            None
+                            if not options.word_timestamps
+                            else [Word(**word) for word in segment["words"]]
+                        ),
+                        tokens=segment["tokens"],
+                        avg_logprob=segment["avg_logprob"],
+                        no_speech_prob=segment["no_speech_prob"],
+                        compression_ratio=segment["compression_ratio"],
+                        temperature=temperature,
+                    )
+                )
+            all_segments.append(segments)
+        return all_segments
+
 
 class WhisperModel:
     def __init__(
@@ -633,6 +754,7 @@ class WhisperModel:
                 cache_dir=download_root,
             )
 
+        self.model_path = model_path
         self.model = ctranslate2.models.Whisper(
             model_path,
             device=device,
@@ -735,6 +857,8 @@ class WhisperModel:
         hotwords: Optional[str] = None,
         language_detection_threshold: Optional[float] = 0.5,
         language_detection_segments: int = 1,
+        features: Optional[np.ndarray] = None,
+        encoder_output: Optional[ctranslate2.StorageView] = None,
     ) -> Tuple[Iterable[Segment], TranscriptionInfo]:
         """Transcribes an input file.
 
@@ -804,6 +928,11 @@ class WhisperModel:
           language_detection_threshold: If the maximum probability of the language tokens is higher
            than this value, the language is detected.
           language_detection_segments: Number of segments to consider for the language detection.
+          features: Precomputed log-Mel spectrogram of the audio, as returned by the feature extractor.
+            Feature extraction is skipped if it is given; vad_filter is ignored, the features
+            must already be restricted to the speech.
+          encoder_output: Encoder output of the first window of the given features, as returned
+            by encode_first_window, so that it is not encoded again. Ignored without features.
         Returns:
           A tuple with:
 
@@ -829,7 +958,7 @@ class WhisperModel:
             "Processing audio with duration %s", format_timestamp(duration)
         )
 
-        if vad_filter and clip_timestamps == "0":
+        if vad_filter and clip_timestamps == "0" and features is None:
             if vad_parameters is None:
                 vad_parameters = VadOptions()
             elif isinstance(vad_parameters, dict):
@@ -861,9 +990,10 @@ class WhisperModel:
             speech_chunks = None
         if audio.shape[0] == 0:
             return None, None
-        features = self.feature_extractor(audio, chunk_length=chunk_length)
 
-        encoder_output = None
+        if features is None:
+            features = self.feature_extractor(audio, chunk_length=chunk_length)
+            encoder_output = None
         all_language_probs = None
 
         # detecting the language if not provided
@@ -883,15 +1013,25 @@ class WhisperModel:
                     if start_timestamp * self.frames_per_second < content_frames
                     else 0
                 )
-                (
-                    language,
-                    language_probability,
-                    all_language_probs,
-                ) = self.detect_language(
-                    features=features[..., seek:],
-                    language_detection_segments=language_detection_segments,
-                    language_detection_threshold=language_detection_threshold,
-                )
+                if seek == 0 and language_detection_segments == 1:
+                    # its encoder output is shared by language detection and decoding
+                    if encoder_output is None:
+                        encoder_output = self.encode_first_window(features)
+                    (
+                        language,
+                        language_probability,
+                        all_language_probs,
+                    ) = self.detect_language_from_encoder_output(encoder_output)
+                else:
+                    (
+                        language,
+                        language_probability,
+                        all_language_probs,
+                    ) = self.detect_language(
+                        features=features[..., seek:],
+                        language_detection_segments=language_detection_segments,
+                        language_detection_threshold=language_detection_threshold,
+                    )
 
                 self.logger.info(
                     "Detected language '%s' with probability %.2f",
@@ -1338,6 +1478,14 @@ class WhisperModel:
         pbar.close()
         return all_segments
 
+    def encode_first_window(self, features: np.ndarray) -> ctranslate2.StorageView:
+        """Encode the first window of the features the way generate_segments does, so
+        that its encoder output can be passed to transcribe."""
+        content_frames = features.shape[-1] - 1
+        return self.encode(
+            pad_or_trim(features[..., : min(content_frames, self.feature_extractor.nb_max_frames)])
+        )
+
     def encode(self, features: np.ndarray) -> ctranslate2.StorageView:
         # When the model is running on multiple GPUs, the encoder output should be moved
         # to the CPU since we don't know which GPU will handle the next job.
@@ -1769,13 +1917,11 @@ class WhisperModel:
             encoder_output = self.encode(
                 pad_or_trim(features[..., i : i + self.feature_extractor.nb_max_frames])
             )
-            # results is a list of tuple[str, float] with language names and probabilities.
-            results = self.model.detect_language(encoder_output)[0]
-
-            # Parse language names to strip out markers
-            all_language_probs = [(token[2:-2], prob) for (token, prob) in results]
-            # Get top language token and probability
-            language, language_probability = all_language_probs[0]
+            (
+                language,
+                language_probability,
+                all_language_probs,
+            ) = self.detect_language_from_encoder_output(encoder_output)
             if language_probability > language_detection_threshold:
                 break
             detected_language_info.setdefault(language, []).append(language_probability)
@@ -1790,6 +1936,29 @@ class WhisperModel:
 
         return language, language_probability, all_language_probs
 
+    def detect_language_from_encoder_output(
+        self, encoder_output: ctranslate2.StorageView
+    ) -> Tuple[str, float, List[Tuple[str, float]]]:
+        """
+        Detect the language of a single window that was already encoded.
+
+        Arguments:
+            encoder_output: Encoder output of one window of 30 seconds.
+
+        Returns:
+            language: Detected language.
+            languege_probability: Probability of the detected language.
+            all_language_probs: List of tuples with all language names and probabilities.
+        """
+        # results is a list of tuple[str, float] with language names and probabilities.
+        results = self.model.detect_language(encoder_output)[0]
+
+        # Parse language names to strip out markers
+        all_language_probs = [(token[2:-2], prob) for (token, prob) in results]
+        # Get top language token and probability
+        language, language_probability = all_language_probs[0]
+        return language, language_probability, all_language_probs
+
 
 def restore_speech_timestamps(
     segments: Iterable[Segment],
@@ -1,16 +1,35 @@
 import os
-import subprocess
-import torch
+import logging
+import threading
+import urllib.request
 import numpy as np
 import onnxruntime
 import warnings
+from concurrent.futures import Future
 
 
 class VoiceActivityDetection():
+    """
+    Silero VAD run with onnxruntime on numpy arrays.
+
+    The model input, i.e. the audio context of the previous chunk followed by the current chunk, is kept
+    in one preallocated array per batch size: every chunk is written into it in place, after the tail of
+    the previous chunk is moved to its front, so scoring a chunk does not allocate any input arrays.
+    """
 
     def __init__(self, force_onnx_cpu=True):
         path = self.download()
+        self.session = self.create_session(path, force_onnx_cpu)
 
+        self.reset_states()
+        if '16k' in path:
+            warnings.warn('This model support only 16000 sampling rate!')
+            self.sample_rates = [16000]
+        else:
+            self.sample_rates = [8000, 16000]
+
+    @staticmethod
+    def create_session(path, force_onnx_cpu=True):
         opts = onnxruntime.SessionOptions()
         opts.log_severity_level = 3
 
@@ -18,22 +37,15 @@ class VoiceActivityDetection():
         opts.intra_op_num_threads = 1
 
         if force_onnx_cpu and 'CPUExecutionProvider' in onnxruntime.get_available_providers():
-            self.session = onnxruntime.InferenceSession(path, providers=['CPUExecutionProvider'], sess_options=opts)
-        else:
-            self.session = onnxruntime.InferenceSession(path, providers=['CUDAExecutionProvider'], sess_options=opts)
-
-        self.reset_states()
-        if '16k' in path:
-            warnings.warn('This model support only 16000 sampling rate!')
-            self.sample_rates = [16000]
-        else:
-            self.sample_rates = [8000, 16000]
+            return onnxruntime.InferenceSession(path, providers=['CPUExecutionProvider'], sess_options=opts)
+        return onnxruntime.InferenceSession(path, providers=['CUDAExecutionProvider'], sess_options=opts)
 
     def _validate_input(self, x, sr: int):
-        if x.dim() == 1:
-            x = x.unsqueeze(0)
-        if x.dim() > 2:
-            raise ValueError(f"Too many dimensions for input audio chunk {x.dim()}")
+        x = np.asarray(x, dtype=np.float32)
+        if x.ndim == 1:
+            x = x[np.newaxis]
+        if x.ndim > 2:
+            raise ValueError(f"Too many dimensions for input audio chunk {x.ndim}")
 
         if sr != 16000 and (sr % 16000 == 0):
             step = sr // 16000
@@ -48,8 +60,8 @@ class VoiceActivityDetection():
         return x, sr
 
     def reset_states(self, batch_size=1):
-        self._state = torch.zeros((2, batch_size, 128)).float()
-        self._context = torch.zeros(0)
+        self._state = np.zeros((2, batch_size, 128), dtype=np.float32)
+        self._input = None
         self._last_sr = 0
         self._last_batch_size = 0
 
@@ -71,42 +83,33 @@ class VoiceActivityDetection():
         if (self._last_batch_size) and (self._last_batch_size != batch_size):
             self.reset_states(batch_size)
 
-        if not len(self._context):
-            self._context = torch.zeros(batch_size, context_size)
-
-        x = torch.cat([self._context, x], dim=1)
-        if sr in [8000, 16000]:
-            ort_inputs = {'input': x.numpy(), 'state': self._state.numpy(), 'sr': np.array(sr, dtype='int64')}
-            ort_outs = self.session.run(None, ort_inputs)
-            out, state = ort_outs
-            self._state = torch.from_numpy(state)
+        if self._input is None:
+            self._input = np.zeros((batch_size, context_size + num_samples), dtype=np.float32)
+            self._sr = np.array(sr, dtype=np.int64)
         else:
-            raise ValueError()
+            # the context of this chunk is the tail of the previous one
+            self._input[:, :context_size] = self._input[:, -context_size:]
+        self._input[:, context_size:] = x
+
+        out, self._state = self.session.run(None, {'input': self._input, 'state': self._state, 'sr': self._sr})
 
-        self._context = x[..., -context_size:]
         self._last_sr = sr
         self._last_batch_size = batch_size
-
-        out = torch.from_numpy(out)
         return out
 
     def audio_forward(self, x, sr: int):
-        outs = []
         x, sr = self._validate_input(x, sr)
         self.reset_states()
         num_samples = 512 if sr == 16000 else 256
 
-        if x.shape[1] % num_samples:
-            pad_num = num_samples - (x.shape[1] % num_samples)
-            x = torch.nn.functional.pad(x, (0, pad_num), 'constant', value=0.0)
-
-        for i in range(0, x.shape[1], num_samples):
-            wavs_batch = x[:, i:i+num_samples]
-            out_chunk = self.__call__(wavs_batch, sr)
-            outs.append(out_chunk)
-
-        stacked = torch.cat(outs, dim=1)
-        return stacked.cpu()
+        num_chunks = -(-x.shape[1] // num_samples)
+        outs = np.empty((x.shape[0], num_chunks), dtype=np.float32)
+        for i in range(num_chunks):
+            chunk = x[:, i * num_samples:(i + 1) * num_samples]
+            if chunk.shape[1] < num_samples:
+                chunk = np.pad(chunk, ((0, 0), (0, num_samples - chunk.shape[1])))
+            outs[:, i] = self.__call__(chunk, sr)[:, 0]
+        return outs
 
     @staticmethod
     def download(model_url="https://github.com/snakers4/silero-vad/raw/v5.0/files/silero_vad.onnx"):
@@ -120,11 +123,17 @@ class VoiceActivityDetection():
 
         # Check if the model file already exists
         if not os.path.exists(model_filename):
-            # If it doesn't exist, download the model using wget
+            # download next to the target and rename, so that a concurrent or failed download never leaves a
+            # partial model behind
+            partial_filename = f"{model_filename}.{os.getpid()}.{threading.get_ident()}.part"
             try:
-                subprocess.run(["wget", "-O", model_filename, model_url], check=True)
-            except subprocess.CalledProcessError:
-                print("Failed to download the model using wget.")
+                urllib.request.urlretrieve(model_url, partial_filename)
+                os.replace(partial_filename, model_filename)
+            except OSError as e:
+                logging.error(f"[ERROR]: Failed to download the VAD model: {e}")
+                if os.path.exists(partial_filename):
+                    os.remove(partial_filename)
+                raise RuntimeError(f"Failed to download the VAD model from {model_url}") from e
         return model_filename
 
 
@@ -153,5 +162,343 @@ class VoiceActivityDetector:
             bool: True if the speech probability exceeds the threshold, indicating the presence of voice activity;
                   False otherwise.
         """
-        speech_probs = self.model.audio_forward(torch.from_numpy(audio_frame.copy()), self.frame_rate)[0]
-        return torch.any(speech_probs > self.threshold).item()
+        speech_probs = self.model.audio_forward(audio_frame, self.frame_rate)[0]
+        return bool(np.any(speech_probs > self.threshold))
+
+
+class VADStream:
+    """
+    The recurrent state of one audio stream scored by a `VADEngine`.
+
+    Audio frames of any length can be passed in; samples that do not fill a whole 512-sample window are
+    kept and scored together with the next frame.
+    """
+
+    def __init__(self, engine, threshold=0.5):
+        """
+        Args:
+            engine (VADEngine): The engine scoring the stream.
+            threshold (float, optional): The probability threshold for detecting voice activity. Defaults to 0.5.
+        """
+        self.engine = engine
+        self.threshold = threshold
+        self.state = np.zeros((2, 128), dtype=np.float32)
+        self.context = np.zeros(engine.CONTEXT_SIZE, dtype=np.float32)
+        self.remainder = np.zeros(0, dtype=np.float32)
+        self.last_prob = 0.0
+
+    def __call__(self, audio_frame):
+        """
+        Determines if the given audio frame contains speech.
+
+        Args:
+            audio_frame (np.ndarray): The next audio samples of the stream.
+
+        Returns:
+            bool: True if the speech probability of any window completed by the frame exceeds the threshold. If
+                  the frame completes no window, the decision for the last scored window.
+        """
+        speech_probs = self.engine.score(self, audio_frame)
+        if speech_probs.shape[0]:
+            self.last_prob = float(speech_probs.max())
+        return self.last_prob > self.threshold
+
+
+class VADEngine:
+    """
+    Process-wide Silero VAD model scoring the audio of many streams in batched calls.
+
+    The model is loaded once. Every stream keeps its own recurrent state and audio context in a
+    `VADStream`, so consecutive frames of a stream are scored as one continuous signal. Frames submitted
+    by different streams while the engine is busy are collected by a single scoring thread and scored
+    together: the n-th window of every pending frame goes into the same ONNX call, using the batch
+    dimension of the model. The number of calls grows with the length of the longest pending frame,
+    not with the number of streams.
+    """
+    WINDOW_SIZE = 512
+    CONTEXT_SIZE = 64
+    SAMPLING_RATE = 16000
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, force_onnx_cpu=True, max_batch_size=64):
+        """
+        Args:
+            force_onnx_cpu (bool, optional): Run the model on the CPU. Defaults to True.
+            max_batch_size (int, optional): Maximum number of windows scored in one call. Defaults to 64.
+        """
+        self.session = VoiceActivityDetection.create_session(VoiceActivityDetection.download(), force_onnx_cpu)
+        self.max_batch_size = max(1, max_batch_size)
+        self.pending = []
+        self.cond = threading.Condition()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    @classmethod
+    def shared(cls):
+        """
+        Returns:
+            VADEngine: The engine shared by the whole process, created on first use.
+        """
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def create_stream(self, threshold=0.5):
+        """
+        Args:
+            threshold (float, optional): The probability threshold for detecting voice activity. Defaults to 0.5.
+
+        Returns:
+            VADStream: A new stream scored by this engine.
+        """
+        return VADStream(self, threshold)
+
+    def score(self, stream, audio_frame):
+        """
+        Score the next audio frame of a stream, together with the frames of other streams waiting to be scored.
+
+        Args:
+            stream (VADStream): The stream the frame belongs to.
+            audio_frame (np.ndarray): The next audio samples of the stream.
+
+        Returns:
+            np.ndarray: The speech probability of every window completed by the frame.
+        """
+        future = Future()
+        with self.cond:
+            self.pending.append((stream, np.asarray(audio_frame, dtype=np.float32), future))
+            self.cond.notify()
+        return future.result()
+
+    def run(self):
+        """Score the pending frames, one batch of frames at a time."""
+        while True:
+            with self.cond:
+                while not self.pending:
+                    self.cond.wait()
+                # a stream only has one frame in a batch, its later frames depend on the state after it
+                requests, deferred, streams = [], [], set()
+                for request in self.pending:
+                    if id(request[0]) in streams:
+                        deferred.append(request)
+                    else:
+                        streams.add(id(request[0]))
+                        requests.append(request)
+                self.pending = deferred
+            try:
+                results = self.process([(stream, frame) for stream, frame, _ in requests])
+            except Exception as e:
+                for _, _, future in requests:
+                    future.set_exception(e)
+                continue
+            for (_, _, future), speech_probs in zip(requests, results):
+                future.set_result(speech_probs)
+
+    def process(self, requests):
+        """
+        Score one frame of each of several streams and advance their state.
+
+        Args:
+            requests (list): (VADStream, np.ndarray) pairs, at most one per stream.
+
+        Returns:
+            list: The speech probabilities of the windows of every frame.
+        """
+        windows = []
+        for stream, audio_frame in requests:
+            audio = np.concatenate([stream.remainder, audio_frame])
+            num_windows = audio.shape[0] // self.WINDOW_SIZE
+            stream.remainder = audio[num_windows * self.WINDOW_SIZE:].copy()
+            windows.append(audio[:num_windows * self.WINDOW_SIZE].reshape(num_windows, self.WINDOW_SIZE))
+        results = [np.empty(w.shape[0], dtype=np.float32) for w in windows]
+
+        sr = np.array(self.SAMPLING_RATE, dtype=np.int64)
+        for step in range(max((w.shape[0] for w in windows), default=0)):
+            active = [i for i, w in enumerate(windows) if w.shape[0] > step]
+            for batch_start in range(0, len(active), self.max_batch_size):
+                batch = active[batch_start:batch_start + self.max_batch_size]
+                streams = [requests[i][0] for i in batch]
+                x = np.stack([
+                    np.concatenate([stream.context, windows[i][step]]) for stream, i in zip(streams, batch)
+                ])
+                state = np.stack([stream.state for stream in streams], axis=1)
+                out, state = self.session.run(None, {"input": x, "state": state, "sr": sr})
+                for j, (stream, i) in enumerate(zip(streams, batch)):
+                    results[i][step] = out[j, 0]
+                    stream.state = state[:, j]
+                    stream.context = x[j, -self.CONTEXT_SIZE:]
+        return results
+
+
+class StreamingVAD:
+    """
+    Silero VAD over the audio stream of a session, scoring every window of audio only once.
+
+    `faster_whisper.vad.get_speech_timestamps` runs the model and its segmentation over the whole audio it
+    is given. In a streaming session that means the same audio is scored again on every pass until it is
+    transcribed. Here the audio is scored by a `VADStream` of the process-wide `VADEngine`, which keeps the
+    state and the audio context of the model between passes, so only new 512-sample windows are scored, and
+    the segmentation runs incrementally over their probabilities. The speech chunks of any window of the
+    stream are then derived from the stored regions, padded the same way `get_speech_timestamps` pads them.
+    """
+    WINDOW_SIZE = VADEngine.WINDOW_SIZE
+
+    def __init__(self, vad_options=None, sampling_rate=16000, engine=None):
+        """
+        Args:
+            vad_options (VadOptions or dict, optional): Silero VAD parameters, see `faster_whisper.vad.VadOptions`.
+                                                        Defaults to the defaults of `VadOptions`.
+            sampling_rate (int, optional): Sampling rate of the audio. Defaults to 16000.
+            engine (VADEngine, optional): The engine scoring the audio. Defaults to the engine shared by the
+                                          process.
+        """
+        from faster_whisper.vad import VadOptions
+
+        if vad_options is None:
+            vad_options = VadOptions()
+        elif isinstance(vad_options, dict):
+            vad_options = VadOptions(**vad_options)
+        self.engine = engine if engine is not None else VADEngine.shared()
+        self.onset = vad_options.onset
+        self.offset = vad_options.offset
+        self.min_speech_samples = sampling_rate * vad_options.min_speech_duration_ms / 1000
+        self.speech_pad_samples = sampling_rate * vad_options.speech_pad_ms / 1000
+        self.max_speech_samples = (
+            sampling_rate * vad_options.max_speech_duration_s
+            - self.WINDOW_SIZE
+            - 2 * self.speech_pad_samples
+        )
+        self.min_silence_samples = sampling_rate * vad_options.min_silence_duration_ms / 1000
+        self.min_silence_samples_at_max_speech = sampling_rate * 98 / 1000
+        self.reset()
+
+    def reset(self, position=0):
+        """
+        Forget the model state and the detected speech, and continue scoring the stream at `position`.
+
+        Args:
+            position (int, optional): Absolute sample index of the next window to score. Defaults to 0.
+        """
+        self.stream = self.engine.create_stream(self.onset)
+        self.position = position
+        self.speeches = []
+        self.current_speech = {}
+        self.triggered = False
+        self.temp_end = 0
+        self.prev_end = 0
+        self.next_start = 0
+
+    def update(self, audio_buffer):
+        """
+        Score the windows of audio that arrived since the last update.
+
+        Args:
+            audio_buffer (RingBuffer): The session's audio buffer.
+        """
+        buffer_start, buffer_end = audio_buffer.start, audio_buffer.end
+        if self.position < buffer_start:
+            # audio was dropped before it was scored
+            self.reset(buffer_start)
+        # closed regions that can no longer overlap any window of the buffer
+        while self.speeches and self.speeches[0]["end"] + self.speech_pad_samples <= buffer_start:
+            self.speeches.pop(0)
+
+        n_windows = (buffer_end - self.position) // self.WINDOW_SIZE
+        if n_windows == 0:
+            return
+        # only whole windows are passed on, so that the stream never holds back a remainder
+        audio = audio_buffer.view(self.position, self.position + n_windows * self.WINDOW_SIZE)
+        for speech_prob in self.engine.score(self.stream, audio):
+            self.step(float(speech_prob), self.position)
+            self.position += self.WINDOW_SIZE
+
+    def step(self, speech_prob, sample):
+        """
+        Advance the segmentation of `get_speech_timestamps` by one window.
+
+        Args:
+            speech_prob (float): Speech probability of the window.
+            sample (int): Absolute sample index of the start of the window.
+        """
+        if speech_prob >= self.onset and self.temp_end:
+            self.temp_end = 0
+            if self.next_start < self.prev_end:
+                self.next_start = sample
+
+        if speech_prob >= self.onset and not self.triggered:
+            self.triggered = True
+            self.current_speech = {"start": sample}
+            return
+
+        if self.triggered and sample - self.current_speech["start"] > self.max_speech_samples:
+            if self.prev_end:
+                self.current_speech["end"] = self.prev_end
+                self.speeches.append(self.current_speech)
+                self.current_speech = {}
+                # previously reached silence (< offset) and is still not speech (< onset)
+                if self.next_start < self.prev_end:
+                    self.triggered = False
+                else:
+                    self.current_speech = {"start": self.next_start}
+                self.prev_end = self.next_start = self.temp_end = 0
+            else:
+                self.current_speech["end"] = sample
+                self.speeches.append(self.current_speech)
+                self.current_speech = {}
+                self.prev_end = self.next_start = self.temp_end = 0
+                self.triggered = False
+                return
+
+        if speech_prob < self.offset and self.triggered:
+            if not self.temp_end:
+                self.temp_end = sample
+            # condition to avoid cutting in very short silence
+            if sample - self.temp_end > self.min_silence_samples_at_max_speech:
+                self.prev_end = self.temp_end
+            if sample - self.temp_end < self.min_silence_samples:
+                return
+            self.current_speech["end"] = self.temp_end
+            if self.current_speech["end"] - self.current_speech["start"] > self.min_speech_samples:
+                self.speeches.append(self.current_speech)
+            self.current_speech = {}
+            self.prev_end = self.next_start = self.temp_end = 0
+            self.triggered = False
+
+    def get_speech_timestamps(self, start, end):
+        """
+        Get the speech chunks of a window of the stream, like `get_speech_timestamps` returns them.
+
+        Args:
+            start (int): Absolute sample index of the start of the window.
+            end (int): Absolute sample index of the end of the window.
+
+        Returns:
+            list: Dicts with the start and end sample of each speech chunk, relative to the start of the window.
+        """
+        length = end - start
+        speeches = [
+            {"start": speech["start"] - start, "end": speech["end"] - start}
+            for speech in self.speeches
+            if speech["end"] + self.speech_pad_samples > start and speech["start"] < end
+        ]
+        if (self.current_speech and self.current_speech["start"] < end
+                and end - self.current_speech["start"] > self.min_speech_samples):
+            speeches.append({"start": self.current_speech["start"] - start, "end": length})
+
+        for i, speech in enumerate(speeches):
+            if i == 0:
+                speech["start"] = int(max(0, speech["start"] - self.speech_pad_samples))
+            if i != len(speeches) - 1:
+                silence_duration = speeches[i + 1]["start"] - speech["end"]
+                if silence_duration < 2 * self.speech_pad_samples:
+                    speech["end"] += int(silence_duration // 2)
+                    speeches[i + 1]["start"] = int(max(0, speeches[i + 1]["start"] - silence_duration // 2))
+                else:
+                    speech["end"] = int(min(length, speech["end"] + self.speech_pad_samples))
+                    speeches[i + 1]["start"] = int(max(0, speeches[i + 1]["start"] - self.speech_pad_samples))
+            else:
+                speech["end"] = int(min(length, speech["end"] + self.speech_pad_samples))
+        return [speech for speech in speeches if speech["end"] > speech["start"]]